@@ -0,0 +1,46 @@
+from django.conf import settings
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+# slug of the restaurant a token was issued for
+RESTAURANT_CLAIM = "restaurant"
+
+
+def token_restaurant(token):
+    # tokens issued before there were several restaurants belong to the
+    # only one there was
+    return token.get(RESTAURANT_CLAIM, settings.DEFAULT_RESTAURANT)
+
+
+class RestaurantJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication bound to the restaurant of the request: a token is
+    only accepted by the restaurant it was issued for, whose users may live
+    in another database than those of the restaurant named by the
+    ``X-Restaurant`` header.
+
+    Staff rights only hold in the user's own restaurant (``User.restaurant``),
+    everywhere else the user is authenticated as a customer.
+    """
+
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        token = self.get_validated_token(raw_token)
+
+        restaurant = getattr(request, "restaurant", None)
+        if restaurant is None or token_restaurant(token) != restaurant.slug:
+            raise AuthenticationFailed(
+                "Token was issued for another restaurant.", code="wrong_restaurant"
+            )
+
+        user = self.get_user(token)
+        if not user.administers(restaurant):
+            # only this request's copy; views that change a user load it
+            # from the database
+            user.is_staff = user.is_superuser = False
+        return user, token
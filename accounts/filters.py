@@ -0,0 +1,19 @@
+from rest_framework.filters import SearchFilter
+
+from accounts.models import User
+
+
+class EmailSearchFilter(SearchFilter):
+    """
+    SearchFilter whose `^` fields match a case-sensitive prefix of the
+    lowercased search terms. Unlike `istartswith`, this can use the pattern
+    index PostgreSQL keeps for the unique email column.
+    """
+
+    lookup_prefixes = {**SearchFilter.lookup_prefixes, "^": "startswith"}
+
+    def get_search_terms(self, request):
+        return [
+            User.objects.normalize_email(term)
+            for term in super().get_search_terms(request)
+        ]
@@ -4,6 +4,17 @@ from django.contrib.auth.base_user import BaseUserManager
 class UserManager(BaseUserManager):
     use_in_migrations = True
 
+    @classmethod
+    def normalize_email(cls, email):
+        """
+        Emails are stored and looked up in lowercase, so every lookup can
+        use the unique index on the column.
+        """
+        return (email or "").strip().lower()
+
+    def get_by_natural_key(self, email):
+        return self.get(**{self.model.USERNAME_FIELD: self.normalize_email(email)})
+
     def _create_user(self, email, password, **extra_fields):
         if not email:
             raise ValueError("Users require an email field")
@@ -26,5 +37,9 @@ class UserManager(BaseUserManager):
             raise ValueError("Superuser must have is_staff=True.")
         if extra_fields.get("is_superuser") is not True:
             raise ValueError("Superuser must have is_superuser=True.")
+        if "restaurant" not in extra_fields:
+            from core.tenants import database_restaurant
+
+            extra_fields["restaurant"] = database_restaurant(self.db)
 
         return self._create_user(email, password, **extra_fields)
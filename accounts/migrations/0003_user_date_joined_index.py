@@ -0,0 +1,19 @@
+# Generated by Django 4.1.5 on 2026-10-19 13:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0002_user_image"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(
+                fields=["date_joined"], name="accounts_us_date_jo_ff39bb_idx"
+            ),
+        ),
+    ]
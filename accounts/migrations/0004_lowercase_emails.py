@@ -0,0 +1,35 @@
+from django.db import migrations
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+
+def lowercase_emails(apps, schema_editor):
+    """
+    Store every email in lowercase. Addresses that only differ in case from
+    another user's are left as they are, those accounts need to be merged
+    by hand.
+    """
+    User = apps.get_model("accounts", "User")
+    ambiguous = (
+        User.objects.annotate(lower_email=Lower("email"))
+        .values("lower_email")
+        .annotate(users=Count("id"))
+        .filter(users__gt=1)
+        .values("lower_email")
+    )
+    User.objects.exclude(email=Lower("email")).exclude(
+        id__in=User.objects.annotate(lower_email=Lower("email"))
+        .filter(lower_email__in=ambiguous)
+        .values("id")
+    ).update(email=Lower("email"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0003_user_date_joined_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(lowercase_emails, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 4.1.5 on 2026-10-19 14:15
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.conf import settings
+from django.db.models import Q
+
+
+def assign_staff_restaurant(apps, schema_editor):
+    """
+    Existing staff administered the restaurant of their database, which
+    migration core.0024 created.
+    """
+    Restaurant = apps.get_model("core", "Restaurant")
+    User = apps.get_model("accounts", "User")
+    database = schema_editor.connection.alias
+    slug = next(
+        (
+            slug
+            for slug, alias in settings.TENANT_DATABASES.items()
+            if alias == database
+        ),
+        settings.DEFAULT_RESTAURANT,
+    )
+    restaurant = Restaurant.objects.using(database).filter(slug=slug).first()
+    if restaurant is not None:
+        User.objects.using(database).filter(
+            Q(is_staff=True) | Q(is_superuser=True)
+        ).update(restaurant=restaurant)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0024_restaurant"),
+        ("accounts", "0004_lowercase_emails"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="restaurant",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="staff",
+                to="core.restaurant",
+            ),
+        ),
+        migrations.RunPython(
+            assign_staff_restaurant, migrations.RunPython.noop, elidable=True
+        ),
+    ]
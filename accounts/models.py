@@ -10,6 +10,15 @@ class User(AbstractUser):
     email = models.EmailField("Email Address", unique=True)
     password = models.CharField(max_length=255)
     image = models.ImageField(upload_to="profile_pictures/", blank=True, null=True)
+    # restaurant the user is staff of; is_staff and is_superuser only hold
+    # there (see accounts.authentication)
+    restaurant = models.ForeignKey(
+        "core.Restaurant",
+        related_name="staff",
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+    )
     username = None
 
     objects = UserManager()
@@ -17,9 +26,19 @@ class User(AbstractUser):
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = []
 
+    class Meta(AbstractUser.Meta):
+        indexes = [models.Index(fields=["date_joined"])]
+
     def __str__(self):
         return self.email
 
+    def save(self, *args, **kwargs):
+        self.email = User.objects.normalize_email(self.email)
+        return super().save(*args, **kwargs)
+
+    def administers(self, restaurant):
+        return restaurant is not None and self.restaurant_id == restaurant.id
+
     def full_name(self):
         if self.first_name and self.last_login:
             return f"{self.first_name} {self.last_name}"
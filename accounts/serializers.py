@@ -1,27 +1,37 @@
 from django.contrib.auth.hashers import make_password
+from django.db import models
 
 from rest_framework import serializers
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 
+from accounts.authentication import RESTAURANT_CLAIM
 from accounts.models import User
 
 
-# Token serializer
-class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
-    @classmethod
-    def get_token(cls, user):
-        token = super().get_token(user)
+def restaurant_token(user, restaurant):
+    """
+    Refresh token of `user` for `restaurant`, only accepted there (see
+    accounts.authentication). Its access tokens carry the same claims.
+    """
+    token = RefreshToken.for_user(user)
+    token[RESTAURANT_CLAIM] = restaurant.slug
+
+    # Add custom claims
+    token["email"] = user.email
+    token["first_name"] = user.first_name
+    token["last_name"] = user.last_name
+    token["is_active"] = user.last_name
+    token["is_staff"] = user.is_staff and user.administers(restaurant)
+    token["is_superuser"] = user.is_superuser and user.administers(restaurant)
 
-        # Add custom claims
-        token["email"] = user.email
-        token["first_name"] = user.first_name
-        token["last_name"] = user.last_name
-        token["is_active"] = user.last_name
-        token["is_staff"] = user.is_staff
-        token["is_superuser"] = user.is_superuser
+    return token
 
-        return token
+
+# Token serializer
+class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
+    def get_token(self, user):
+        return restaurant_token(user, self.context["request"].restaurant)
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -51,7 +61,21 @@ class UserSerializer(serializers.ModelSerializer):
         }
 
 
+class NormalizedEmailField(serializers.EmailField):
+    """
+    Lowercases the address before the unique validator looks it up.
+    """
+
+    def to_internal_value(self, data):
+        return User.objects.normalize_email(super().to_internal_value(data))
+
+
 class UserRegistrationSerializer(serializers.ModelSerializer):
+    serializer_field_mapping = {
+        **serializers.ModelSerializer.serializer_field_mapping,
+        models.EmailField: NormalizedEmailField,
+    }
+
     class Meta:
         model = User
         fields = ["first_name", "last_name", "email", "password"]
@@ -72,7 +96,7 @@ class UserSerilizerWithToken(UserSerializer):
         }
 
     def get_token(self, obj):
-        refresh = RefreshToken.for_user(obj)
+        refresh = restaurant_token(obj, self.context["request"].restaurant)
         return {
             "refresh": str(refresh),
             "access": str(refresh.access_token),
@@ -80,12 +104,16 @@ class UserSerilizerWithToken(UserSerializer):
 
 
 class UserEditSerializer(serializers.ModelSerializer):
+    serializer_field_mapping = UserRegistrationSerializer.serializer_field_mapping
+
     class Meta:
         model = User
         fields = ["first_name", "last_name", "email", "image"]
 
 
 class SuperUserEditSerializer(serializers.ModelSerializer):
+    serializer_field_mapping = UserRegistrationSerializer.serializer_field_mapping
+
     class Meta:
         model = User
         fields = ["is_active", "is_staff"]
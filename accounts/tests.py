@@ -1,3 +1,125 @@
-from django.test import TestCase
+from importlib import import_module
 
-# Create your tests here.
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+
+from accounts.models import User
+from core.models import Restaurant
+
+
+class RestaurantTokenTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.restaurant = Restaurant.objects.get(slug=settings.DEFAULT_RESTAURANT)
+        self.uptown = Restaurant.objects.create(slug="uptown", name="Uptown")
+        self.admin = User.objects.create_superuser(email="admin@x.com", password="pw")
+
+    def login(self, email, password, restaurant=None):
+        headers = {"HTTP_X_RESTAURANT": restaurant} if restaurant else {}
+        response = self.client.post(
+            "/api/accounts/login", {"email": email, "password": password}, **headers
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.data["access"]
+
+    def get_users(self, token, restaurant=None):
+        headers = {"HTTP_X_RESTAURANT": restaurant} if restaurant else {}
+        return self.client.get(
+            "/api/accounts/users", HTTP_AUTHORIZATION=f"Bearer {token}", **headers
+        )
+
+    def test_token_is_accepted_by_its_restaurant(self):
+        token = self.login("admin@x.com", "pw")
+
+        self.assertEqual(self.get_users(token).status_code, 200)
+
+    def test_token_is_rejected_by_other_restaurants(self):
+        token = self.login("admin@x.com", "pw")
+
+        response = self.get_users(token, restaurant="uptown")
+
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.data["detail"].code, "wrong_restaurant")
+
+    def test_staff_rights_only_hold_in_own_restaurant(self):
+        token = self.login("admin@x.com", "pw", restaurant="uptown")
+
+        response = self.get_users(token, restaurant="uptown")
+
+        self.assertEqual(response.status_code, 403)
+
+    def test_refreshed_token_keeps_its_restaurant(self):
+        refresh = self.client.post(
+            "/api/accounts/login", {"email": "admin@x.com", "password": "pw"}
+        ).data["refresh"]
+
+        response = self.client.post("/api/accounts/refresh", {"refresh": refresh})
+        access = response.data["access"]
+
+        self.assertEqual(self.get_users(access, restaurant="uptown").status_code, 401)
+        self.assertEqual(self.get_users(access).status_code, 200)
+
+
+class EmailNormalizationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email=" Guest@X.com ", password="pw")
+
+    def test_email_is_stored_in_lowercase(self):
+        self.assertEqual(self.user.email, "guest@x.com")
+
+    def test_registration_rejects_email_differing_in_case(self):
+        response = self.client.post(
+            "/api/accounts/registration",
+            {
+                "first_name": "G",
+                "last_name": "H",
+                "email": "GUEST@x.com",
+                "password": "pw",
+            },
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("email", response.data)
+
+    def test_login_ignores_case(self):
+        response = self.client.post(
+            "/api/accounts/login", {"email": "GUEST@X.COM", "password": "pw"}
+        )
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_profile_is_found_by_email_in_any_case(self):
+        self.client.force_authenticate(self.user)
+
+        response = self.client.get("/api/accounts/me/Guest@X.com")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["email"], "guest@x.com")
+
+    def test_user_search_matches_lowercased_prefix(self):
+        admin = User.objects.create_superuser(email="admin@x.com", password="pw")
+        self.client.force_authenticate(admin)
+
+        response = self.client.get("/api/accounts/users", {"search": "GUE"})
+
+        emails = [user["email"] for user in response.data["results"]]
+        self.assertEqual(emails, ["guest@x.com"])
+
+    def test_migration_lowercases_emails_without_a_case_twin(self):
+        User.objects.filter(pk=self.user.pk).update(email="Guest@X.com")
+        twins = [
+            User.objects.create_user(email=email, password="pw")
+            for email in ["twin@x.com", "other@x.com"]
+        ]
+        User.objects.filter(pk=twins[1].pk).update(email="TWIN@x.com")
+
+        migration = import_module("accounts.migrations.0004_lowercase_emails")
+        migration.lowercase_emails(apps, None)
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.email, "guest@x.com")
+        twins[1].refresh_from_db()
+        self.assertEqual(twins[1].email, "TWIN@x.com")
@@ -20,5 +20,5 @@ urlpatterns = [
     path("registration", UserRegistrationView.as_view(), name="registration"),
     path("users", UserListView.as_view(), name="user-list"),
     path("me/<email>", MeView.as_view(), name="me"),
-    path("change-password", ChangePasswordAPIView.as_view(), name="user-list"),
+    path("change-password", ChangePasswordAPIView.as_view(), name="change-password"),
 ]
@@ -1,5 +1,3 @@
-from rest_framework.filters import SearchFilter
-from rest_framework_simplejwt.tokens import RefreshToken
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
@@ -15,11 +13,13 @@ from rest_framework.generics import (
     RetrieveUpdateDestroyAPIView,
 )
 
+from accounts.filters import EmailSearchFilter
 from accounts.models import User
 from accounts.serializers import (
     MyTokenObtainPairSerializer,
     UserRegistrationSerializer,
     UserSerilizerWithToken,
+    restaurant_token,
     UserSerializer,
     SuperUserEditSerializer,
     UserEditSerializer,
@@ -28,6 +28,7 @@ from accounts.serializers import (
 from accounts.permissions import IsSuperAdmin
 
 from core.permissions import IsOwner, IsMeOwner
+from core.throttling import TokenBucketThrottle
 
 
 class LoginView(TokenObtainPairView):
@@ -38,21 +39,24 @@ class LoginView(TokenObtainPairView):
 class UserRegistrationView(CreateAPIView):
     serializer_class = UserRegistrationSerializer
     permission_classes = [AllowAny]
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = "registration"
 
     def post(self, request, *args, **kwargs):
         serializer = UserRegistrationSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         user = serializer.save()
-        return Response(UserSerilizerWithToken(user, many=False).data)
+        return Response(UserSerilizerWithToken(user, context={"request": request}).data)
 
 
 class UserListView(ListAPIView):
     permission_classes = [IsAdminUser]
     serializer_class = UserSerializer
     queryset = User.objects.all()
-    filter_backends = [DjangoFilterBackend, SearchFilter]
+    filter_backends = [DjangoFilterBackend, EmailSearchFilter]
     filterset_fields = ["is_active", "is_staff", "is_superuser"]
-    search_fields = ["=email"]
+    # prefix of the email, an exact address matches too
+    search_fields = ["^email"]
 
 
 class UserDetailView(RetrieveUpdateDestroyAPIView):
@@ -65,6 +69,13 @@ class UserDetailView(RetrieveUpdateDestroyAPIView):
         else:
             return UserSerializer
 
+    def perform_update(self, serializer):
+        # staff are made staff of the restaurant that promotes them
+        if serializer.validated_data.get("is_staff"):
+            serializer.save(restaurant=self.request.restaurant)
+        else:
+            serializer.save()
+
 
 class MeView(RetrieveUpdateAPIView):
     permission_classes = [IsMeOwner]
@@ -72,6 +83,10 @@ class MeView(RetrieveUpdateAPIView):
     lookup_field = "email"
     lookup_url_kwarg = "email"
 
+    def get_object(self):
+        self.kwargs["email"] = User.objects.normalize_email(self.kwargs["email"])
+        return super().get_object()
+
     def get_serializer_class(self):
         if self.request.method == "PUT" or self.request.method == "PATCH":
             return UserEditSerializer
@@ -83,20 +98,11 @@ class MeView(RetrieveUpdateAPIView):
         user = self.get_object()
 
         # Generate new tokens
-        refresh = RefreshToken.for_user(user)
-        access = refresh.access_token
-
-        # Add custom claims to access token
-        access["email"] = user.email
-        access["first_name"] = user.first_name
-        access["last_name"] = user.last_name
-        access["is_active"] = user.last_name
-        access["is_staff"] = user.is_staff
-        access["is_superuser"] = user.is_superuser
+        refresh = restaurant_token(user, request.restaurant)
 
         return Response(
             {
-                "access": str(access),
+                "access": str(refresh.access_token),
                 "refresh": str(refresh),
                 "user": UserSerializer(user).data,
             }
@@ -0,0 +1,192 @@
+from datetime import date, datetime, time, timedelta
+
+from django.db import connections, router, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from core.models import (
+    ArchivedOrder,
+    ArchivedOrderItem,
+    Order,
+    OrderDailyRollup,
+    OrderItem,
+)
+from core.sales import local_range
+
+ORDER_FIELDS = [
+    "id",
+    "order_id",
+    "total_price",
+    "tax",
+    "is_active",
+    "is_paid",
+    "is_served",
+    "version",
+    "restaurant_id",
+    "user_id",
+    "created_at",
+    "updated_at",
+]
+ORDER_ITEM_FIELDS = [
+    "id",
+    "quantity",
+    "is_active",
+    "menu_id",
+    "order_id",
+    "created_at",
+    "updated_at",
+]
+
+
+def archive_cutoff(days):
+    """
+    Local midnight `days` days ago, so only whole days are archived and the
+    daily rollups of archived days are complete.
+    """
+    day = timezone.localdate() - timedelta(days=days)
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def archive_orders(cutoff, batch_size=1000):
+    """
+    Move the orders created before `cutoff` and their items to the archive
+    tables, one batch per transaction. Returns the number of orders moved.
+    """
+    archived = 0
+    while True:
+        with transaction.atomic(using=router.db_for_write(Order)):
+            order_ids = list(
+                Order.objects.select_for_update()
+                .filter(created_at__lt=cutoff)
+                .order_by("id")
+                .values_list("id", flat=True)[:batch_size]
+            )
+            if not order_ids:
+                return archived
+
+            archive_batch(order_ids)
+            archived += len(order_ids)
+
+
+def archive_batch(order_ids):
+    orders = Order.objects.filter(id__in=order_ids)
+    items = OrderItem.objects.filter(order_id__in=order_ids)
+
+    order_rows = list(orders.values(*ORDER_FIELDS))
+    ensure_partitions(row["created_at"] for row in order_rows)
+    ArchivedOrder.objects.bulk_create(ArchivedOrder(**row) for row in order_rows)
+    ArchivedOrderItem.objects.bulk_create(
+        # archived items keep a copy of their menu snapshot
+        ArchivedOrderItem(**row)
+        for row in items.values(
+            *ORDER_ITEM_FIELDS,
+            name=F("menu_version__name"),
+            price=F("menu_version__price"),
+            image=F("menu_version__image"),
+        )
+    )
+
+    daily = (
+        orders.annotate(day=TruncDate("created_at"))
+        .values("restaurant_id", "day")
+        .annotate(
+            orders=Count("id"),
+            unpaid=Count("id", filter=Q(is_paid=False)),
+            not_served=Count("id", filter=Q(is_paid=True, is_served=False)),
+            served=Count("id", filter=Q(is_served=True)),
+            revenue=Sum("total_price"),
+        )
+        .order_by()
+    )
+    for row in daily:
+        rollup = {"restaurant_id": row.pop("restaurant_id"), "date": row.pop("day")}
+        OrderDailyRollup.objects.get_or_create(**rollup)
+        OrderDailyRollup.objects.filter(**rollup).update(
+            **{field: F(field) + value for field, value in row.items()}
+        )
+
+    items.delete()
+    orders.delete()
+
+
+def ensure_partitions(created_at):
+    """
+    Create the monthly partitions of a partitioned archive table (see
+    migration 0016) for the given creation times.
+    """
+    connection = connections[router.db_for_write(ArchivedOrder)]
+    if connection.vendor != "postgresql":
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table "
+            "WHERE partrelid = 'core_archivedorder'::regclass"
+        )
+        if cursor.fetchone() is None:
+            return
+
+        months = {
+            timezone.localtime(value).date().replace(day=1) for value in created_at
+        }
+        for month in months:
+            next_month = (month + timedelta(days=32)).replace(day=1)
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS core_archivedorder_{month:%Y_%m} "
+                f"PARTITION OF core_archivedorder "
+                f"FOR VALUES FROM (%s) TO (%s)",
+                [
+                    timezone.make_aware(datetime.combine(month, time.min)),
+                    timezone.make_aware(datetime.combine(next_month, time.min)),
+                ],
+            )
+
+
+def archived_order_counts(restaurant, start=None, end=None):
+    """
+    Totals of the archived orders of `restaurant` created between the
+    `start` and `end` dates (inclusive), read from the daily rollups.
+    """
+    rollups = OrderDailyRollup.objects.filter(restaurant=restaurant)
+    if start:
+        rollups = rollups.filter(date__gte=start)
+    if end:
+        rollups = rollups.filter(date__lte=end)
+
+    totals = rollups.aggregate(
+        orders=Sum("orders"),
+        unpaid=Sum("unpaid"),
+        not_served=Sum("not_served"),
+        served=Sum("served"),
+        revenue=Sum("revenue"),
+    )
+    return {field: value or 0 for field, value in totals.items()}
+
+
+def created_between(start_date, end_date):
+    """
+    `created_at` lookups selecting the local days from `start_date` to
+    `end_date` inclusive, the same days archived_order_counts() sums. Either
+    date may be None.
+    """
+    lookups = {}
+    if start_date:
+        lookups["created_at__gte"] = local_range(start_date, start_date)[0]
+    if end_date:
+        lookups["created_at__lt"] = local_range(end_date, end_date)[1]
+    return lookups
+
+
+def as_date(value):
+    """
+    Date part of a `created_at` filter value given as a date, datetime or
+    ISO formatted string, or None.
+    """
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return timezone.localtime(value).date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(value[:10])
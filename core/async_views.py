@@ -0,0 +1,180 @@
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.db.models import Avg, Count
+from django.http import JsonResponse
+from django.views import View
+from rest_framework.exceptions import AuthenticationFailed, Throttled, ValidationError
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.request import Request
+
+from accounts.authentication import RestaurantJWTAuthentication
+from core.throttling import TokenBucketThrottle
+from core.serializers import (
+    CampaignSerializer,
+    CategorySerializer,
+    ChefSerializer,
+    MenuSerializer,
+)
+from core.views import (
+    CategoryListCreateView,
+    MenuListCreateView,
+    TopRatedMenus,
+    CampaignListCreateView,
+    ChefListCreateView,
+)
+
+
+class AsyncReadView(View):
+    """
+    Serves GET requests with Django's async ORM so an ASGI worker can overlap
+    many concurrent reads. Every other method is handed to the regular DRF
+    view (``write_view``) so the URL keeps its full behaviour.
+    """
+
+    write_view = None
+    throttle_scope = None
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        # same as rest_framework's APIView, authentication is token based
+        view.csrf_exempt = True
+        return view
+
+    async def dispatch(self, request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            if self.write_view is None:
+                return await self.http_method_not_allowed(request, *args, **kwargs)
+            return await sync_to_async(self.write_view)(request, *args, **kwargs)
+
+        try:
+            request.user = await authenticate(request)
+        except AuthenticationFailed as exc:
+            return JsonResponse({"detail": exc.detail}, status=exc.status_code)
+
+        if self.throttle_scope:
+            throttle = TokenBucketThrottle()
+            allowed = await sync_to_async(throttle.allow_request)(
+                drf_request(request), self
+            )
+            if not allowed:
+                exc = Throttled(throttle.wait())
+                response = JsonResponse({"detail": exc.detail}, status=exc.status_code)
+                response["Retry-After"] = "%d" % exc.wait
+                return response
+
+        return await self.get(request, *args, **kwargs)
+
+
+async def authenticate(request):
+    if not request.META.get("HTTP_AUTHORIZATION"):
+        return AnonymousUser()
+
+    result = await sync_to_async(RestaurantJWTAuthentication().authenticate)(request)
+    if result is None:
+        return AnonymousUser()
+    return result[0]
+
+
+def drf_request(request):
+    """
+    Wrap an already authenticated request for reuse of the DRF views'
+    queryset and pagination logic.
+    """
+    wrapped = Request(request, authenticators=())
+    wrapped.user = request.user
+    return wrapped
+
+
+async def paginate(request, queryset, serializer_class):
+    """
+    Async equivalent of the default LimitOffsetPagination response. Also
+    accepts an already evaluated list of objects.
+    """
+    paginator = LimitOffsetPagination()
+    paginator.request = drf_request(request)
+    paginator.limit = paginator.get_limit(paginator.request)
+    paginator.offset = paginator.get_offset(paginator.request)
+
+    if isinstance(queryset, list):
+        paginator.count = len(queryset)
+    else:
+        paginator.count = await queryset.acount()
+
+    if paginator.limit is None:
+        objects = queryset
+    else:
+        objects = queryset[paginator.offset : paginator.offset + paginator.limit]
+    if not isinstance(objects, list):
+        objects = [obj async for obj in objects]
+
+    serializer = serializer_class(objects, many=True, context={"request": request})
+    return JsonResponse(
+        {
+            "count": paginator.count,
+            "next": paginator.get_next_link(),
+            "previous": paginator.get_previous_link(),
+            "results": serializer.data,
+        }
+    )
+
+
+class AsyncCategoryListView(AsyncReadView):
+    write_view = staticmethod(CategoryListCreateView.as_view())
+
+    async def get(self, request):
+        view = CategoryListCreateView(request=drf_request(request))
+        return await paginate(request, view.get_queryset(), CategorySerializer)
+
+
+class AsyncMenuListView(AsyncReadView):
+    write_view = staticmethod(MenuListCreateView.as_view())
+
+    async def get(self, request):
+        view = MenuListCreateView(request=drf_request(request))
+        queryset = (
+            view.get_queryset()
+            .select_related("category")
+            .annotate(review_count=Count("review", distinct=True))
+        )
+        if "avg_rating" not in queryset.query.annotations:
+            queryset = queryset.annotate(avg_rating=Avg("review__rating"))
+
+        category = request.GET.get("category")
+        if category:
+            if not category.isdigit():
+                return JsonResponse(
+                    {"category": ["Select a valid choice."]}, status=400
+                )
+            queryset = queryset.filter(category_id=category)
+        queryset = OrderingFilter().filter_queryset(view.request, queryset, view)
+
+        return await paginate(request, queryset, MenuSerializer)
+
+
+class AsyncTopRatedMenus(AsyncReadView):
+    async def get(self, request):
+        view = TopRatedMenus(request=drf_request(request))
+        try:
+            queryset = view.get_queryset()
+        except ValidationError as exc:
+            return JsonResponse(exc.detail, status=exc.status_code)
+        return await paginate(request, queryset, MenuSerializer)
+
+
+class AsyncCampaignListView(AsyncReadView):
+    write_view = staticmethod(CampaignListCreateView.as_view())
+
+    async def get(self, request):
+        view = CampaignListCreateView(request=drf_request(request))
+        queryset = await sync_to_async(view.get_queryset)()
+        return await paginate(request, queryset, CampaignSerializer)
+
+
+class AsyncChefListView(AsyncReadView):
+    write_view = staticmethod(ChefListCreateView.as_view())
+
+    async def get(self, request):
+        view = ChefListCreateView(request=drf_request(request))
+        return await paginate(request, view.get_queryset(), ChefSerializer)
@@ -0,0 +1,51 @@
+from datetime import datetime, time, timedelta
+
+from django.core.cache import cache
+from django.db import router
+from django.utils import timezone
+
+from core.models import Campaign
+
+ACTIVE_CAMPAIGNS_KEY = "active-campaigns:%s:%s"
+
+
+def active_campaigns_queryset(restaurant, day):
+    return Campaign.objects.filter(
+        restaurant=restaurant, is_active=True, start_date__lte=day, end_date__gte=day
+    )
+
+
+def active_campaigns(restaurant):
+    """
+    Campaigns of `restaurant` running today, in the local timezone.
+
+    The set only changes at midnight or when a campaign is saved, so it is
+    computed once per day and kept in the cache until the next midnight;
+    `invalidate_active_campaigns` drops it when a campaign changes.
+    """
+    today = timezone.localdate()
+    key = ACTIVE_CAMPAIGNS_KEY % (restaurant.slug, today.isoformat())
+
+    campaigns = cache.get(key)
+    if campaigns is None:
+        # the snapshot is rebuilt right after writes, a lagging replica
+        # would cache the campaigns as they were before the change
+        campaigns = list(
+            active_campaigns_queryset(restaurant, today).using(
+                router.db_for_write(Campaign)
+            )
+        )
+        cache.set(key, campaigns, seconds_until_midnight())
+    return campaigns
+
+
+def invalidate_active_campaigns(restaurant):
+    cache.delete(
+        ACTIVE_CAMPAIGNS_KEY % (restaurant.slug, timezone.localdate().isoformat())
+    )
+
+
+def seconds_until_midnight():
+    tomorrow = timezone.localdate() + timedelta(days=1)
+    midnight = timezone.make_aware(datetime.combine(tomorrow, time.min))
+    return max(int((midnight - timezone.now()).total_seconds()), 1)
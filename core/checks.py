@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Throttle buckets, replica pins and cache invalidations only reach the
+    other workers through a shared default cache.
+    """
+    backend = settings.CACHES["default"]["BACKEND"]
+    if backend == "django.core.cache.backends.locmem.LocMemCache":
+        return [
+            Warning(
+                "The default cache is local to each process, so every worker "
+                "keeps its own throttle buckets.",
+                hint="Set CACHE_URL to a cache all workers share, e.g. Redis.",
+                id="core.W001",
+            )
+        ]
+    return []
@@ -0,0 +1,51 @@
+from django_filters import rest_framework as filters
+
+from accounts.models import User
+from core.models import ArchivedOrder, Order, Resarvation, Review
+
+
+class UserEmailFilter(filters.CharFilter):
+    """
+    Filters on the owner's email through an indexed subquery on the user
+    id instead of joining `accounts_user`.
+    """
+
+    def filter(self, qs, value):
+        if not value:
+            return qs
+        user_ids = User.objects.filter(
+            email=User.objects.normalize_email(value)
+        ).values("id")
+        return qs.filter(user_id__in=user_ids)
+
+
+class OrderFilter(filters.FilterSet):
+    user__email = UserEmailFilter()
+
+    class Meta:
+        model = Order
+        fields = ["is_active", "is_paid", "is_served"]
+
+
+class ArchivedOrderFilter(filters.FilterSet):
+    user__email = UserEmailFilter()
+
+    class Meta:
+        model = ArchivedOrder
+        fields = ["is_paid", "is_served", "order_id"]
+
+
+class ResarvationFilter(filters.FilterSet):
+    user__email = UserEmailFilter()
+
+    class Meta:
+        model = Resarvation
+        fields = ["is_active"]
+
+
+class ReviewFilter(filters.FilterSet):
+    user__email = UserEmailFilter()
+
+    class Meta:
+        model = Review
+        fields = ["menu"]
@@ -0,0 +1,130 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.db import IntegrityError, router, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from core.models import IdempotencyKey
+
+
+class IdempotentCreateMixin:
+    """
+    Makes POST safe to retry. When the request carries an `Idempotency-Key`
+    header, the first request's response is stored and returned to every
+    retry with the same key instead of running the create path again.
+    A retry that arrives while the first request is still running gets
+    409 Conflict; once the first request has held the key for longer than
+    IDEMPOTENCY_KEY_LEASE, e.g. because its worker was killed, a retry takes
+    the key over and runs the create path itself.
+    """
+
+    idempotency_header = "Idempotency-Key"
+
+    def post(self, request, *args, **kwargs):
+        key = request.headers.get(self.idempotency_header)
+        if not key or not request.user.is_authenticated:
+            return super().post(request, *args, **kwargs)
+
+        if len(key) > IdempotencyKey._meta.get_field("key").max_length:
+            return Response(
+                {"detail": f"{self.idempotency_header} is too long."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        request_hash = hashlib.sha256(
+            json.dumps(request.data, sort_keys=True, default=str).encode()
+        ).hexdigest()
+        record, created = claim_key(request.user, request.path, key, request_hash)
+
+        if not created:
+            if record.request_hash != request_hash:
+                return Response(
+                    {
+                        "detail": f"{self.idempotency_header} was already used "
+                        "for a different request."
+                    },
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                )
+            if record.status_code is None:
+                return Response(
+                    {"detail": "A request with this key is still being processed."},
+                    status=status.HTTP_409_CONFLICT,
+                    headers={"Retry-After": "1"},
+                )
+            return Response(
+                record.response,
+                status=record.status_code,
+                headers={"Idempotent-Replayed": "true"},
+            )
+
+        try:
+            response = super().post(request, *args, **kwargs)
+        except Exception:
+            held_key(record).delete()
+            raise
+
+        if status.is_success(response.status_code):
+            held_key(record).update(
+                status_code=response.status_code, response=response.data
+            )
+        else:
+            # failed requests may be retried with the same key
+            held_key(record).delete()
+
+        return response
+
+
+def held_key(record):
+    """
+    The key claimed as `record`, unless a retry has taken it over since.
+    """
+    return IdempotencyKey.objects.filter(pk=record.pk, created_at=record.created_at)
+
+
+def claim_key(user, path, key, request_hash):
+    """
+    Insert the key, relying on its unique constraint to let only one of
+    several concurrent requests proceed. Returns `(record, created)`.
+    """
+    now = timezone.now()
+    lookup = {"user": user, "path": path, "key": key}
+
+    for _ in range(2):
+        try:
+            with transaction.atomic(using=router.db_for_write(IdempotencyKey)):
+                record = IdempotencyKey.objects.create(
+                    **lookup,
+                    request_hash=request_hash,
+                    expires_at=now + settings.IDEMPOTENCY_KEY_TTL,
+                )
+            return record, True
+        except IntegrityError:
+            record = IdempotencyKey.objects.filter(**lookup).first()
+            if record is None:
+                # deleted by the request that held it, try again
+                continue
+            if record.expires_at <= now:
+                record.delete()
+                continue
+            if (
+                record.status_code is None
+                and record.created_at <= now - settings.IDEMPOTENCY_KEY_LEASE
+            ):
+                # the request holding the key is presumed dead, only one of
+                # several concurrent retries wins the update
+                taken_over = held_key(record).update(
+                    request_hash=request_hash,
+                    created_at=now,
+                    expires_at=now + settings.IDEMPOTENCY_KEY_TTL,
+                )
+                if taken_over:
+                    record.request_hash = request_hash
+                    record.created_at = now
+                    return record, True
+                continue
+            return record, False
+
+    raise IntegrityError(f"Could not claim idempotency key {key!r}")
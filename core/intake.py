@@ -0,0 +1,166 @@
+"""
+Asynchronous order intake, enabled by ORDER_INTAKE_ASYNC.
+
+`POST /api/orders` checks the cart against the cached menu prices, queues
+it as an OrderIntake row and answers 202 Accepted with the order id. The
+`drain_order_intake` worker turns queued rows into orders in batches, one
+bulk_create and one UPDATE per table, and clients poll
+`orders/intake/<order_id>`.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, router, transaction
+from django.db.models import Case, DateTimeField, OuterRef, Subquery, Value, When
+
+from core.managers import orders_updated
+from core.menu_versions import current_menu_version
+from core.models import Menu, MenuVersion, Order, OrderIntake, OrderItem
+
+MENU_PRICES_KEY = "menu-prices:%s"
+
+
+def menu_prices(restaurant):
+    """
+    {menu id: {"name", "price", "menu_version"}} of the active menus of
+    `restaurant`, kept in the cache until a menu changes.
+    """
+    key = MENU_PRICES_KEY % restaurant.slug
+    prices = cache.get(key)
+    if prices is None:
+        # rebuilt right after menu writes, a lagging replica would cache
+        # the old prices
+        latest = MenuVersion.objects.filter(menu=OuterRef("pk")).order_by("-id")
+        menus = (
+            Menu.objects.using(router.db_for_write(Menu))
+            .filter(restaurant=restaurant, is_active=True)
+            .only("id", "name", "image", "price", "offer_price")
+            .annotate(menu_version_id=Subquery(latest.values("id")[:1]))
+        )
+        prices = {
+            menu.id: {
+                "name": menu.name,
+                "price": menu.current_price,
+                "menu_version": menu.menu_version_id or current_menu_version(menu).id,
+            }
+            for menu in menus
+        }
+        cache.set(key, prices, settings.MENU_PRICES_CACHE_SECONDS)
+    return prices
+
+
+def invalidate_menu_prices(restaurant):
+    cache.delete(MENU_PRICES_KEY % restaurant.slug)
+
+
+def drain_intake(batch_size):
+    """
+    Create the orders of up to `batch_size` queued intakes of the current
+    database and return the number of intakes taken.
+
+    The batch is written with one bulk_create per table. When that fails,
+    e.g. on a duplicate order id, the intakes are retried one by one and
+    those that still fail are kept with status `failed`.
+    """
+    database = router.db_for_write(OrderIntake)
+    with transaction.atomic(using=database):
+        intakes = list(
+            OrderIntake.objects.select_for_update(skip_locked=True)
+            .filter(status=OrderIntake.PENDING)
+            .order_by("id")[:batch_size]
+        )
+        if not intakes:
+            return 0
+
+        try:
+            with transaction.atomic(using=database):
+                orders = create_orders(intakes)
+        except DatabaseError:
+            orders = []
+            for intake in intakes:
+                try:
+                    with transaction.atomic(using=database):
+                        orders += create_orders([intake])
+                except DatabaseError as error:
+                    intake.status = OrderIntake.FAILED
+                    intake.error = str(error)
+                    intake.save(update_fields=["status", "error"])
+
+        OrderIntake.objects.filter(
+            pk__in=[intake.pk for intake in intakes], status=OrderIntake.PENDING
+        ).delete()
+
+    # bulk_create sends no post_save, the receivers of orders_updated (e.g.
+    # the kitchen queue) are told instead. New orders are neither paid nor
+    # served, so the post_save receivers have nothing else to do for them.
+    if orders:
+        orders_updated.send(
+            sender=Order,
+            order_ids=[order.pk for order in orders],
+            changes={},
+            using=database,
+        )
+    return len(intakes)
+
+
+def create_orders(intakes):
+    orders = [
+        Order(
+            restaurant_id=intake.restaurant_id,
+            user_id=intake.user_id,
+            order_id=intake.order_id,
+            total_price=intake.total_price,
+            tax=intake.tax,
+        )
+        for intake in intakes
+    ]
+    # menus deleted since the intake keep their items, as SET_NULL would
+    menu_ids = set(
+        Menu.objects.filter(
+            id__in={item["menu"] for intake in intakes for item in intake.items}
+        ).values_list("id", flat=True)
+    )
+
+    Order.objects.bulk_create(orders)
+    if orders[0].pk is None:
+        # backends that do not return the ids of inserted rows
+        ids = dict(
+            Order.objects.filter(
+                order_id__in=[order.order_id for order in orders]
+            ).values_list("order_id", "id")
+        )
+        for order in orders:
+            order.pk = ids[order.order_id]
+
+    OrderItem.objects.bulk_create(
+        OrderItem(
+            order=order,
+            menu_id=item["menu"] if item["menu"] in menu_ids else None,
+            menu_version_id=item["menu_version"],
+            quantity=item["quantity"],
+        )
+        for order, intake in zip(orders, intakes)
+        for item in intake.items
+    )
+
+    # the orders keep the time they were placed at, not the time they were
+    # drained; bulk_create sets auto_now fields to the current time
+    placed_at = {order.pk: intake.created_at for order, intake in zip(orders, intakes)}
+    Order.objects.filter(pk__in=placed_at).update(
+        created_at=placed_at_case("pk", placed_at),
+        updated_at=placed_at_case("pk", placed_at),
+    )
+    OrderItem.objects.filter(order_id__in=placed_at).update(
+        created_at=placed_at_case("order_id", placed_at),
+        updated_at=placed_at_case("order_id", placed_at),
+    )
+    return orders
+
+
+def placed_at_case(field, placed_at):
+    """
+    CASE expression giving rows the time of the order `field` refers to.
+    """
+    return Case(
+        *(When(**{field: pk}, then=Value(time)) for pk, time in placed_at.items()),
+        output_field=DateTimeField(),
+    )
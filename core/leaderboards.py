@@ -0,0 +1,240 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import Avg, Count, Sum
+
+from core.models import (
+    LeaderboardEntry,
+    Menu,
+    MenuRatingStats,
+    Restaurant,
+    Review,
+)
+
+
+def bayesian_score(rating_sum, review_count, mean, weight):
+    """
+    Average rating pulled towards the mean rating of all menus of the
+    restaurant by `weight` virtual reviews, so a single 5 star review does
+    not outrank a hundred 4.8s.
+    """
+    return (weight * mean + rating_sum) / (weight + review_count)
+
+
+def refresh_menu_stats(menu_ids=None):
+    """
+    Recompute the review totals of the given menus, or of every menu.
+    """
+    menus = Menu.objects.all()
+    reviews = Review.objects.all()
+    if menu_ids is not None:
+        menus = menus.filter(id__in=menu_ids)
+        reviews = reviews.filter(menu_id__in=menu_ids)
+
+    totals = {
+        row.pop("menu"): row
+        for row in reviews.values("menu")
+        .annotate(
+            review_count=Count("id"),
+            rating_sum=Sum("rating"),
+            avg_rating=Avg("rating"),
+        )
+        .order_by()
+    }
+    empty = {"review_count": 0, "rating_sum": 0, "avg_rating": None}
+    MenuRatingStats.objects.bulk_create(
+        [
+            MenuRatingStats(menu_id=menu_id, **totals.get(menu_id, empty))
+            for menu_id in menus.values_list("id", flat=True)
+        ],
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=["menu"],
+        update_fields=list(empty),
+    )
+
+
+def rebuild_leaderboards(restaurant_ids=None):
+    """
+    Rank the active menus of the given restaurants, or of every restaurant,
+    by Bayesian score, overall and per category, and store the top
+    LEADERBOARD_SIZE of each ranking. Reads one stats row per menu, never
+    the reviews.
+    """
+    restaurants = Restaurant.objects.order_by("id")
+    if restaurant_ids is not None:
+        restaurants = restaurants.filter(id__in=restaurant_ids)
+
+    with transaction.atomic(using=router.db_for_write(LeaderboardEntry)):
+        # serializes concurrent rebuilds of a restaurant, which would
+        # otherwise both insert
+        restaurant_ids = list(
+            restaurants.select_for_update().values_list("id", flat=True)
+        )
+
+        stats = MenuRatingStats.objects.filter(
+            menu__restaurant_id__in=restaurant_ids, menu__is_active=True
+        ).values_list(
+            "menu_id",
+            "menu__restaurant_id",
+            "menu__category_id",
+            "review_count",
+            "rating_sum",
+        )
+        LeaderboardEntry.objects.filter(restaurant_id__in=restaurant_ids).delete()
+        LeaderboardEntry.objects.bulk_create(rank_menus(list(stats)))
+
+
+def ranking_key(menu_id, review_count, rating_sum, mean):
+    # menus without reviews rank after every reviewed menu
+    return (
+        review_count > 0,
+        bayesian_score(
+            rating_sum, review_count, mean, settings.LEADERBOARD_PRIOR_WEIGHT
+        ),
+        review_count,
+        -menu_id,
+    )
+
+
+def rank_menus(stats):
+    # every restaurant is ranked against its own mean rating, so its boards
+    # only change with its own reviews
+    totals = defaultdict(lambda: [0, 0])
+    for _, restaurant_id, _, review_count, rating_sum in stats:
+        totals[restaurant_id][0] += review_count
+        totals[restaurant_id][1] += rating_sum
+    means = {
+        restaurant_id: rating_sum / reviews if reviews else 0
+        for restaurant_id, (reviews, rating_sum) in totals.items()
+    }
+
+    ranked = sorted(
+        (
+            ranking_key(menu_id, review_count, rating_sum, means[restaurant_id]),
+            menu_id,
+            restaurant_id,
+            category_id,
+        )
+        for menu_id, restaurant_id, category_id, review_count, rating_sum in stats
+    )
+    ranked.reverse()
+
+    # boards are keyed by (restaurant, category), category None is overall
+    boards = defaultdict(list)
+    for key, menu_id, restaurant_id, category_id in ranked:
+        # a menu without category only appears on the overall board
+        for board in {(restaurant_id, None), (restaurant_id, category_id)}:
+            if len(boards[board]) < settings.LEADERBOARD_SIZE:
+                boards[board].append((menu_id, key[1]))
+
+    return [
+        LeaderboardEntry(
+            restaurant_id=restaurant_id,
+            category_id=category_id,
+            menu_id=menu_id,
+            rank=rank,
+            score=score,
+        )
+        for (restaurant_id, category_id), menus in boards.items()
+        for rank, (menu_id, score) in enumerate(menus, 1)
+    ]
+
+
+def place_menus(menu_ids):
+    """
+    Update the leaderboards the given menus are on or belong on, the
+    overall board of their restaurant and the board of their category,
+    leaving every other board alone.
+
+    Scores depend on the mean rating of the restaurant, which moves with
+    every review, so the boards that are not touched drift slightly until
+    the next `rebuild_leaderboards`.
+    """
+    menus = defaultdict(dict)
+    for menu_id, restaurant_id, category_id, is_active in Menu.objects.filter(
+        id__in=menu_ids
+    ).values_list("id", "restaurant_id", "category_id", "is_active"):
+        menus[restaurant_id][menu_id] = category_id if is_active else None
+
+    for restaurant_id, categories in sorted(menus.items()):
+        with transaction.atomic(using=router.db_for_write(LeaderboardEntry)):
+            # serializes updates of the restaurant's boards, which would
+            # otherwise both insert
+            list(Restaurant.objects.select_for_update().filter(id=restaurant_id))
+
+            # a menu that left a board, deactivated or moved to another
+            # category, is still listed on it
+            boards = {None, *categories.values()}
+            boards.update(
+                LeaderboardEntry.objects.filter(
+                    restaurant_id=restaurant_id, menu_id__in=categories
+                ).values_list("category_id", flat=True)
+            )
+            totals = MenuRatingStats.objects.filter(
+                menu__restaurant_id=restaurant_id, menu__is_active=True
+            ).aggregate(reviews=Sum("review_count"), rating_sum=Sum("rating_sum"))
+            mean = totals["rating_sum"] / totals["reviews"] if totals["reviews"] else 0
+
+            for category_id in boards:
+                update_board(restaurant_id, category_id, set(categories), mean)
+
+
+def update_board(restaurant_id, category_id, menu_ids, mean):
+    """
+    Re-rank the listed menus of a board together with the changed
+    `menu_ids`. Only when a listed menu dropped to the bottom of a full
+    board, or off it, can a menu that is not listed deserve its place, and
+    only then is the whole category, or restaurant, ranked again.
+    """
+    entries = LeaderboardEntry.objects.filter(
+        restaurant_id=restaurant_id, category_id=category_id
+    )
+    listed = set(entries.values_list("menu_id", flat=True))
+
+    scope = MenuRatingStats.objects.filter(
+        menu__restaurant_id=restaurant_id, menu__is_active=True
+    )
+    if category_id is not None:
+        scope = scope.filter(menu__category_id=category_id)
+
+    def top_menus(stats):
+        ranked = sorted(
+            (ranking_key(menu_id, review_count, rating_sum, mean), menu_id)
+            for menu_id, review_count, rating_sum in stats.values_list(
+                "menu_id", "review_count", "rating_sum"
+            )
+        )
+        ranked.reverse()
+        return ranked[: settings.LEADERBOARD_SIZE]
+
+    top = top_menus(scope.filter(menu_id__in=listed | menu_ids))
+    if len(listed) >= settings.LEADERBOARD_SIZE and (
+        len(top) < settings.LEADERBOARD_SIZE or top[-1][1] in listed & menu_ids
+    ):
+        top = top_menus(scope)
+
+    entries.delete()
+    LeaderboardEntry.objects.bulk_create(
+        LeaderboardEntry(
+            restaurant_id=restaurant_id,
+            category_id=category_id,
+            menu_id=menu_id,
+            rank=rank,
+            score=key[1],
+        )
+        for rank, (key, menu_id) in enumerate(top, 1)
+    )
+
+
+def refresh_leaderboards(menu_ids=None):
+    """
+    Recompute the review totals of the given menus and update the
+    leaderboards they are on, or rebuild every leaderboard.
+    """
+    refresh_menu_stats(menu_ids)
+    if menu_ids is None:
+        rebuild_leaderboards()
+    else:
+        place_menus(menu_ids)
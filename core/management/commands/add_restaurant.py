@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from core.models import Restaurant
+from core.tenants import use_restaurant
+
+
+class Command(BaseCommand):
+    help = (
+        "Create a restaurant, in its own database when it is listed in "
+        "TENANT_DATABASES."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("slug")
+        parser.add_argument("name")
+
+    def handle(self, *args, **options):
+        with use_restaurant(options["slug"]):
+            restaurant, created = Restaurant.objects.get_or_create(
+                slug=options["slug"], defaults={"name": options["name"]}
+            )
+        if created:
+            self.stdout.write(self.style.SUCCESS(f"Created {restaurant}."))
+        else:
+            self.stdout.write(f"{restaurant} already exists.")
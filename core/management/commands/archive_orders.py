@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.archive import archive_cutoff, archive_orders
+from core.tenants import database_slugs, use_restaurant
+
+
+class Command(BaseCommand):
+    help = (
+        "Move orders older than ORDER_ARCHIVE_AFTER_DAYS days to the archive "
+        "tables and record their daily totals, in every restaurant database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=settings.ORDER_ARCHIVE_AFTER_DAYS,
+            help="Archive orders created more than this many days ago.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of orders moved per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        cutoff = archive_cutoff(options["days"])
+        archived = 0
+        for slug in database_slugs():
+            with use_restaurant(slug):
+                archived += archive_orders(cutoff, options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Archived {archived} orders created before {cutoff}.")
+        )
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from core.recommendations import build_recommendations
+from core.tenants import database_slugs, use_restaurant
+
+
+class Command(BaseCommand):
+    help = (
+        "Update the frequently-ordered-together recommendations with the "
+        "orders placed since the last run, in every restaurant database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Discard the stored counts and process every order again.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=2000,
+            help="Number of order items fetched from the database at a time.",
+        )
+
+    def handle(self, *args, **options):
+        orders = 0
+        for slug in database_slugs():
+            with use_restaurant(slug):
+                orders += build_recommendations(
+                    options["rebuild"], options["chunk_size"]
+                )
+        self.stdout.write(self.style.SUCCESS(f"Processed {orders} orders."))
@@ -0,0 +1,51 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.intake import drain_intake
+from core.tenants import database_slugs, use_restaurant
+
+
+class Command(BaseCommand):
+    help = (
+        "Create the orders queued by the asynchronous order intake, in every "
+        "restaurant database, until stopped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.ORDER_INTAKE_BATCH_SIZE,
+            help="Number of queued orders created per transaction.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=settings.ORDER_INTAKE_POLL_INTERVAL,
+            help="Seconds to wait when the queues are empty.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Drain the queues once and exit.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            drained = 0
+            for slug in database_slugs():
+                with use_restaurant(slug):
+                    while taken := drain_intake(options["batch_size"]):
+                        drained += taken
+
+            if options["once"]:
+                self.stdout.write(
+                    self.style.SUCCESS(f"Processed {drained} queued orders.")
+                )
+                return
+            if not drained:
+                close_old_connections()
+                time.sleep(options["interval"])
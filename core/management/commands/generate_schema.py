@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from server.schema import write_schema
+
+
+class Command(BaseCommand):
+    help = (
+        "Write the OpenAPI schema as JSON and YAML to OPENAPI_SCHEMA_DIR, "
+        "where the schema views serve it from."
+    )
+
+    def handle(self, *args, **options):
+        for path in write_schema():
+            self.stdout.write(self.style.SUCCESS(f"Wrote {path}."))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import IdempotencyKey
+from core.tenants import database_slugs, use_restaurant
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete expired idempotency keys and their stored responses, in every "
+        "restaurant database."
+    )
+
+    def handle(self, *args, **options):
+        deleted = 0
+        for slug in database_slugs():
+            with use_restaurant(slug):
+                deleted += IdempotencyKey.objects.filter(
+                    expires_at__lte=timezone.now()
+                ).delete()[0]
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired keys."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core.leaderboards import refresh_leaderboards
+from core.tenants import database_slugs, use_restaurant
+
+
+class Command(BaseCommand):
+    help = "Recompute the review totals of every menu and the top rated leaderboards."
+
+    def handle(self, *args, **options):
+        for slug in database_slugs():
+            with use_restaurant(slug):
+                refresh_leaderboards()
+        self.stdout.write(self.style.SUCCESS("Leaderboards rebuilt."))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from core.sales import rollup_sales
+from core.tenants import database_slugs, use_restaurant
+
+
+class Command(BaseCommand):
+    help = (
+        "Roll up the hourly sales per menu of the hours completed since the "
+        "last run, for the sales analytics of long ranges, in every "
+        "restaurant database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Discard the stored rollups and roll up every order again.",
+        )
+
+    def handle(self, *args, **options):
+        hours = 0
+        for slug in database_slugs():
+            with use_restaurant(slug):
+                hours += rollup_sales(options["rebuild"])
+        self.stdout.write(self.style.SUCCESS(f"Rolled up {hours} hours."))
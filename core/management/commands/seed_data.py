@@ -0,0 +1,427 @@
+import random
+import time as clock
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+from itertools import accumulate
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import router, transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from accounts.models import User
+from core.leaderboards import refresh_leaderboards
+from core.models import (
+    Category,
+    Menu,
+    MenuVersion,
+    Order,
+    OrderItem,
+    Resarvation,
+    Review,
+    UserMenuPurchase,
+)
+from core.recommendations import build_recommendations
+from core.sales import rollup_sales
+from core.tenants import use_restaurant
+
+# fmt: off
+# relative number of orders per hour of the day: lunch and dinner peaks
+HOUR_WEIGHTS = [
+    0.2, 0.1, 0.05, 0.05, 0.05, 0.1, 0.3, 0.8, 1.5, 1.5, 1.8, 3.5,
+    6.0, 5.5, 3.0, 1.8, 1.8, 2.5, 4.5, 6.5, 6.0, 4.0, 2.0, 0.8,
+]
+
+CUISINES = [
+    "Bengali", "Indian", "Chinese", "Thai", "Italian", "Mexican", "Turkish",
+    "Japanese", "Korean", "Lebanese", "Continental", "Fast Food",
+]
+
+DISHES = [
+    "Biryani", "Kacchi", "Khichuri", "Curry", "Tehari", "Kebab", "Naan",
+    "Fried Rice", "Chowmein", "Soup", "Pad Thai", "Pizza", "Pasta", "Burger",
+    "Taco", "Shawarma", "Sushi", "Ramen", "Bibimbap", "Falafel", "Steak",
+    "Sandwich", "Salad", "Lassi", "Falooda", "Pitha", "Mishti Doi",
+]
+# fmt: on
+
+STYLES = ["Chicken", "Beef", "Mutton", "Prawn", "Fish", "Vegetable", "Special"]
+
+
+def chunks(total, size):
+    for start in range(0, total, size):
+        yield range(start, min(start + size, total))
+
+
+@contextmanager
+def historical_timestamps(*models):
+    """
+    Let bulk_create keep the `created_at`/`updated_at`/`date_joined` values
+    set on the objects instead of overwriting them with the current time.
+
+    Switches the fields off for the whole process, which is only safe in a
+    command that saves nothing else meanwhile.
+    """
+    fields = [
+        field
+        for model in models
+        for field in model._meta.concrete_fields
+        if getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the database with synthetic users, menus, orders, reviews and "
+        "reservations for development and benchmarking."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--restaurant",
+            default=settings.DEFAULT_RESTAURANT,
+            help="Slug of the restaurant the data is created for.",
+        )
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--categories", type=int, default=12)
+        parser.add_argument("--menus", type=int, default=150)
+        parser.add_argument("--orders", type=int, default=20000)
+        parser.add_argument("--reviews", type=int, default=5000)
+        parser.add_argument("--reservations", type=int, default=2000)
+        parser.add_argument(
+            "--days", type=int, default=365, help="Length of the order history."
+        )
+        parser.add_argument(
+            "--password",
+            default="password",
+            help="Password of every generated user.",
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--seed", type=int, help="Random seed, for repeatable data."
+        )
+        parser.add_argument(
+            "--skip-derived",
+            action="store_true",
+            help="Do not rebuild leaderboards, recommendations and sales rollups.",
+        )
+
+    def handle(self, *args, **options):
+        # orders, reviews and reservations need someone to place them and
+        # something to order
+        for option in ["users", "categories", "menus", "days", "batch_size"]:
+            if options[option] < 1:
+                name = option.replace("_", "-")
+                raise CommandError(f"--{name} must be at least 1.")
+        with use_restaurant(options["restaurant"]) as restaurant:
+            if restaurant is None:
+                raise CommandError(f"Unknown restaurant {options['restaurant']!r}.")
+            self.restaurant = restaurant
+            self.seed(options)
+
+    def seed(self, options):
+        self.random = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        self.now = timezone.now()
+        self.days = options["days"]
+        # keeps emails, names and order ids of repeated runs unique
+        self.run = uuid.uuid4().hex[:8]
+        self.day_weights = self.weigh_days()
+        self.hour_weights = list(accumulate(HOUR_WEIGHTS))
+
+        with historical_timestamps(
+            User, Category, Menu, MenuVersion, Order, OrderItem, Review, Resarvation
+        ):
+            user_ids = self.step("users", self.create_users, options)
+            category_ids = self.step("categories", self.create_categories, options)
+            menus = self.step("menus", self.create_menus, options, category_ids)
+            self.step("orders", self.create_orders, options, user_ids, menus)
+            self.step("reviews", self.create_reviews, options, user_ids, menus)
+            self.step("reservations", self.create_reservations, options, user_ids)
+
+        if not options["skip_derived"]:
+            self.step("leaderboards", lambda options: refresh_leaderboards(), options)
+            self.step(
+                "recommendations", lambda options: build_recommendations(), options
+            )
+            # the seeded history lies before hours that may be rolled up
+            # already, e.g. by seeding another restaurant
+            self.step(
+                "sales rollups", lambda options: rollup_sales(rebuild=True), options
+            )
+
+    def step(self, name, create, options, *args):
+        started = clock.monotonic()
+        result = create(options, *args)
+        self.stdout.write(f"{name}: {clock.monotonic() - started:.1f}s")
+        return result
+
+    def weigh_days(self):
+        """
+        Cumulative weights of the last `days` days (0 is today): linear
+        growth towards today and busier Fridays and Saturdays.
+        """
+        today = timezone.localdate(self.now)
+        weights = []
+        for offset in range(self.days):
+            weight = 2 - offset / self.days
+            if (today - timedelta(days=offset)).weekday() in (4, 5):
+                weight *= 1.4
+            weights.append(weight)
+        return list(accumulate(weights))
+
+    def timestamp(self):
+        """
+        A moment in the last `days` days, weighted by day and hour of day.
+        """
+        day = self.random.choices(range(self.days), cum_weights=self.day_weights)[0]
+        hour = self.random.choices(range(24), cum_weights=self.hour_weights)[0]
+        local_day = timezone.localdate(self.now) - timedelta(days=day)
+        moment = timezone.make_aware(
+            datetime.combine(local_day, time(hour, self.random.randrange(60)))
+        )
+        moment += timedelta(seconds=self.random.randrange(60))
+        # later today: move to yesterday rather than piling up at `now`
+        if moment > self.now:
+            moment -= timedelta(days=1)
+        return moment
+
+    def create_users(self, options):
+        password = make_password(options["password"])
+        for batch in chunks(options["users"], self.batch_size):
+            User.objects.bulk_create(
+                [
+                    User(
+                        email=f"seed-{self.run}-{i}@example.com",
+                        first_name=f"User{i}",
+                        last_name="Seed",
+                        password=password,
+                        date_joined=self.now
+                        - timedelta(seconds=self.random.randrange(self.days * 86400)),
+                    )
+                    for i in batch
+                ]
+            )
+        return list(
+            User.objects.filter(email__startswith=f"seed-{self.run}-").values_list(
+                "id", flat=True
+            )
+        )
+
+    def create_categories(self, options):
+        categories = []
+        for i in range(options["categories"]):
+            name = f"{CUISINES[i % len(CUISINES)]} {self.run}-{i}"
+            categories.append(
+                Category(
+                    restaurant=self.restaurant,
+                    name=name,
+                    slug=slugify(name),
+                    created_at=self.now,
+                    updated_at=self.now,
+                )
+            )
+        Category.objects.bulk_create(categories)
+        return list(
+            Category.objects.filter(
+                restaurant=self.restaurant,
+                slug__in=[category.slug for category in categories],
+            ).values_list("id", flat=True)
+        )
+
+    def create_menus(self, options, category_ids):
+        menus = []
+        for i in range(options["menus"]):
+            name = (
+                f"{self.random.choice(STYLES)} {self.random.choice(DISHES)} "
+                f"{self.run}-{i}"
+            )
+            price = round(self.random.uniform(2, 30), 2)
+            on_offer = self.random.random() < 0.2
+            menus.append(
+                Menu(
+                    restaurant=self.restaurant,
+                    name=name,
+                    slug=slugify(name),
+                    category_id=self.random.choice(category_ids),
+                    image="menus/seed.jpg",
+                    price=price,
+                    offer_price=round(price * 0.8, 2) if on_offer else 0,
+                    description=f"{name}, freshly prepared.",
+                    cook_time=self.random.randrange(5, 45),
+                    created_at=self.now,
+                    updated_at=self.now,
+                )
+            )
+        Menu.objects.bulk_create(menus)
+
+        menus = list(
+            Menu.objects.filter(
+                restaurant=self.restaurant, slug__in=[menu.slug for menu in menus]
+            ).only("id", "name", "image", "price", "offer_price")
+        )
+        # bulk_create skips the snapshot written on save
+        versions = MenuVersion.objects.bulk_create(
+            [
+                MenuVersion(
+                    menu=menu,
+                    name=menu.name,
+                    price=menu.current_price,
+                    image=menu.image.name,
+                    created_at=self.now,
+                )
+                for menu in menus
+            ]
+        )
+        if versions[0].pk is None:
+            # backends that can not return the ids of inserted rows
+            versions = MenuVersion.objects.filter(menu__in=menus).order_by("menu_id")
+            menus.sort(key=lambda menu: menu.id)
+        for menu, version in zip(menus, versions):
+            menu.menu_version_id = version.pk
+
+        # Zipf like popularity: a few menus get most of the orders
+        self.random.shuffle(menus)
+        self.popularity = list(
+            accumulate(1 / (rank + 1) ** 1.1 for rank in range(len(menus)))
+        )
+        # the average rating reviews of each menu are drawn around
+        self.quality = {menu.id: self.random.uniform(2.8, 4.9) for menu in menus}
+        return menus
+
+    def pick_menus(self, menus, count):
+        picked = set()
+        while len(picked) < count:
+            picked.add(self.random.choices(menus, cum_weights=self.popularity)[0])
+        return picked
+
+    def create_orders(self, options, user_ids, menus):
+        for batch in chunks(options["orders"], self.batch_size):
+            orders, baskets = [], []
+            for i in batch:
+                created_at = self.timestamp()
+                recent = self.now - created_at < timedelta(hours=2)
+                size = self.random.choices([1, 2, 3, 4], weights=[4, 3, 2, 1])[0]
+                basket = [
+                    (menu, self.random.choices([1, 2, 3], weights=[7, 2, 1])[0])
+                    for menu in self.pick_menus(menus, min(size, len(menus)))
+                ]
+                total = round(
+                    sum(menu.current_price * quantity for menu, quantity in basket), 2
+                )
+                orders.append(
+                    Order(
+                        restaurant=self.restaurant,
+                        order_id=f"{created_at:%Y%m%d%H%M%S}-{self.run}-{i}",
+                        user_id=self.random.choice(user_ids),
+                        total_price=total,
+                        tax=round(total * 0.05, 2),
+                        is_active=self.random.random() > 0.03,
+                        is_paid=not recent or self.random.random() < 0.5,
+                        is_served=not recent,
+                        created_at=created_at,
+                        updated_at=created_at,
+                    )
+                )
+                baskets.append(basket)
+
+            with transaction.atomic(using=router.db_for_write(Order)):
+                Order.objects.bulk_create(orders)
+                if orders[0].pk is None:
+                    # backends that can not return the ids of inserted rows
+                    ids = dict(
+                        Order.objects.filter(
+                            order_id__in=[order.order_id for order in orders]
+                        ).values_list("order_id", "id")
+                    )
+                    for order in orders:
+                        order.pk = ids[order.order_id]
+
+                OrderItem.objects.bulk_create(
+                    [
+                        OrderItem(
+                            order_id=order.pk,
+                            menu_id=menu.id,
+                            menu_version_id=menu.menu_version_id,
+                            quantity=quantity,
+                            created_at=order.created_at,
+                            updated_at=order.created_at,
+                        )
+                        for order, basket in zip(orders, baskets)
+                        for menu, quantity in basket
+                    ],
+                    batch_size=self.batch_size,
+                )
+                # what the order signals record for served orders
+                UserMenuPurchase.objects.bulk_create(
+                    [
+                        UserMenuPurchase(user_id=order.user_id, menu_id=menu.id)
+                        for order, basket in zip(orders, baskets)
+                        if order.is_paid and order.is_served
+                        for menu, _ in basket
+                    ],
+                    batch_size=self.batch_size,
+                    ignore_conflicts=True,
+                )
+
+    def create_reviews(self, options, user_ids, menus):
+        # a user reviews a menu at most once
+        count = min(options["reviews"], len(user_ids) * len(menus))
+        reviewed = set()
+        for batch in chunks(count, self.batch_size):
+            reviews = []
+            while len(reviews) < len(batch):
+                user_id = self.random.choice(user_ids)
+                menu = self.random.choices(menus, cum_weights=self.popularity)[0]
+                if (user_id, menu.id) in reviewed:
+                    continue
+                reviewed.add((user_id, menu.id))
+                rating = round(self.random.gauss(self.quality[menu.id], 0.9))
+                created_at = self.timestamp()
+                reviews.append(
+                    Review(
+                        user_id=user_id,
+                        menu_id=menu.id,
+                        rating=min(max(rating, 1), 5),
+                        comment="Seeded review.",
+                        created_at=created_at,
+                        updated_at=created_at,
+                    )
+                )
+            Review.objects.bulk_create(reviews)
+
+    def create_reservations(self, options, user_ids):
+        statuses = [status for status, _ in Resarvation.RESERVATION_STATUS]
+        for batch in chunks(options["reservations"], self.batch_size):
+            reservations = []
+            for i in batch:
+                created_at = self.timestamp()
+                reservations.append(
+                    Resarvation(
+                        restaurant=self.restaurant,
+                        user_id=self.random.choice(user_ids),
+                        name=f"Guest {i}",
+                        phone=f"017{self.random.randrange(10**8):08d}",
+                        date=timezone.localdate(created_at)
+                        + timedelta(days=self.random.randrange(1, 14)),
+                        time=time(self.random.choice([12, 13, 19, 20, 21])),
+                        person=self.random.choices(
+                            range(1, 13), weights=[2, 8, 4, 6] + [1] * 8
+                        )[0],
+                        status=self.random.choices(statuses, weights=[2, 7, 1])[0],
+                        created_at=created_at,
+                        updated_at=created_at,
+                    )
+                )
+            Resarvation.objects.bulk_create(reservations)
@@ -0,0 +1,30 @@
+from django.db import models
+from django.db.models import F
+from django.dispatch import Signal
+from django.utils import timezone
+
+# sent with `order_ids`, `changes` and the database alias `using` after
+# update_status() changed orders, and with empty `changes` after the intake
+# worker created orders in bulk (see core.intake)
+orders_updated = Signal()
+
+
+class OrderQuerySet(models.QuerySet):
+    def update_status(self, **changes):
+        """
+        Apply the status `changes` to the selected orders in one UPDATE and
+        bump their version. Unlike update(), receivers of `orders_updated`
+        (e.g. the kitchen queue) are told which orders changed.
+        """
+        order_ids = list(self.values_list("pk", flat=True))
+        if not order_ids:
+            return 0
+
+        updated = self.filter(pk__in=order_ids).update(
+            **changes, version=F("version") + 1, updated_at=timezone.now()
+        )
+        if updated:
+            orders_updated.send(
+                sender=self.model, order_ids=order_ids, changes=changes, using=self.db
+            )
+        return updated
@@ -0,0 +1,75 @@
+"""
+Snapshots of the name, price and image of menus (MenuVersion).
+
+Order items reference the snapshot that was current when they were
+ordered instead of copying it, and a new snapshot is only written when a
+menu's name, price or image changes. Snapshots never change, so they are
+cached without expiry and order items are serialized from the cache.
+"""
+from django.core.cache import cache
+from django.db import router
+
+from core.models import MenuVersion
+
+MENU_VERSION_KEY = "menu-version:%s:%s"
+
+
+def snapshot_fields(menu):
+    return {"name": menu.name, "price": menu.current_price, "image": menu.image.name}
+
+
+def current_menu_version(menu):
+    """
+    Latest snapshot of `menu`, written first when the menu changed since.
+    """
+    fields = snapshot_fields(menu)
+    version = (
+        MenuVersion.objects.using(router.db_for_write(MenuVersion))
+        .filter(menu=menu)
+        .order_by("-id")
+        .first()
+    )
+    if version is None or fields != {
+        "name": version.name,
+        "price": version.price,
+        "image": version.image.name,
+    }:
+        version = MenuVersion.objects.create(menu=menu, **fields)
+    return version
+
+
+def get_menu_versions(ids):
+    """
+    {id: MenuVersion} of the snapshots `ids`, read from the cache and
+    fetched in one query when missing.
+    """
+    # ids are only unique within a database; read from the primary, a
+    # lagging replica may not have a snapshot written a moment ago yet
+    database = router.db_for_write(MenuVersion)
+    keys = {MENU_VERSION_KEY % (database, id): id for id in set(ids)}
+    versions = {keys[key]: version for key, version in cache.get_many(keys).items()}
+
+    missing = [id for id in keys.values() if id not in versions]
+    if missing:
+        fetched = MenuVersion.objects.using(database).in_bulk(missing)
+        cache.set_many(
+            {
+                MENU_VERSION_KEY % (database, id): version
+                for id, version in fetched.items()
+            },
+            timeout=None,
+        )
+        versions.update(fetched)
+    return versions
+
+
+def attach_menu_versions(items):
+    """
+    Set the snapshot of every order item in `items` from the cache, so
+    reading their name, price or image needs no query. Returns the items.
+    """
+    items = list(items)
+    versions = get_menu_versions(item.menu_version_id for item in items)
+    for item in items:
+        item.menu_version = versions[item.menu_version_id]
+    return items
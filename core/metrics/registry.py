@@ -0,0 +1,240 @@
+import bisect
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# totals of the workers that exited, kept so the counters never go back
+RETIRED = "retired.json"
+
+
+class MetricsRegistry:
+    """
+    Per-process request counters and latency histograms.
+
+    Recording a request only touches in-memory dicts. The totals of each
+    worker are periodically written to ``<METRICS_DIR>/<pid>-<start>.json``
+    so that any worker can aggregate the whole server when ``/metrics`` is
+    scraped. The files of workers that are gone are folded into
+    ``retired.json`` when collecting, so a reused pid never overwrites them
+    and the directory does not grow with every restart.
+    """
+
+    def __init__(self, directory, buckets, flush_interval):
+        self.directory = Path(directory)
+        self.buckets = tuple(buckets)
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.pid = os.getpid()
+        self.name = f"{self.pid}-{time.time_ns()}.json"
+        # (route, method, status) -> count
+        self.requests = defaultdict(int)
+        # (route, method) -> [count per bucket..., count above last bucket, sum]
+        self.latency = {}
+        self.next_flush = time.monotonic() + self.flush_interval
+
+    def observe(self, route, method, status, duration):
+        index = bisect.bisect_left(self.buckets, duration)
+        with self.lock:
+            self.requests[(route, method, status)] += 1
+            histogram = self.latency.get((route, method))
+            if histogram is None:
+                histogram = [0] * (len(self.buckets) + 1) + [0.0]
+                self.latency[(route, method)] = histogram
+            histogram[index] += 1
+            histogram[-1] += duration
+
+        if time.monotonic() >= self.next_flush:
+            self.flush()
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "requests": [
+                    [route, method, status, count]
+                    for (route, method, status), count in self.requests.items()
+                ],
+                "latency": [
+                    [route, method, histogram[:]]
+                    for (route, method), histogram in self.latency.items()
+                ],
+            }
+
+    def flush(self):
+        """
+        Write this worker's totals. Failing to is logged, never raised: the
+        request that triggered the flush must not fail because of it.
+        """
+        if os.getpid() != self.pid:
+            # forked after recording: the parent owns what was inherited
+            with self.lock:
+                self.reset()
+
+        self.next_flush = time.monotonic() + self.flush_interval
+        # threads of a worker may flush at the same time, each writes a
+        # complete snapshot through a file of its own
+        tmp_path = self.directory / f".{self.name}.{threading.get_ident()}.tmp"
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            write_json(tmp_path, self.snapshot())
+            os.replace(tmp_path, self.directory / self.name)
+        except OSError:
+            logger.warning(
+                "Could not write metrics to %s", self.directory, exc_info=True
+            )
+
+    def collect(self):
+        """
+        Aggregate the stored totals of every worker, including this one and
+        the ones that exited.
+        """
+        self.flush()
+        try:
+            self.retire_exited_workers()
+        except OSError:
+            logger.warning("Could not retire metrics files", exc_info=True)
+
+        requests = defaultdict(int)
+        latency = {}
+        for path in self.directory.glob("*.json"):
+            self.merge(read_json(path), requests, latency)
+        return requests, latency
+
+    def retire_exited_workers(self):
+        """
+        Fold the files of workers whose process is gone into RETIRED, under
+        a lock so that workers collecting at the same time fold each file
+        once.
+        """
+        with open(self.directory / ".lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            exited = [
+                path
+                for path in self.directory.glob("*-*.json")
+                if not process_exists(int(path.name.split("-", 1)[0]))
+            ]
+            if not exited:
+                return
+
+            requests = defaultdict(int)
+            latency = {}
+            for path in [self.directory / RETIRED, *exited]:
+                self.merge(read_json(path), requests, latency)
+            tmp_path = self.directory / f".{RETIRED}.tmp"
+            write_json(
+                tmp_path,
+                {
+                    "requests": [[*key, count] for key, count in requests.items()],
+                    "latency": [
+                        [*key, histogram] for key, histogram in latency.items()
+                    ],
+                },
+            )
+            os.replace(tmp_path, self.directory / RETIRED)
+            for path in exited:
+                path.unlink(missing_ok=True)
+
+    def merge(self, data, requests, latency):
+        if data is None:
+            return
+        for route, method, status, count in data["requests"]:
+            requests[(route, method, status)] += count
+        for route, method, histogram in data["latency"]:
+            if len(histogram) != len(self.buckets) + 2:
+                # written with a different bucket layout
+                continue
+            total = latency.setdefault(
+                (route, method), [0] * (len(self.buckets) + 1) + [0.0]
+            )
+            for i, value in enumerate(histogram):
+                total[i] += value
+
+    def render(self):
+        """
+        Render the aggregated metrics in the Prometheus text exposition format.
+        """
+        requests, latency = self.collect()
+
+        lines = [
+            "# HELP http_requests_total Total HTTP requests by route, method and status.",
+            "# TYPE http_requests_total counter",
+        ]
+        for (route, method, status), count in sorted(requests.items()):
+            labels = format_labels(route=route, method=method, status=status)
+            lines.append(f"http_requests_total{{{labels}}} {count}")
+
+        lines += [
+            "# HELP http_request_duration_seconds HTTP request latency by route and method.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (route, method), histogram in sorted(latency.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, histogram):
+                cumulative += count
+                labels = format_labels(route=route, method=method, le=str(bound))
+                lines.append(
+                    f"http_request_duration_seconds_bucket{{{labels}}} {cumulative}"
+                )
+            cumulative += histogram[-2]
+            labels = format_labels(route=route, method=method)
+            lines.append(
+                f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {cumulative}'
+            )
+            lines.append(
+                f"http_request_duration_seconds_sum{{{labels}}} {histogram[-1]}"
+            )
+            lines.append(
+                f"http_request_duration_seconds_count{{{labels}}} {cumulative}"
+            )
+
+        return "\n".join(lines) + "\n"
+
+
+def read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_json(path, data):
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+
+def process_exists(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # running as another user
+        return True
+    return True
+
+
+def format_labels(**labels):
+    return ",".join(f'{name}="{escape_label(value)}"' for name, value in labels.items())
+
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registry = MetricsRegistry(
+    directory=settings.METRICS_DIR,
+    buckets=settings.METRICS_LATENCY_BUCKETS,
+    flush_interval=settings.METRICS_FLUSH_INTERVAL,
+)
@@ -0,0 +1,35 @@
+import ipaddress
+
+from django.conf import settings
+from django.http import HttpResponse
+from rest_framework.permissions import BasePermission, IsAdminUser
+from rest_framework.views import APIView
+
+from core.metrics.registry import registry
+
+
+class FromMetricsNetwork(BasePermission):
+    """
+    Lets in clients connecting from one of METRICS_ALLOWED_NETWORKS, e.g. a
+    Prometheus server scraping the workers directly.
+    """
+
+    def has_permission(self, request, view):
+        try:
+            address = ipaddress.ip_address(request.META.get("REMOTE_ADDR", ""))
+        except ValueError:
+            return False
+        return any(
+            address in ipaddress.ip_network(network)
+            for network in settings.METRICS_ALLOWED_NETWORKS
+        )
+
+
+class MetricsView(APIView):
+    permission_classes = [FromMetricsNetwork | IsAdminUser]
+    swagger_schema = None
+
+    def get(self, request):
+        return HttpResponse(
+            registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+        )
@@ -0,0 +1,391 @@
+import hashlib
+import logging
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed, SuspiciousFileOperation
+from django.db import connections
+from django.http import JsonResponse
+from django.utils._os import safe_join
+
+from core.staticfiles import serve_file
+from core.tenants import get_restaurant, restaurant_database
+from server.routers import read_from_replica
+
+slow_request_logger = logging.getLogger("core.slow_requests")
+
+
+class QueryTimer:
+    """
+    execute_wrapper hook that accumulates the number and duration of the
+    queries run while a request is being handled.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.count += 1
+            self.duration += elapsed
+            self.queries.append((elapsed, sql))
+
+    def slowest(self, limit):
+        return sorted(self.queries, key=lambda query: query[0], reverse=True)[:limit]
+
+
+class DualModeMiddleware:
+    """
+    Base of the middleware below. They run in the mode of the chain they
+    are part of, synchronously under WSGI and as coroutines under ASGI, so
+    an ASGI request does not hop to a thread and back for every middleware.
+    Subclasses implement ``call`` and ``acall``.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.acall(request)
+        return self.call(request)
+
+
+class PerformanceMiddleware(DualModeMiddleware):
+    """
+    Records query count, DB time, view time and render time for every request
+    and exposes them through the ``Server-Timing`` response header. Requests
+    slower than ``SLOW_REQUEST_THRESHOLD_MS`` are written to the
+    ``core.slow_requests`` logger together with their slowest queries.
+
+    Disabled unless ``PERFORMANCE_INSTRUMENTATION`` is set, in which case
+    Django drops the middleware from the chain at startup.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PERFORMANCE_INSTRUMENTATION:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        self.threshold = settings.SLOW_REQUEST_THRESHOLD_MS / 1000
+        self.log_queries = settings.SLOW_REQUEST_LOG_QUERIES
+        if self.async_mode:
+            # the hooks only read the clock, no need to run them in a thread
+            self.process_view = self.aprocess_view
+            self.process_template_response = self.aprocess_template_response
+
+    def call(self, request):
+        timer = QueryTimer()
+        request._performance_timings = {}
+
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            self.time_queries(stack, timer)
+            response = self.get_response(request)
+        end = time.perf_counter()
+
+        return self.finish(request, response, timer, start, end)
+
+    async def acall(self, request):
+        timer = QueryTimer()
+        request._performance_timings = {}
+
+        start = time.perf_counter()
+        # connections belong to a thread; the sync views and ORM calls of an
+        # ASGI request all run in the request's one thread_sensitive thread,
+        # so the wrappers are installed and removed there
+        stack = ExitStack()
+        await sync_to_async(self.time_queries)(stack, timer)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        end = time.perf_counter()
+
+        return self.finish(request, response, timer, start, end)
+
+    @staticmethod
+    def time_queries(stack, timer):
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(timer))
+
+    def finish(self, request, response, timer, start, end):
+        timings = request._performance_timings
+        view_start = timings.get("view_start", end)
+        view_end = timings.get("view_end", end)
+        render_end = timings.get("render_end", view_end)
+
+        metrics = [
+            ("db", timer.duration, f"{timer.count} queries"),
+            ("view", view_end - view_start, None),
+            ("render", render_end - view_end, None),
+            ("total", end - start, None),
+        ]
+        response["Server-Timing"] = ", ".join(
+            self.format_metric(name, duration, description)
+            for name, duration, description in metrics
+        )
+
+        if end - start >= self.threshold:
+            self.log_slow_request(request, response, end - start, timer)
+
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        self.view_started(request)
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        self.view_started(request)
+
+    def process_template_response(self, request, response):
+        return self.view_finished(request, response)
+
+    async def aprocess_template_response(self, request, response):
+        return self.view_finished(request, response)
+
+    @staticmethod
+    def view_started(request):
+        request._performance_timings["view_start"] = time.perf_counter()
+
+    @staticmethod
+    def view_finished(request, response):
+        timings = request._performance_timings
+        timings["view_end"] = time.perf_counter()
+
+        def render_finished(response):
+            timings["render_end"] = time.perf_counter()
+
+        response.add_post_render_callback(render_finished)
+        return response
+
+    @staticmethod
+    def format_metric(name, duration, description=None):
+        metric = f"{name};dur={duration * 1000:.1f}"
+        if description:
+            metric += f';desc="{description}"'
+        return metric
+
+    def log_slow_request(self, request, response, duration, timer):
+        queries = "\n".join(
+            f"  {elapsed * 1000:.1f}ms {sql}"
+            for elapsed, sql in timer.slowest(self.log_queries)
+        )
+        slow_request_logger.warning(
+            "Slow request: %s %s -> %s in %.1fms (%d queries, %.1fms in DB)\n%s",
+            request.method,
+            request.get_full_path(),
+            response.status_code,
+            duration * 1000,
+            timer.count,
+            timer.duration * 1000,
+            queries,
+        )
+
+
+class MetricsMiddleware(DualModeMiddleware):
+    """
+    Records a request counter and latency observation per URL name (e.g.
+    ``core:orders``) in the in-process metrics registry exposed by
+    ``/metrics``. Disabled unless ``METRICS_ENABLED`` is set.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        # imported lazily so the registry is only configured when enabled
+        from core.metrics.registry import registry
+
+        super().__init__(get_response)
+        self.registry = registry
+
+    def call(self, request):
+        start = time.perf_counter()
+        response = self.get_response(request)
+        self.record(request, response, time.perf_counter() - start)
+        return response
+
+    async def acall(self, request):
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        self.record(request, response, time.perf_counter() - start)
+        return response
+
+    def record(self, request, response, duration):
+        match = request.resolver_match
+        route = match.view_name if match else "unmatched"
+        self.registry.observe(route, request.method, response.status_code, duration)
+
+
+class TenantMiddleware(DualModeMiddleware):
+    """
+    Sets ``request.restaurant`` to the restaurant named by the
+    ``X-Restaurant`` header (its slug, ``DEFAULT_RESTAURANT`` without one)
+    and sends the request's queries to that restaurant's database.
+    """
+
+    def call(self, request):
+        slug = self.slug(request)
+        with restaurant_database(slug):
+            restaurant = get_restaurant(slug)
+            if restaurant is None:
+                return self.unknown_restaurant()
+            request.restaurant = restaurant
+            return self.get_response(request)
+
+    async def acall(self, request):
+        slug = self.slug(request)
+        # the routing is a context variable, sync_to_async carries it into
+        # the thread the views run in
+        with restaurant_database(slug):
+            restaurant = await sync_to_async(get_restaurant)(slug)
+            if restaurant is None:
+                return self.unknown_restaurant()
+            request.restaurant = restaurant
+            return await self.get_response(request)
+
+    @staticmethod
+    def slug(request):
+        return request.headers.get("X-Restaurant") or settings.DEFAULT_RESTAURANT
+
+    @staticmethod
+    def unknown_restaurant():
+        return JsonResponse({"detail": "Unknown restaurant."}, status=404)
+
+
+class ReplicaRoutingMiddleware(DualModeMiddleware):
+    """
+    Lets safe requests to the views listed in ``REPLICA_READ_VIEWS`` read
+    from a replica. A client that has just written is pinned to the primary
+    for ``REPLICA_PIN_SECONDS`` so it reads its own writes.
+    """
+
+    safe_methods = ("GET", "HEAD", "OPTIONS")
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        self.views = set(settings.REPLICA_READ_VIEWS)
+        if self.async_mode:
+            self.process_view = self.aprocess_view
+
+    def call(self, request):
+        response = self.get_response(request)
+
+        token = getattr(request, "_replica_token", None)
+        if token is not None:
+            read_from_replica.reset(token)
+
+        if self.pins(request, response):
+            cache.set(self.pin_key(request), True, settings.REPLICA_PIN_SECONDS)
+
+        return response
+
+    async def acall(self, request):
+        response = await self.get_response(request)
+
+        # every ASGI request runs in a context of its own, there is nothing
+        # to restore for the next one
+        read_from_replica.set(False)
+
+        if self.pins(request, response):
+            await cache.aset(self.pin_key(request), True, settings.REPLICA_PIN_SECONDS)
+
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if self.reads_replica(request) and not cache.get(self.pin_key(request)):
+            request._replica_token = read_from_replica.set(True)
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        if self.reads_replica(request) and not await cache.aget(self.pin_key(request)):
+            read_from_replica.set(True)
+
+    def reads_replica(self, request):
+        return (
+            request.method in self.safe_methods
+            and request.resolver_match.view_name in self.views
+        )
+
+    def pins(self, request, response):
+        return request.method not in self.safe_methods and response.status_code < 400
+
+    @staticmethod
+    def pin_key(request):
+        # the bearer token identifies a user without touching the database
+        client = request.META.get("HTTP_AUTHORIZATION") or request.META.get(
+            "REMOTE_ADDR", ""
+        )
+        return "replica-pin:" + hashlib.sha1(client.encode()).hexdigest()
+
+
+class FileServingMiddleware(DualModeMiddleware):
+    """
+    Serves collected static files under ``STATIC_URL`` and uploaded media
+    under ``MEDIA_URL`` before the rest of the stack runs. Static files
+    whose names carry a content hash (see ``STATICFILES_STORAGE``) are
+    cached for a year, everything else for ``STATIC_MAX_AGE`` and
+    ``MEDIA_MAX_AGE`` and revalidated with its ETag. Disabled unless
+    ``SERVE_FILES`` is set.
+    """
+
+    methods = ("GET", "HEAD")
+
+    def __init__(self, get_response):
+        if not settings.SERVE_FILES:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        self.roots = [
+            (settings.STATIC_URL, settings.STATIC_ROOT, settings.STATIC_MAX_AGE),
+            (settings.MEDIA_URL, settings.MEDIA_ROOT, settings.MEDIA_MAX_AGE),
+        ]
+        # names written by ManifestStaticFilesStorage, e.g. "css/app.1f2e3d4c5b6a.css"
+        self.hashed = set(getattr(staticfiles_storage, "hashed_files", {}).values())
+
+    def call(self, request):
+        for name, root, max_age in self.files(request):
+            response = self.serve(request, name, root, max_age)
+            if response is not None:
+                return response
+        return self.get_response(request)
+
+    async def acall(self, request):
+        for name, root, max_age in self.files(request):
+            # only requests for files touch the disk, off the event loop
+            response = await sync_to_async(self.serve)(request, name, root, max_age)
+            if response is not None:
+                return response
+        return await self.get_response(request)
+
+    def files(self, request):
+        if request.method in self.methods:
+            for url, root, max_age in self.roots:
+                if url and root and request.path_info.startswith(url):
+                    yield request.path_info[len(url) :], root, max_age
+
+    def serve(self, request, name, root, max_age):
+        try:
+            path = safe_join(root, name)
+        except SuspiciousFileOperation:
+            return None
+
+        if root == settings.STATIC_ROOT and name in self.hashed:
+            cache_control = "public, max-age=31536000, immutable"
+        else:
+            cache_control = f"public, max-age={max_age}"
+        return serve_file(request, path, cache_control)
@@ -0,0 +1,136 @@
+# Generated by Django 4.1.5 on 2026-10-19 13:25
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def partition_archived_orders(apps, schema_editor):
+    """
+    With ORDER_ARCHIVE_PARTITIONING on PostgreSQL, recreate the still empty
+    archive table range partitioned by created_at. The archive_orders
+    command creates the monthly partitions it needs.
+    """
+    if (
+        schema_editor.connection.vendor != "postgresql"
+        or not settings.ORDER_ARCHIVE_PARTITIONING
+    ):
+        return
+
+    schema_editor.execute(
+        "ALTER TABLE core_archivedorder RENAME TO core_archivedorder_unpartitioned"
+    )
+    schema_editor.execute(
+        "CREATE TABLE core_archivedorder (LIKE core_archivedorder_unpartitioned "
+        "INCLUDING DEFAULTS INCLUDING CONSTRAINTS) PARTITION BY RANGE (created_at)"
+    )
+    schema_editor.execute("DROP TABLE core_archivedorder_unpartitioned")
+    # the partition key has to be part of the primary key
+    schema_editor.execute(
+        "ALTER TABLE core_archivedorder ADD PRIMARY KEY (id, created_at)"
+    )
+    for column in ["order_id", "user_id", "created_at"]:
+        schema_editor.execute(
+            f"CREATE INDEX core_archivedorder_{column}_idx "
+            f"ON core_archivedorder ({column})"
+        )
+    schema_editor.execute(
+        "CREATE TABLE core_archivedorder_default "
+        "PARTITION OF core_archivedorder DEFAULT"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("core", "0015_idempotencykey"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArchivedOrder",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("order_id", models.CharField(db_index=True, max_length=100)),
+                ("total_price", models.FloatField()),
+                ("tax", models.FloatField()),
+                ("is_active", models.BooleanField()),
+                ("is_paid", models.BooleanField()),
+                ("is_served", models.BooleanField()),
+                ("version", models.PositiveIntegerField(default=0)),
+                ("created_at", models.DateTimeField(db_index=True)),
+                ("updated_at", models.DateTimeField()),
+                ("archived_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        db_constraint=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-id"],
+            },
+        ),
+        migrations.CreateModel(
+            name="OrderDailyRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField(unique=True)),
+                ("orders", models.PositiveIntegerField(default=0)),
+                ("unpaid", models.PositiveIntegerField(default=0)),
+                ("not_served", models.PositiveIntegerField(default=0)),
+                ("served", models.PositiveIntegerField(default=0)),
+                ("revenue", models.FloatField(default=0)),
+            ],
+            options={
+                "ordering": ["-date"],
+            },
+        ),
+        migrations.CreateModel(
+            name="ArchivedOrderItem",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("quantity", models.IntegerField()),
+                ("price", models.FloatField()),
+                ("name", models.CharField(max_length=100)),
+                ("image", models.CharField(blank=True, max_length=100, null=True)),
+                ("is_active", models.BooleanField()),
+                ("created_at", models.DateTimeField()),
+                ("updated_at", models.DateTimeField()),
+                (
+                    "menu",
+                    models.ForeignKey(
+                        db_constraint=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to="core.menu",
+                    ),
+                ),
+                (
+                    "order",
+                    models.ForeignKey(
+                        db_constraint=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="order_items",
+                        to="core.archivedorder",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-id"],
+            },
+        ),
+        migrations.RunPython(partition_archived_orders, migrations.RunPython.noop),
+    ]
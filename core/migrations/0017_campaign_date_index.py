@@ -0,0 +1,19 @@
+# Generated by Django 4.1.5 on 2026-10-19 13:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0016_order_archive"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="campaign",
+            index=models.Index(
+                fields=["start_date", "end_date"], name="core_campai_start_d_c3f578_idx"
+            ),
+        ),
+    ]
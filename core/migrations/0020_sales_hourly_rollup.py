@@ -0,0 +1,53 @@
+# Generated by Django 4.1.5 on 2026-10-19 13:32
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0019_menu_leaderboards"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SalesHourlyRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("hour", models.DateTimeField()),
+                ("quantity", models.PositiveIntegerField(default=0)),
+                ("revenue", models.FloatField(default=0)),
+            ],
+            options={
+                "ordering": ["-hour"],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="orderitem",
+            index=models.Index(
+                fields=["created_at"], name="core_orderi_created_e266b2_idx"
+            ),
+        ),
+        migrations.AddField(
+            model_name="saleshourlyrollup",
+            name="menu",
+            field=models.ForeignKey(
+                null=True, on_delete=django.db.models.deletion.SET_NULL, to="core.menu"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="saleshourlyrollup",
+            index=models.Index(
+                fields=["hour", "menu"], name="core_salesh_hour_fb0859_idx"
+            ),
+        ),
+    ]
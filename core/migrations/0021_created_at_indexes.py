@@ -0,0 +1,25 @@
+# Generated by Django 4.1.5 on 2026-10-19 13:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0020_sales_hourly_rollup"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["created_at"], name="core_order_created_912d27_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="resarvation",
+            index=models.Index(
+                fields=["created_at"], name="core_resarv_created_84eb31_idx"
+            ),
+        ),
+    ]
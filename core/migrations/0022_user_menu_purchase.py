@@ -0,0 +1,106 @@
+# Generated by Django 4.1.5 on 2026-10-19 13:45
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min
+import django.db.models.deletion
+
+
+def record_purchases(apps, schema_editor):
+    """
+    Purchases of the paid and served orders, archived ones included.
+    """
+    UserMenuPurchase = apps.get_model("core", "UserMenuPurchase")
+    pairs = set()
+    for model in ("OrderItem", "ArchivedOrderItem"):
+        pairs.update(
+            apps.get_model("core", model)
+            .objects.filter(
+                order__is_paid=True, order__is_served=True, menu__isnull=False
+            )
+            .values_list("order__user_id", "menu_id")
+            .distinct()
+        )
+    UserMenuPurchase.objects.bulk_create(
+        [
+            UserMenuPurchase(user_id=user_id, menu_id=menu_id)
+            for user_id, menu_id in pairs
+        ],
+        batch_size=1000,
+    )
+
+
+def drop_duplicate_reviews(apps, schema_editor):
+    """
+    Keep the first review of every user and menu. Run `rebuild_leaderboards`
+    afterwards if any were dropped.
+    """
+    Review = apps.get_model("core", "Review")
+    duplicated = (
+        Review.objects.values("menu_id", "user_id")
+        .annotate(first_id=Min("id"), reviews=Count("id"))
+        .filter(reviews__gt=1)
+        .order_by()
+    )
+    for row in duplicated:
+        Review.objects.filter(menu_id=row["menu_id"], user_id=row["user_id"]).exclude(
+            id=row["first_id"]
+        ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("core", "0021_created_at_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserMenuPurchase",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="usermenupurchase",
+            name="menu",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="core.menu",
+            ),
+        ),
+        migrations.AddField(
+            model_name="usermenupurchase",
+            name="user",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="usermenupurchase",
+            constraint=models.UniqueConstraint(
+                fields=("user", "menu"), name="unique_user_menu_purchase"
+            ),
+        ),
+        migrations.RunPython(record_purchases, migrations.RunPython.noop),
+        migrations.RunPython(drop_duplicate_reviews, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="review",
+            constraint=models.UniqueConstraint(
+                fields=("menu", "user"), name="unique_menu_review"
+            ),
+        ),
+    ]
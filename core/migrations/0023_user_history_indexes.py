@@ -0,0 +1,31 @@
+# Generated by Django 4.1.5 on 2026-10-19 13:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0022_user_menu_purchase"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["user", "-id"], name="core_order_user_id_0d2601_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="resarvation",
+            index=models.Index(
+                fields=["user", "-id"], name="core_resarv_user_id_752e7a_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="review",
+            index=models.Index(
+                fields=["user", "-id"], name="core_review_user_id_582f68_idx"
+            ),
+        ),
+    ]
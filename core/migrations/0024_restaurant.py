@@ -0,0 +1,157 @@
+# Generated by Django 4.1.5 on 2026-10-19 13:56
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+TENANT_MODELS = [
+    "Campaign",
+    "Category",
+    "Menu",
+    "Order",
+    "Resarvation",
+    "Chef",
+    "ArchivedOrder",
+    "LeaderboardEntry",
+]
+
+
+def assign_default_restaurant(apps, schema_editor):
+    """
+    Existing rows belong to the restaurant this deployment served so far,
+    or to the restaurant owning the database when it is a tenant database.
+    """
+    Restaurant = apps.get_model("core", "Restaurant")
+    database = schema_editor.connection.alias
+    slug = next(
+        (
+            slug
+            for slug, alias in settings.TENANT_DATABASES.items()
+            if alias == database
+        ),
+        settings.DEFAULT_RESTAURANT,
+    )
+    restaurant, _ = Restaurant.objects.using(database).get_or_create(
+        slug=slug, defaults={"name": slug.replace("-", " ").title()}
+    )
+    for name in TENANT_MODELS:
+        apps.get_model("core", name).objects.using(database).filter(
+            restaurant__isnull=True
+        ).update(restaurant=restaurant)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0023_user_history_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Restaurant",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("is_active", models.BooleanField(default=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("name", models.CharField(max_length=100)),
+                ("slug", models.SlugField(unique=True)),
+            ],
+            options={
+                "ordering": ["-id"],
+            },
+        ),
+        migrations.AddField(
+            model_name="archivedorder",
+            name="restaurant",
+            field=models.ForeignKey(
+                db_constraint=False,
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                to="core.restaurant",
+            ),
+        ),
+        migrations.AddField(
+            model_name="campaign",
+            name="restaurant",
+            field=models.ForeignKey(
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                to="core.restaurant",
+            ),
+        ),
+        migrations.AddField(
+            model_name="category",
+            name="restaurant",
+            field=models.ForeignKey(
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                to="core.restaurant",
+            ),
+        ),
+        migrations.AddField(
+            model_name="chef",
+            name="restaurant",
+            field=models.ForeignKey(
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                to="core.restaurant",
+            ),
+        ),
+        migrations.AddField(
+            model_name="leaderboardentry",
+            name="restaurant",
+            field=models.ForeignKey(
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                to="core.restaurant",
+            ),
+        ),
+        migrations.AddField(
+            model_name="menu",
+            name="restaurant",
+            field=models.ForeignKey(
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                to="core.restaurant",
+            ),
+        ),
+        migrations.AddField(
+            model_name="order",
+            name="restaurant",
+            field=models.ForeignKey(
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                to="core.restaurant",
+            ),
+        ),
+        migrations.AddField(
+            model_name="resarvation",
+            name="restaurant",
+            field=models.ForeignKey(
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                to="core.restaurant",
+            ),
+        ),
+        migrations.RunPython(
+            assign_default_restaurant, migrations.RunPython.noop, elidable=True
+        ),
+    ]
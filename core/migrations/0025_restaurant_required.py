@@ -0,0 +1,216 @@
+# Generated by Django 4.1.5 on 2026-10-19 13:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0024_restaurant"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="archivedorder",
+            name="restaurant",
+            field=models.ForeignKey(
+                db_constraint=False,
+                db_index=False,
+                on_delete=django.db.models.deletion.PROTECT,
+                to="core.restaurant",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="campaign",
+            name="restaurant",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.PROTECT,
+                to="core.restaurant",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="category",
+            name="restaurant",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.PROTECT,
+                to="core.restaurant",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="chef",
+            name="restaurant",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.PROTECT,
+                to="core.restaurant",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="leaderboardentry",
+            name="restaurant",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                to="core.restaurant",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="menu",
+            name="restaurant",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.PROTECT,
+                to="core.restaurant",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="order",
+            name="restaurant",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.PROTECT,
+                to="core.restaurant",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="resarvation",
+            name="restaurant",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.PROTECT,
+                to="core.restaurant",
+            ),
+        ),
+        migrations.AlterModelOptions(
+            name="leaderboardentry",
+            options={"ordering": ["restaurant", "category", "rank"]},
+        ),
+        migrations.RemoveIndex(
+            model_name="campaign",
+            name="core_campai_start_d_c3f578_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="leaderboardentry",
+            name="core_leader_categor_829b4f_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="order",
+            name="core_order_user_id_0d2601_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="resarvation",
+            name="core_resarv_user_id_752e7a_idx",
+        ),
+        migrations.AlterField(
+            model_name="category",
+            name="name",
+            field=models.CharField(max_length=100),
+        ),
+        migrations.AlterField(
+            model_name="category",
+            name="slug",
+            field=models.SlugField(blank=True),
+        ),
+        migrations.AlterField(
+            model_name="menu",
+            name="name",
+            field=models.CharField(max_length=100),
+        ),
+        migrations.AlterField(
+            model_name="menu",
+            name="slug",
+            field=models.SlugField(blank=True),
+        ),
+        migrations.AddIndex(
+            model_name="archivedorder",
+            index=models.Index(
+                fields=["restaurant", "-id"], name="core_archiv_restaur_97f274_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="campaign",
+            index=models.Index(
+                fields=["restaurant", "start_date", "end_date"],
+                name="core_campai_restaur_b7682d_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="chef",
+            index=models.Index(
+                fields=["restaurant", "-id"], name="core_chef_restaur_3ae4c0_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="leaderboardentry",
+            index=models.Index(
+                fields=["restaurant", "category", "rank"],
+                name="core_leader_restaur_df2e71_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="menu",
+            index=models.Index(
+                fields=["restaurant", "category"], name="core_menu_restaur_47bb40_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["restaurant", "-id"], name="core_order_restaur_048d65_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["restaurant", "created_at"],
+                name="core_order_restaur_842692_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["restaurant", "user", "-id"],
+                name="core_order_restaur_1d139b_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="resarvation",
+            index=models.Index(
+                fields=["restaurant", "-id"], name="core_resarv_restaur_505b4f_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="resarvation",
+            index=models.Index(
+                fields=["restaurant", "user", "-id"],
+                name="core_resarv_restaur_90b46e_idx",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="category",
+            constraint=models.UniqueConstraint(
+                fields=("restaurant", "name"), name="unique_restaurant_category_name"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="category",
+            constraint=models.UniqueConstraint(
+                fields=("restaurant", "slug"), name="unique_restaurant_category_slug"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="menu",
+            constraint=models.UniqueConstraint(
+                fields=("restaurant", "name"), name="unique_restaurant_menu_name"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="menu",
+            constraint=models.UniqueConstraint(
+                fields=("restaurant", "slug"), name="unique_restaurant_menu_slug"
+            ),
+        ),
+    ]
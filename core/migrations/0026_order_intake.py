@@ -0,0 +1,69 @@
+# Generated by Django 4.1.5 on 2026-10-19 14:03
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("core", "0025_restaurant_required"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OrderIntake",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("order_id", models.CharField(max_length=100, unique=True)),
+                ("total_price", models.FloatField()),
+                ("tax", models.FloatField()),
+                ("items", models.JSONField()),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[("pending", "pending"), ("failed", "failed")],
+                        default="pending",
+                        max_length=10,
+                    ),
+                ),
+                ("error", models.TextField(blank=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "restaurant",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.PROTECT,
+                        to="core.restaurant",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["id"],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="orderintake",
+            index=models.Index(
+                fields=["status", "id"], name="core_orderi_status_3fc209_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,127 @@
+# Generated by Django 4.1.5 on 2026-10-19 14:30
+
+from itertools import groupby
+from operator import itemgetter
+
+from django.db import migrations, models
+from django.db.models import Min
+import django.db.models.deletion
+
+
+SNAPSHOT_FIELDS = ["menu_id", "name", "price", "image"]
+BATCH_SIZE = 1000
+
+
+def snapshot_menus(apps, schema_editor):
+    """
+    One snapshot per distinct name, price and image copied into the order
+    items so far, in the order they were first ordered, then a snapshot of
+    every menu whose current state differs from its latest one.
+    """
+    database = schema_editor.connection.alias
+    Menu = apps.get_model("core", "Menu")
+    MenuVersion = apps.get_model("core", "MenuVersion")
+    OrderItem = apps.get_model("core", "OrderItem")
+
+    copies = (
+        OrderItem.objects.using(database)
+        .values(*SNAPSHOT_FIELDS)
+        .annotate(first=Min("id"))
+        .order_by("first")
+    )
+    versions = {}
+    for copy in copies.iterator():
+        fields = {field: copy[field] for field in SNAPSHOT_FIELDS}
+        version = MenuVersion.objects.using(database).create(**fields)
+        versions[tuple(fields.values())] = version.id
+
+    # one pass over the items, sorted so that the items of a snapshot come
+    # in a row, instead of a table scan per snapshot
+    items = (
+        OrderItem.objects.using(database)
+        .order_by(*SNAPSHOT_FIELDS, "id")
+        .values_list("id", *SNAPSHOT_FIELDS)
+    )
+    for fields, rows in groupby(items.iterator(), key=itemgetter(slice(1, None))):
+        ids = [row[0] for row in rows]
+        for start in range(0, len(ids), BATCH_SIZE):
+            OrderItem.objects.using(database).filter(
+                id__in=ids[start : start + BATCH_SIZE]
+            ).update(menu_version=versions[fields])
+
+    for menu in Menu.objects.using(database).iterator():
+        fields = {
+            "name": menu.name,
+            "price": menu.offer_price if menu.offer_price > 0 else menu.price,
+            "image": menu.image.name,
+        }
+        latest = (
+            MenuVersion.objects.using(database)
+            .filter(menu=menu)
+            .order_by("-id")
+            .values(*fields)
+            .first()
+        )
+        if latest != fields:
+            MenuVersion.objects.using(database).create(menu=menu, **fields)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0026_order_intake"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MenuVersion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=100)),
+                ("price", models.FloatField()),
+                (
+                    "image",
+                    models.ImageField(blank=True, null=True, upload_to="menus/"),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "menu",
+                    models.ForeignKey(
+                        db_index=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="versions",
+                        to="core.menu",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-id"],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="menuversion",
+            index=models.Index(
+                fields=["menu", "-id"], name="core_menuve_menu_id_51545c_idx"
+            ),
+        ),
+        migrations.AddField(
+            model_name="orderitem",
+            name="menu_version",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="+",
+                to="core.menuversion",
+            ),
+        ),
+        migrations.RunPython(snapshot_menus, migrations.RunPython.noop, elidable=True),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.1.5 on 2026-10-19 14:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0027_menu_version"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="orderitem",
+            name="menu_version",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="+",
+                to="core.menuversion",
+            ),
+        ),
+        migrations.RemoveField(
+            model_name="orderitem",
+            name="image",
+        ),
+        migrations.RemoveField(
+            model_name="orderitem",
+            name="name",
+        ),
+        migrations.RemoveField(
+            model_name="orderitem",
+            name="price",
+        ),
+    ]
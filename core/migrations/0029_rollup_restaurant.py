@@ -0,0 +1,60 @@
+# Generated by Django 4.1.5 on 2026-10-19 15:00
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def assign_default_restaurant(apps, schema_editor):
+    """
+    Rollups written so far cover the orders of the restaurant owning the
+    database, the only one there was (see migration 0024).
+    """
+    Restaurant = apps.get_model("core", "Restaurant")
+    database = schema_editor.connection.alias
+    slug = next(
+        (
+            slug
+            for slug, alias in settings.TENANT_DATABASES.items()
+            if alias == database
+        ),
+        settings.DEFAULT_RESTAURANT,
+    )
+    restaurant = Restaurant.objects.using(database).get(slug=slug)
+    for name in ["OrderDailyRollup", "SalesHourlyRollup"]:
+        apps.get_model("core", name).objects.using(database).filter(
+            restaurant__isnull=True
+        ).update(restaurant=restaurant)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0028_order_item_menu_version_required"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="orderdailyrollup",
+            name="restaurant",
+            field=models.ForeignKey(
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                to="core.restaurant",
+            ),
+        ),
+        migrations.AddField(
+            model_name="saleshourlyrollup",
+            name="restaurant",
+            field=models.ForeignKey(
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                to="core.restaurant",
+            ),
+        ),
+        migrations.RunPython(
+            assign_default_restaurant, migrations.RunPython.noop, elidable=True
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.1.5 on 2026-10-19 15:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0029_rollup_restaurant"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="orderdailyrollup",
+            name="restaurant",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.PROTECT,
+                to="core.restaurant",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="saleshourlyrollup",
+            name="restaurant",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.PROTECT,
+                to="core.restaurant",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="orderdailyrollup",
+            name="date",
+            field=models.DateField(),
+        ),
+        migrations.AddConstraint(
+            model_name="orderdailyrollup",
+            constraint=models.UniqueConstraint(
+                fields=("restaurant", "date"), name="unique_restaurant_rollup_date"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="saleshourlyrollup",
+            index=models.Index(
+                fields=["restaurant", "hour"], name="core_salesh_restaur_9716f9_idx"
+            ),
+        ),
+    ]
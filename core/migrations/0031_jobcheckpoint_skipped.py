@@ -0,0 +1,18 @@
+# Generated by Django 4.1.5 on 2026-10-19 16:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0030_rollup_restaurant_required"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="jobcheckpoint",
+            name="skipped",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -1,3 +1,6 @@
+import secrets
+
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.db.models import Avg
 from django.utils import timezone
@@ -5,6 +8,15 @@ from django.core.validators import MaxValueValidator
 from django.utils.text import slugify
 
 from accounts.models import User
+from core.managers import OrderQuerySet
+
+
+def generate_order_id():
+    """
+    Creation time (YYYYMMDDHHMMSS) followed by random hex digits, so orders
+    placed within the same second get distinct ids.
+    """
+    return f"{timezone.now():%Y%m%d%H%M%S}{secrets.token_hex(4).upper()}"
 
 
 class BaseModel(models.Model):
@@ -16,7 +28,27 @@ class BaseModel(models.Model):
         abstract = True
 
 
+class Restaurant(BaseModel):
+    """
+    A branch served by this deployment. Menus, categories, orders,
+    reservations, chefs and campaigns belong to one restaurant, see
+    core.tenants.
+    """
+
+    name = models.CharField(max_length=100)
+    slug = models.SlugField(unique=True)
+
+    class Meta:
+        ordering = ["-id"]
+
+    def __str__(self):
+        return self.name
+
+
 class Campaign(BaseModel):
+    # every table below leads its indexes with the restaurant, so the
+    # foreign key needs no index of its own
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.PROTECT, db_index=False)
     title = models.CharField(max_length=200)
     description = models.TextField()
     image = models.ImageField(upload_to="campaign/")
@@ -25,18 +57,28 @@ class Campaign(BaseModel):
 
     class Meta:
         ordering = ["-id"]
+        indexes = [models.Index(fields=["restaurant", "start_date", "end_date"])]
 
     def __str__(self):
         return self.title
 
 
 class Category(BaseModel):
-    name = models.CharField(max_length=100, unique=True)
-    slug = models.SlugField(blank=True, null=False, unique=True)
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.PROTECT, db_index=False)
+    name = models.CharField(max_length=100)
+    slug = models.SlugField(blank=True, null=False)
 
     class Meta:
         verbose_name_plural = "Categories"
         ordering = ["-id"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["restaurant", "name"], name="unique_restaurant_category_name"
+            ),
+            models.UniqueConstraint(
+                fields=["restaurant", "slug"], name="unique_restaurant_category_slug"
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -48,9 +90,10 @@ class Category(BaseModel):
 
 
 class Menu(BaseModel):
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.PROTECT, db_index=False)
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True)
-    name = models.CharField(max_length=100, unique=True)
-    slug = models.SlugField(blank=True, null=False, unique=True)
+    name = models.CharField(max_length=100)
+    slug = models.SlugField(blank=True, null=False)
     image = models.ImageField(upload_to="menus/")
     price = models.FloatField()
     description = models.TextField()
@@ -59,6 +102,15 @@ class Menu(BaseModel):
 
     class Meta:
         ordering = ["-id"]
+        indexes = [models.Index(fields=["restaurant", "category"])]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["restaurant", "name"], name="unique_restaurant_menu_name"
+            ),
+            models.UniqueConstraint(
+                fields=["restaurant", "slug"], name="unique_restaurant_menu_slug"
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -77,14 +129,21 @@ class Menu(BaseModel):
 
     @property
     def total_reviews(self):
+        # use the `review_count` annotation when the queryset provides it
+        if hasattr(self, "review_count"):
+            return self.review_count
         return self.review_set.all().count()
 
     @property
     def rating(self):
+        # use the `avg_rating` annotation when the queryset provides it
+        if hasattr(self, "avg_rating"):
+            return {"rating__avg": self.avg_rating}
         return self.review_set.all().aggregate(Avg("rating"))
 
 
 class Order(BaseModel):
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.PROTECT, db_index=False)
     order_id = models.CharField(
         max_length=100,
         unique=True,
@@ -95,39 +154,85 @@ class Order(BaseModel):
     tax = models.FloatField()
     is_paid = models.BooleanField(default=False)
     is_served = models.BooleanField(default=False)
+    version = models.PositiveIntegerField(default=0)
 
     user = models.ForeignKey(User, on_delete=models.CASCADE)
 
+    objects = OrderQuerySet.as_manager()
+
+    STATUS_FIELDS = ["is_active", "is_paid", "is_served"]
+
+    # state: (flags the order must have, flags the transition sets)
+    TRANSITIONS = {
+        "paid": ({"is_active": True, "is_paid": False}, {"is_paid": True}),
+        "served": (
+            {"is_active": True, "is_paid": True, "is_served": False},
+            {"is_served": True},
+        ),
+        "cancelled": ({"is_active": True, "is_served": False}, {"is_active": False}),
+    }
+
     def save(self, *args, **kwargs):
         if not self.order_id:
-            now = timezone.now()
-            date_str = now.strftime("%Y%m%d")  # format: YYYYMMDD
-            time_str = now.strftime("%H%M%S")  # format: HHMMSS
-            self.order_id = f"{date_str}{time_str}"
+            self.order_id = generate_order_id()
         super().save(*args, **kwargs)
 
     class Meta:
         ordering = ["-id"]
+        indexes = [
+            models.Index(fields=["created_at"]),
+            models.Index(fields=["restaurant", "-id"]),
+            models.Index(fields=["restaurant", "created_at"]),
+            models.Index(fields=["restaurant", "user", "-id"]),
+        ]
 
     def __str__(self):
         return self.user.email
 
 
+class MenuVersion(models.Model):
+    """
+    Immutable snapshot of the name, price and image of a menu, written
+    whenever one of them changes (see core.menu_versions). Order items
+    reference the snapshot that was current when they were ordered.
+    """
+
+    menu = models.ForeignKey(
+        Menu,
+        related_name="versions",
+        on_delete=models.SET_NULL,
+        null=True,
+        db_index=False,
+    )
+    name = models.CharField(max_length=100)
+    price = models.FloatField()
+    image = models.ImageField(upload_to="menus/", blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-id"]
+        indexes = [models.Index(fields=["menu", "-id"])]
+
+    def __str__(self):
+        return self.name
+
+
 class OrderItem(BaseModel):
     quantity = models.IntegerField()
-    price = models.FloatField()
-    name = models.CharField(max_length=100)
-    image = models.ImageField(upload_to="OrderItems/", blank=True, null=True)
     menu = models.ForeignKey(Menu, on_delete=models.SET_NULL, null=True)
+    menu_version = models.ForeignKey(
+        MenuVersion, related_name="+", on_delete=models.PROTECT
+    )
     order = models.ForeignKey(
         Order, related_name="order_items", on_delete=models.CASCADE
     )
 
     class Meta:
         ordering = ["-id"]
+        indexes = [models.Index(fields=["created_at"])]
 
     def __str__(self):
-        return self.menu.name
+        return self.menu_version.name
 
 
 class Resarvation(BaseModel):
@@ -136,6 +241,7 @@ class Resarvation(BaseModel):
         ("confirmed", "confirmed"),
         ("cancelled", "cancelled"),
     )
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.PROTECT, db_index=False)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     name = models.CharField(max_length=100)
     phone = models.CharField(max_length=11)
@@ -152,6 +258,11 @@ class Resarvation(BaseModel):
 
     class Meta:
         ordering = ["-id"]
+        indexes = [
+            models.Index(fields=["created_at"]),
+            models.Index(fields=["restaurant", "-id"]),
+            models.Index(fields=["restaurant", "user", "-id"]),
+        ]
 
     def __str__(self):
         return self.user.email
@@ -165,6 +276,10 @@ class Review(BaseModel):
 
     class Meta:
         ordering = ["-id"]
+        indexes = [models.Index(fields=["user", "-id"])]
+        constraints = [
+            models.UniqueConstraint(fields=["menu", "user"], name="unique_menu_review")
+        ]
 
     def __str__(self):
         return self.menu.name
@@ -186,12 +301,14 @@ class Contact(models.Model):
 
 
 class Chef(BaseModel):
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.PROTECT, db_index=False)
     name = models.CharField(max_length=100)
     image = models.ImageField(upload_to="chefs/")
     short_description = models.CharField(max_length=255)
 
     class Meta:
         ordering = ["-id"]
+        indexes = [models.Index(fields=["restaurant", "-id"])]
 
     def __str__(self):
         return self.name
@@ -206,3 +323,296 @@ class EmailSubscription(models.Model):
 
     def __str__(self):
         return self.email
+
+
+class IdempotencyKey(models.Model):
+    """
+    Response of a POST made with an `Idempotency-Key` header, replayed to
+    retries of the same request until it expires.
+    """
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    path = models.CharField(max_length=255)
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    # both empty while the first request is being processed
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response = models.JSONField(encoder=DjangoJSONEncoder, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        ordering = ["-id"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "path", "key"], name="unique_idempotency_key"
+            )
+        ]
+
+    def __str__(self):
+        return self.key
+
+
+class ArchivedOrder(models.Model):
+    """
+    Order moved out of `core_order` by the `archive_orders` command. Keeps
+    the primary key of the original order.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    order_id = models.CharField(max_length=100, db_index=True)
+    total_price = models.FloatField()
+    tax = models.FloatField()
+    is_active = models.BooleanField()
+    is_paid = models.BooleanField()
+    is_served = models.BooleanField()
+    version = models.PositiveIntegerField(default=0)
+    # no database constraints so the table can be partitioned on PostgreSQL
+    restaurant = models.ForeignKey(
+        Restaurant, on_delete=models.PROTECT, db_constraint=False, db_index=False
+    )
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_constraint=False)
+    created_at = models.DateTimeField(db_index=True)
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-id"]
+        indexes = [models.Index(fields=["restaurant", "-id"])]
+
+    def __str__(self):
+        return self.order_id
+
+
+class ArchivedOrderItem(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    quantity = models.IntegerField()
+    price = models.FloatField()
+    name = models.CharField(max_length=100)
+    image = models.CharField(max_length=100, blank=True, null=True)
+    is_active = models.BooleanField()
+    menu = models.ForeignKey(
+        Menu, on_delete=models.SET_NULL, null=True, db_constraint=False
+    )
+    order = models.ForeignKey(
+        ArchivedOrder,
+        related_name="order_items",
+        on_delete=models.CASCADE,
+        db_constraint=False,
+    )
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ["-id"]
+
+    def __str__(self):
+        return self.name
+
+
+class OrderDailyRollup(models.Model):
+    """
+    Per day order counts of archived orders, so statistics over archived
+    days stay correct without reading the archive tables.
+    """
+
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.PROTECT, db_index=False)
+    date = models.DateField()
+    orders = models.PositiveIntegerField(default=0)
+    unpaid = models.PositiveIntegerField(default=0)
+    not_served = models.PositiveIntegerField(default=0)
+    served = models.PositiveIntegerField(default=0)
+    revenue = models.FloatField(default=0)
+
+    class Meta:
+        ordering = ["-date"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["restaurant", "date"], name="unique_restaurant_rollup_date"
+            )
+        ]
+
+    def __str__(self):
+        return str(self.date)
+
+
+class JobCheckpoint(models.Model):
+    """
+    Position reached by an incremental batch job, e.g. the last order id
+    processed by `build_recommendations`.
+    """
+
+    name = models.CharField(max_length=100, unique=True)
+    position = models.BigIntegerField(default=0)
+    # ids at or below `position` that were missing when it was reached, e.g.
+    # of orders not committed yet, with the timestamp they were first missed
+    skipped = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.name
+
+
+class MenuCooccurrence(models.Model):
+    """
+    Number of orders containing both `menu` and `other`. Every pair is
+    stored in both directions.
+    """
+
+    menu = models.ForeignKey(Menu, related_name="+", on_delete=models.CASCADE)
+    other = models.ForeignKey(Menu, related_name="+", on_delete=models.CASCADE)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["menu", "other"], name="unique_menu_cooccurrence"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.menu_id} - {self.other_id}"
+
+
+class MenuRecommendation(models.Model):
+    """
+    Top `RECOMMENDATIONS_TOP_K` menus most often ordered together with
+    `menu`, precomputed by the `build_recommendations` command.
+    """
+
+    menu = models.ForeignKey(
+        Menu, related_name="recommendations", on_delete=models.CASCADE
+    )
+    recommended = models.ForeignKey(
+        Menu, related_name="recommended_for", on_delete=models.CASCADE
+    )
+    rank = models.PositiveSmallIntegerField()
+    count = models.PositiveIntegerField()
+
+    class Meta:
+        ordering = ["menu", "rank"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["menu", "rank"], name="unique_menu_recommendation_rank"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.menu_id} -> {self.recommended_id}"
+
+
+class MenuRatingStats(models.Model):
+    """
+    Review totals of a menu, kept up to date by the review signals.
+    """
+
+    menu = models.OneToOneField(
+        Menu, primary_key=True, related_name="rating_stats", on_delete=models.CASCADE
+    )
+    review_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    avg_rating = models.FloatField(null=True)
+
+    def __str__(self):
+        return str(self.menu_id)
+
+
+class LeaderboardEntry(models.Model):
+    """
+    Ranked top rated menus of a restaurant, overall (`category` is null)
+    and per category.
+    """
+
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, db_index=False)
+    category = models.ForeignKey(
+        Category,
+        related_name="leaderboard_entries",
+        on_delete=models.CASCADE,
+        null=True,
+    )
+    menu = models.ForeignKey(
+        Menu, related_name="leaderboard_entries", on_delete=models.CASCADE
+    )
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        ordering = ["restaurant", "category", "rank"]
+        indexes = [models.Index(fields=["restaurant", "category", "rank"])]
+
+    def __str__(self):
+        return f"{self.category_id or 'all'} #{self.rank}"
+
+
+class SalesHourlyRollup(models.Model):
+    """
+    Quantity and revenue sold per menu and hour, written by the
+    `rollup_sales` command for hours old enough not to change anymore.
+    """
+
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.PROTECT, db_index=False)
+    hour = models.DateTimeField()
+    menu = models.ForeignKey(Menu, on_delete=models.SET_NULL, null=True)
+    quantity = models.PositiveIntegerField(default=0)
+    revenue = models.FloatField(default=0)
+
+    class Meta:
+        ordering = ["-hour"]
+        indexes = [
+            models.Index(fields=["hour", "menu"]),
+            models.Index(fields=["restaurant", "hour"]),
+        ]
+
+    def __str__(self):
+        return f"{self.hour} - {self.menu_id}"
+
+
+class UserMenuPurchase(models.Model):
+    """
+    A menu the user was served at least once, which lets them review it.
+    Recorded by the order signals once an order is paid and served.
+    """
+
+    user = models.ForeignKey(User, related_name="+", on_delete=models.CASCADE)
+    menu = models.ForeignKey(Menu, related_name="+", on_delete=models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "menu"], name="unique_user_menu_purchase"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.menu_id}"
+
+
+class OrderIntake(models.Model):
+    """
+    An order accepted by `POST /api/orders` in the asynchronous intake mode
+    (ORDER_INTAKE_ASYNC), queued for the `drain_order_intake` worker. The
+    row is deleted once its order is created; failed ones are kept.
+    """
+
+    PENDING = "pending"
+    FAILED = "failed"
+    STATUSES = ((PENDING, PENDING), (FAILED, FAILED))
+
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.PROTECT, db_index=False)
+    user = models.ForeignKey(User, related_name="+", on_delete=models.CASCADE)
+    order_id = models.CharField(max_length=100, unique=True)
+    total_price = models.FloatField()
+    tax = models.FloatField()
+    # [{"menu", "menu_version", "quantity"}] checked on intake
+    items = models.JSONField()
+    status = models.CharField(choices=STATUSES, default=PENDING, max_length=10)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["id"]
+        indexes = [models.Index(fields=["status", "id"])]
+
+    def __str__(self):
+        return self.order_id
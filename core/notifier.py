@@ -0,0 +1,255 @@
+import asyncio
+import itertools
+import json
+import logging
+import queue
+import select
+import threading
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connections, router, transaction
+from django.utils import timezone
+
+from core.menu_versions import attach_menu_versions
+from core.models import Order
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "kitchen_queue"
+
+
+def kitchen_queryset():
+    return Order.objects.prefetch_related("order_items")
+
+
+def serialize_kitchen_order(order):
+    return {
+        "id": order.id,
+        "order_id": order.order_id,
+        "is_paid": order.is_paid,
+        "is_served": order.is_served,
+        "is_active": order.is_active,
+        "in_queue": order.is_active and order.is_paid and not order.is_served,
+        "created_at": order.created_at.isoformat(),
+        "updated_at": order.updated_at.isoformat(),
+        "items": [
+            {"name": item.menu_version.name, "quantity": item.quantity}
+            for item in attach_menu_versions(order.order_items.all())
+        ],
+    }
+
+
+def format_event(event, data, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+
+class LoopQueue:
+    """
+    Subscriber queue of a stream served on an event loop (ASGI). The feed
+    thread hands events over to the loop, which drops them when the queue is
+    full like queue.Queue.put_nowait would.
+    """
+
+    def __init__(self, maxsize):
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    def put_nowait(self, event):
+        self.loop.call_soon_threadsafe(self.put, event)
+
+    def put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            pass
+
+    async def get(self, timeout):
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+
+class OrderChangeFeed:
+    """
+    Fans order changes out to every kitchen display connected to this
+    process.
+
+    A single background thread per process collects changed order ids,
+    loads each changed order once and pushes the formatted event to the
+    queue of every subscriber. On PostgreSQL changes arrive through
+    LISTEN/NOTIFY so every worker sees every change; on other databases the
+    thread receives the changes made in this process and polls
+    `Order.updated_at` for the ones made by other workers.
+
+    Subscribers only receive the orders of their restaurant. The thread
+    watches every database that has subscribers, `default` as well as the
+    databases of restaurants listed in TENANT_DATABASES.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # subscriber queue: (database, id of its restaurant)
+        self.subscribers = {}
+        # (database, changed order ids)
+        self.changes = queue.Queue()
+        self.event_ids = itertools.count(1)
+        self.thread = None
+
+    def subscribe(self, restaurant_id, database, subscriber=None):
+        """
+        Register a queue that receives the changes of the orders of the
+        restaurant `restaurant_id` stored in `database`, a new queue.Queue
+        unless `subscriber` is given.
+        """
+        if subscriber is None:
+            subscriber = queue.Queue(maxsize=settings.KITCHEN_QUEUE_BACKLOG)
+        with self.lock:
+            self.subscribers[subscriber] = (database, restaurant_id)
+            if self.thread is None:
+                self.thread = threading.Thread(
+                    target=self.run, name="kitchen-queue-feed", daemon=True
+                )
+                self.thread.start()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            self.subscribers.pop(subscriber, None)
+
+    def keep_running(self):
+        with self.lock:
+            if self.subscribers:
+                return True
+            self.thread = None
+            return False
+
+    def databases(self):
+        with self.lock:
+            return {database for database, _ in self.subscribers.values()}
+
+    def notify(self, order_ids, database=None):
+        """
+        Announce changed orders of `database`, the one orders are written to
+        by default, once its current transaction commits.
+        """
+        order_ids = list(order_ids)
+        if not order_ids:
+            return
+        if database is None:
+            database = router.db_for_write(Order)
+
+        if connections[database].vendor == "postgresql":
+
+            def send():
+                with connections[database].cursor() as cursor:
+                    cursor.execute(
+                        "SELECT pg_notify(%s, %s)",
+                        [CHANNEL, ",".join(str(pk) for pk in order_ids)],
+                    )
+
+        else:
+
+            def send():
+                if self.subscribers:
+                    self.changes.put((database, order_ids))
+
+        transaction.on_commit(send, using=database)
+
+    def broadcast(self, database, order_ids):
+        orders = kitchen_queryset().using(database).filter(pk__in=set(order_ids))
+        with self.lock:
+            subscribers = list(self.subscribers.items())
+
+        for order in orders:
+            event = format_event(
+                "order", serialize_kitchen_order(order), next(self.event_ids)
+            )
+            for subscriber, key in subscribers:
+                # restaurant ids are only unique within a database
+                if key != (database, order.restaurant_id):
+                    continue
+                try:
+                    subscriber.put_nowait(event)
+                except queue.Full:
+                    # the display stopped reading, it resyncs on reconnect
+                    pass
+
+    def run(self):
+        try:
+            if connections["default"].vendor == "postgresql":
+                self.listen()
+            else:
+                self.poll()
+        except Exception:
+            logger.exception("Kitchen queue feed stopped")
+            with self.lock:
+                self.thread = None
+        finally:
+            connections.close_all()
+
+    def listen(self):
+        # psycopg2 connection: database, one per database with subscribers
+        listening = {}
+
+        while self.keep_running():
+            for database in self.databases() - set(listening.values()):
+                connection = connections[database]
+                connection.ensure_connection()
+                with connection.cursor() as cursor:
+                    cursor.execute(f"LISTEN {CHANNEL}")
+                listening[connection.connection] = database
+
+            # a database subscribed to meanwhile is listened to on the next
+            # round, its displays start from a snapshot anyway
+            readable, _, _ = select.select(
+                list(listening), [], [], settings.KITCHEN_QUEUE_POLL_INTERVAL
+            )
+            for pg_connection in readable:
+                pg_connection.poll()
+                order_ids = []
+                while pg_connection.notifies:
+                    payload = pg_connection.notifies.pop(0).payload
+                    order_ids += [int(pk) for pk in payload.split(",") if pk]
+                if order_ids:
+                    self.broadcast(listening[pg_connection], order_ids)
+
+    def poll(self):
+        # database: time its orders were last polled at
+        last_seen = {}
+
+        while self.keep_running():
+            changed = defaultdict(list)
+            try:
+                database, order_ids = self.changes.get(
+                    timeout=settings.KITCHEN_QUEUE_POLL_INTERVAL
+                )
+                changed[database] += order_ids
+                while True:
+                    database, order_ids = self.changes.get_nowait()
+                    changed[database] += order_ids
+            except queue.Empty:
+                pass
+
+            close_old_connections()
+            for database in self.databases():
+                # overlap the windows so changes committed while polling are
+                # not missed; events are full snapshots so a repeat is harmless
+                now = timezone.now()
+                changed[database] += (
+                    Order.objects.using(database)
+                    .filter(updated_at__gt=last_seen.get(database, now))
+                    .values_list("pk", flat=True)
+                )
+                last_seen[database] = now - timedelta(seconds=1)
+
+            for database, order_ids in changed.items():
+                if order_ids:
+                    self.broadcast(database, order_ids)
+
+
+order_feed = OrderChangeFeed()
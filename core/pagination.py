@@ -0,0 +1,13 @@
+from rest_framework.pagination import CursorPagination
+
+
+class HistoryPagination(CursorPagination):
+    """
+    Keyset pagination on the primary key, newest first. Every page of a
+    user's history is one range scan of its (user, -id) index, however deep
+    the page.
+    """
+
+    ordering = "-id"
+    page_size_query_param = "limit"
+    max_page_size = 100
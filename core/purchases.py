@@ -0,0 +1,26 @@
+from core.models import OrderItem, UserMenuPurchase
+
+
+def record_purchases(order_ids):
+    """
+    Record the menus of the paid and served orders among `order_ids` as
+    purchased by the users who ordered them. Known purchases are skipped.
+    """
+    pairs = (
+        OrderItem.objects.filter(
+            order_id__in=order_ids,
+            order__is_paid=True,
+            order__is_served=True,
+            menu__isnull=False,
+        )
+        .values_list("order__user_id", "menu_id")
+        .distinct()
+    )
+    UserMenuPurchase.objects.bulk_create(
+        [
+            UserMenuPurchase(user_id=user_id, menu_id=menu_id)
+            for user_id, menu_id in pairs
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
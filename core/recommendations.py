@@ -0,0 +1,170 @@
+from collections import Counter, defaultdict
+from itertools import chain, combinations, groupby
+from operator import itemgetter
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from core.models import (
+    ArchivedOrder,
+    ArchivedOrderItem,
+    JobCheckpoint,
+    MenuCooccurrence,
+    MenuRecommendation,
+    Order,
+    OrderItem,
+)
+
+CHECKPOINT = "recommendations"
+
+
+def build_recommendations(rebuild=False, chunk_size=2000):
+    """
+    Count how often menus are ordered together in the orders placed since
+    the last run and refresh the top recommendations of every menu whose
+    counts changed. Returns the number of orders processed.
+
+    Orders are taken by id, and ids are not committed in order: an order
+    still being written when the checkpoint passes its id is remembered in
+    `JobCheckpoint.skipped` and counted by a later run.
+    """
+    with transaction.atomic(using=router.db_for_write(JobCheckpoint)):
+        checkpoint, _ = JobCheckpoint.objects.select_for_update().get_or_create(
+            name=CHECKPOINT
+        )
+        if rebuild:
+            MenuCooccurrence.objects.all().delete()
+            MenuRecommendation.objects.all().delete()
+            checkpoint.position = 0
+            checkpoint.skipped = {}
+
+        now = int(timezone.now().timestamp())
+        expired = now - settings.RECOMMENDATIONS_RECHECK_TTL.total_seconds()
+        skipped = {
+            int(order): missed_at
+            for order, missed_at in checkpoint.skipped.items()
+            if missed_at > expired
+        }
+
+        after = checkpoint.position
+        last_order = Order.objects.aggregate(last=Max("id"))["last"] or 0
+        if last_order <= after and not skipped:
+            return 0
+        last_order = max(last_order, after)
+
+        # only recently handed out ids can belong to orders still being
+        # written, older gaps are deleted or rolled back orders. Looked up
+        # before the baskets are read, so an order committed meanwhile is
+        # left for the next run instead of being missed by both.
+        recent = max(after, last_order - settings.RECOMMENDATIONS_RECHECK_IDS)
+        candidates = set(skipped) | set(range(recent + 1, last_order + 1))
+        missing = candidates - set(
+            chain(
+                *(
+                    model.objects.filter(id__in=candidates).values_list("id", flat=True)
+                    for model in (ArchivedOrder, Order)
+                )
+            )
+        )
+
+        baskets = order_baskets(
+            after, last_order, set(skipped) - missing, missing, chunk_size
+        )
+        orders, pairs = count_pairs(baskets)
+        menus = merge_pairs(pairs)
+        refresh_recommendations(menus)
+
+        checkpoint.position = last_order
+        checkpoint.skipped = {order: skipped.get(order, now) for order in missing}
+        checkpoint.save()
+    return orders
+
+
+def order_baskets(after, upto, found, missing, chunk_size):
+    """
+    Stream the distinct menus of every order with `after < id <= upto` or
+    in `found`, except the `missing` ones, including orders moved to the
+    archive.
+    """
+    rows = chain(
+        *(
+            model.objects.filter(
+                Q(order_id__gt=after, order_id__lte=upto) | Q(order_id__in=found),
+                menu__isnull=False,
+            )
+            .exclude(order_id__in=missing)
+            .order_by("order_id")
+            .values_list("order_id", "menu_id")
+            .iterator(chunk_size=chunk_size)
+            for model in (ArchivedOrderItem, OrderItem)
+        )
+    )
+    for _, items in groupby(rows, key=itemgetter(0)):
+        yield sorted({menu_id for _, menu_id in items})
+
+
+def count_pairs(baskets):
+    """
+    Sparse menu x menu co-occurrence counts, keyed by (menu, other) in both
+    directions.
+    """
+    orders = 0
+    pairs = Counter()
+    for menus in baskets:
+        orders += 1
+        for menu, other in combinations(menus, 2):
+            pairs[menu, other] += 1
+            pairs[other, menu] += 1
+    return orders, pairs
+
+
+def merge_pairs(pairs):
+    """
+    Add the new counts to the stored ones. Returns the ids of the menus
+    whose counts changed.
+    """
+    menus = {menu for menu, _ in pairs}
+    stored = {
+        (row.menu_id, row.other_id): row
+        for row in MenuCooccurrence.objects.filter(menu_id__in=menus)
+    }
+
+    changed, created = [], []
+    for (menu, other), count in pairs.items():
+        row = stored.get((menu, other))
+        if row is None:
+            created.append(MenuCooccurrence(menu_id=menu, other_id=other, count=count))
+        else:
+            row.count += count
+            changed.append(row)
+
+    MenuCooccurrence.objects.bulk_update(changed, ["count"], batch_size=1000)
+    MenuCooccurrence.objects.bulk_create(created, batch_size=1000)
+    return menus
+
+
+def refresh_recommendations(menus):
+    top_k = settings.RECOMMENDATIONS_TOP_K
+    top = defaultdict(list)
+    rows = (
+        MenuCooccurrence.objects.filter(menu_id__in=menus)
+        .order_by("menu_id", "-count", "other_id")
+        .values_list("menu_id", "other_id", "count")
+    )
+    for menu, other, count in rows.iterator():
+        if len(top[menu]) < top_k:
+            top[menu].append((other, count))
+
+    MenuRecommendation.objects.filter(menu_id__in=menus).delete()
+    MenuRecommendation.objects.bulk_create(
+        [
+            MenuRecommendation(
+                menu_id=menu, recommended_id=other, rank=rank, count=count
+            )
+            for menu, recommended in top.items()
+            for rank, (other, count) in enumerate(recommended, 1)
+        ],
+        batch_size=1000,
+    )
@@ -0,0 +1,222 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import F, FloatField, Min, Sum
+from django.db.models.functions import (
+    ExtractHour,
+    ExtractIsoWeekDay,
+    TruncDate,
+    TruncHour,
+)
+from django.utils import timezone
+
+from core.models import (
+    ArchivedOrderItem,
+    JobCheckpoint,
+    OrderItem,
+    SalesHourlyRollup,
+)
+
+CHECKPOINT = "sales_rollup"
+
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+# group by expressions per breakdown, for order items and for rollups
+BREAKDOWNS = {
+    "menu": lambda time_field: {
+        "key": F("menu_id"),
+        "label": F("menu__name"),
+    },
+    "category": lambda time_field: {
+        "key": F("menu__category_id"),
+        "label": F("menu__category__name"),
+    },
+    "day": lambda time_field: {
+        "key": TruncDate(time_field),
+    },
+    "hour_of_week": lambda time_field: {
+        "week_day": ExtractIsoWeekDay(time_field),
+        "hour_of_day": ExtractHour(time_field),
+    },
+}
+
+
+def sold_items(model=OrderItem):
+    """
+    Order items counted as sales: the ones of orders that were not
+    cancelled.
+    """
+    return model.objects.filter(order__is_active=True)
+
+
+def restaurant_sold_items(restaurant, model=OrderItem):
+    return sold_items(model).filter(order__restaurant=restaurant)
+
+
+def item_revenue(model=OrderItem):
+    # order items price from their menu snapshot, archived ones keep a copy
+    price = "menu_version__price" if model is OrderItem else "price"
+    return Sum(F(price) * F("quantity"), output_field=FloatField())
+
+
+def sales(queryset, breakdown, time_field):
+    """
+    Quantity and revenue of `queryset` grouped by `breakdown`, in a single
+    grouped query.
+    """
+    if queryset.model is SalesHourlyRollup:
+        revenue = Sum("revenue")
+    else:
+        revenue = item_revenue(queryset.model)
+
+    return (
+        queryset.annotate(**BREAKDOWNS[breakdown](time_field))
+        .values(*BREAKDOWNS[breakdown](time_field))
+        .annotate(total_quantity=Sum("quantity"), total_revenue=revenue)
+        .order_by()
+    )
+
+
+def sales_between(restaurant, start, end, breakdown):
+    """
+    Sales of `restaurant` between the aware datetimes `start` (inclusive)
+    and `end` (exclusive). Ranges longer than SALES_ROLLUP_MIN_DAYS read the
+    hourly rollups for the hours already rolled up and the order items, live
+    and archived, for the remainder.
+    """
+    rows = []
+    if end - start > timedelta(days=settings.SALES_ROLLUP_MIN_DAYS):
+        rolled_up_until = min(rollup_position() or start, end)
+        if rolled_up_until > start:
+            rollups = SalesHourlyRollup.objects.filter(
+                restaurant=restaurant, hour__gte=start, hour__lt=rolled_up_until
+            )
+            rows += sales(rollups, breakdown, "hour")
+            start = rolled_up_until
+
+    if start < end:
+        items = restaurant_sold_items(restaurant).filter(
+            created_at__gte=start, created_at__lt=end
+        )
+        rows += sales(items, breakdown, "created_at")
+        # archived items are found through the indexed creation time of
+        # their order
+        archived = restaurant_sold_items(restaurant, ArchivedOrderItem).filter(
+            order__created_at__gte=start, order__created_at__lt=end
+        )
+        rows += sales(archived, breakdown, "order__created_at")
+
+    return merge_rows(rows)
+
+
+SUMS = ("total_quantity", "total_revenue")
+
+
+def merge_rows(rows):
+    merged = {}
+    for row in rows:
+        key = tuple(value for name, value in row.items() if name not in SUMS)
+        if key in merged:
+            for name in SUMS:
+                merged[key][name] += row[name] or 0
+        else:
+            merged[key] = {**row, **{name: row[name] or 0 for name in SUMS}}
+    return list(merged.values())
+
+
+def rollup_position():
+    """
+    End of the last rolled up hour, or None before the first rollup.
+    """
+    checkpoint = JobCheckpoint.objects.filter(name=CHECKPOINT).first()
+    if checkpoint is None:
+        return None
+    return datetime.fromtimestamp(checkpoint.position, dt_timezone.utc)
+
+
+def rollup_sales(rebuild=False):
+    """
+    Roll up the sales of every complete hour older than SALES_ROLLUP_DELAY,
+    one day per transaction. Returns the number of hours rolled up.
+    """
+    until = floor_hour(timezone.now() - settings.SALES_ROLLUP_DELAY)
+
+    if rebuild:
+        SalesHourlyRollup.objects.all().delete()
+        JobCheckpoint.objects.filter(name=CHECKPOINT).delete()
+
+    start = rollup_position()
+    if start is None:
+        first = [
+            sold_items(model).aggregate(first=Min("created_at"))["first"]
+            for model in (ArchivedOrderItem, OrderItem)
+        ]
+        first = [value for value in first if value is not None]
+        if not first:
+            return 0
+        start = floor_hour(min(first))
+
+    hours = 0
+    while start < until:
+        end = min(start + timedelta(days=1), until)
+        with transaction.atomic(using=router.db_for_write(SalesHourlyRollup)):
+            rollup_hours(start, end)
+            JobCheckpoint.objects.update_or_create(
+                name=CHECKPOINT, defaults={"position": int(end.timestamp())}
+            )
+        hours += int((end - start).total_seconds() // 3600)
+        start = end
+    return hours
+
+
+def rollup_hours(start, end):
+    SalesHourlyRollup.objects.filter(hour__gte=start, hour__lt=end).delete()
+
+    totals = defaultdict(lambda: [0, 0])
+    for model in (ArchivedOrderItem, OrderItem):
+        rows = (
+            sold_items(model)
+            .filter(created_at__gte=start, created_at__lt=end)
+            .annotate(hour=TruncHour("created_at"))
+            .values("hour", "order__restaurant_id", "menu_id")
+            .annotate(
+                total_quantity=Sum("quantity"),
+                total_revenue=item_revenue(model),
+            )
+            .order_by()
+        )
+        for row in rows:
+            total = totals[row["hour"], row["order__restaurant_id"], row["menu_id"]]
+            total[0] += row["total_quantity"]
+            total[1] += row["total_revenue"]
+
+    SalesHourlyRollup.objects.bulk_create(
+        [
+            SalesHourlyRollup(
+                restaurant_id=restaurant_id,
+                hour=hour,
+                menu_id=menu_id,
+                quantity=quantity,
+                revenue=revenue,
+            )
+            for (hour, restaurant_id, menu_id), (quantity, revenue) in totals.items()
+        ],
+        batch_size=1000,
+    )
+
+
+def floor_hour(value):
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def local_range(start_date, end_date):
+    """
+    Half open range of aware datetimes covering the local days from
+    `start_date` to `end_date` inclusive.
+    """
+    return (
+        timezone.make_aware(datetime.combine(start_date, time.min)),
+        timezone.make_aware(datetime.combine(end_date + timedelta(days=1), time.min)),
+    )
@@ -1,30 +1,54 @@
+from datetime import timedelta
+from itertools import islice
+
+from django.utils import timezone
 from rest_framework import serializers
 
-from accounts.serializers import UserSerializer
+from accounts.serializers import NormalizedEmailField, UserSerializer
+from core.intake import menu_prices
+from core.menu_versions import attach_menu_versions
+from core.sales import local_range
+from core.timeseries import GRANULARITIES, MAX_BUCKETS, METRICS, buckets
 from core.models import (
     Campaign,
     Category,
     Menu,
     Order,
+    OrderIntake,
     OrderItem,
+    ArchivedOrder,
+    ArchivedOrderItem,
     Contact,
     Resarvation,
     Review,
     Chef,
     EmailSubscription,
+    UserMenuPurchase,
+    generate_order_id,
 )
 
 
+def restaurant_of(serializer):
+    """
+    Restaurant of the request the serializer was created for, which limits
+    the objects its related fields accept.
+    """
+    request = serializer.context.get("request")
+    return getattr(request, "restaurant", None)
+
+
 class CampaignSerializer(serializers.ModelSerializer):
     class Meta:
         model = Campaign
         fields = "__all__"
+        read_only_fields = ["restaurant"]
 
 
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = "__all__"
+        read_only_fields = ["restaurant"]
 
 
 class CategoryCreateSerializer(serializers.ModelSerializer):
@@ -48,6 +72,13 @@ class MenuCreateSerializer(serializers.ModelSerializer):
             "is_active",
         ]
 
+    def get_fields(self):
+        fields = super().get_fields()
+        fields["category"].queryset = Category.objects.filter(
+            restaurant=restaurant_of(self)
+        )
+        return fields
+
 
 class MenuSerializer(serializers.ModelSerializer):
     category = CategorySerializer()
@@ -86,25 +117,20 @@ class ReviewCreateSerializer(serializers.ModelSerializer):
         model = Review
         fields = ["menu", "rating", "comment"]
 
+    def get_fields(self):
+        fields = super().get_fields()
+        fields["menu"].queryset = Menu.objects.filter(restaurant=restaurant_of(self))
+        return fields
+
     def validate(self, data):
-        # check if user's order is completed
-        order_items = OrderItem.objects.filter(
-            menu=data["menu"],
-            order__user=self.context["request"].user,
-            order__is_paid=True,
-            order__is_served=True,
+        # check if user's order is completed; a second review of the same
+        # menu is rejected by the unique constraint on create
+        purchased = UserMenuPurchase.objects.filter(
+            user=self.context["request"].user, menu=data["menu"]
         ).exists()
-        if not order_items:
+        if not purchased:
             raise serializers.ValidationError("You must order this menu to review.")
 
-        # check if user already reviewd once
-        already_reviewed = Review.objects.filter(
-            menu=data["menu"],
-            user=self.context["request"].user,
-        ).exists()
-        if already_reviewed:
-            raise serializers.ValidationError("You can review one item only once.")
-
         return data
 
 
@@ -126,6 +152,7 @@ class ResarvationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Resarvation
         fields = "__all__"
+        read_only_fields = ["restaurant"]
 
 
 class ContactSerializer(serializers.ModelSerializer):
@@ -146,15 +173,120 @@ class OrderCreateSerializer(serializers.ModelSerializer):
         ]
 
 
+class OrderIntakeItemSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    price = serializers.FloatField()
+    offer_price = serializers.FloatField(required=False, allow_null=True)
+    quantity = serializers.IntegerField(min_value=1)
+
+
+class OrderIntakeSerializer(serializers.Serializer):
+    """
+    Cart of an order placed in the asynchronous intake mode, checked
+    against the cached menu prices and queued as an OrderIntake.
+    """
+
+    order_items = OrderIntakeItemSerializer(many=True, allow_empty=False)
+    tax = serializers.FloatField()
+    total_price = serializers.FloatField()
+
+    def validate_order_items(self, order_items):
+        prices = menu_prices(restaurant_of(self))
+        items = []
+        for item in order_items:
+            menu = prices.get(item["id"])
+            if menu is None:
+                raise serializers.ValidationError(
+                    f"Menu {item['id']} is not available."
+                )
+            price = item.get("offer_price") or item["price"]
+            if round(price, 2) != round(menu["price"], 2):
+                raise serializers.ValidationError(
+                    f"The price of {menu['name']} is now {menu['price']}."
+                )
+            items.append(
+                {
+                    "menu": item["id"],
+                    "menu_version": menu["menu_version"],
+                    "quantity": item["quantity"],
+                }
+            )
+        return items
+
+    def create(self, validated_data):
+        return OrderIntake.objects.create(
+            order_id=generate_order_id(),
+            items=validated_data.pop("order_items"),
+            **validated_data,
+        )
+
+
 class OrderSerializer(serializers.ModelSerializer):
     user = UserSerializer()
 
     class Meta:
         model = Order
         fields = "__all__"
+        read_only_fields = ["restaurant"]
+
+
+class OrderTransitionSerializer(serializers.Serializer):
+    state = serializers.ChoiceField(choices=list(Order.TRANSITIONS))
+    version = serializers.IntegerField(min_value=0)
+
+
+class OrderBulkFilterSerializer(serializers.Serializer):
+    is_active = serializers.BooleanField(required=False)
+    is_paid = serializers.BooleanField(required=False)
+    is_served = serializers.BooleanField(required=False)
+    user__email = NormalizedEmailField(required=False)
+    created_at__lt = serializers.DateTimeField(required=False)
+
+    def validate(self, data):
+        if not data:
+            raise serializers.ValidationError("Filter can not be empty.")
+        return data
+
+
+class OrderBulkStatusSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(), required=False, allow_empty=False
+    )
+    filter = OrderBulkFilterSerializer(required=False)
+    is_active = serializers.BooleanField(required=False)
+    is_paid = serializers.BooleanField(required=False)
+    is_served = serializers.BooleanField(required=False)
+
+    def validate(self, data):
+        if ("ids" in data) == ("filter" in data):
+            raise serializers.ValidationError("Provide either ids or filter.")
+        if not any(field in data for field in Order.STATUS_FIELDS):
+            raise serializers.ValidationError(
+                "Provide a target state for is_active, is_paid or is_served."
+            )
+        return data
+
+
+class OrderStateSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Order
+        fields = [
+            "id",
+            "order_id",
+            "is_active",
+            "is_paid",
+            "is_served",
+            "version",
+            "updated_at",
+        ]
 
 
 class OrderItemSerializer(serializers.ModelSerializer):
+    # from the menu snapshot, see core.menu_versions.attach_menu_versions
+    name = serializers.CharField(source="menu_version.name", read_only=True)
+    price = serializers.FloatField(source="menu_version.price", read_only=True)
+    image = serializers.ImageField(source="menu_version.image", read_only=True)
+
     class Meta:
         model = OrderItem
         fields = "__all__"
@@ -167,9 +299,10 @@ class OrderDetailSerializer(serializers.ModelSerializer):
     class Meta:
         model = Order
         fields = "__all__"
+        read_only_fields = ["version", "restaurant"]
 
     def get_order_items(self, obj):
-        items = obj.order_items.all()
+        items = attach_menu_versions(obj.order_items.all())
         serilizer = OrderItemSerializer(items, many=True)
         return serilizer.data
 
@@ -179,13 +312,65 @@ class OrderDetailSerializer(serializers.ModelSerializer):
         return serilizer.data
 
 
+class ArchivedOrderItemSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ArchivedOrderItem
+        fields = "__all__"
+
+
+class ArchivedOrderSerializer(serializers.ModelSerializer):
+    order_items = ArchivedOrderItemSerializer(many=True, read_only=True)
+    user = UserSerializer(read_only=True)
+
+    class Meta:
+        model = ArchivedOrder
+        fields = "__all__"
+        read_only_fields = ["restaurant"]
+
+
 class ChefSerializer(serializers.ModelSerializer):
     class Meta:
         model = Chef
         fields = "__all__"
+        read_only_fields = ["restaurant"]
 
 
 class EmailSubscriptionSerializer(serializers.ModelSerializer):
     class Meta:
         model = EmailSubscription
         fields = "__all__"
+
+
+class DateRangeSerializer(serializers.Serializer):
+    """
+    `start_date` and `end_date` query parameters, both inclusive. Default to
+    the last `default_days` days (30 unless given in the context).
+    """
+
+    start_date = serializers.DateField(required=False)
+    end_date = serializers.DateField(required=False)
+
+    def validate(self, data):
+        days = self.context.get("default_days", 30)
+        data.setdefault("end_date", timezone.localdate())
+        data.setdefault("start_date", data["end_date"] - timedelta(days=days - 1))
+        if data["start_date"] > data["end_date"]:
+            raise serializers.ValidationError(
+                "start_date must be before or equal to end_date."
+            )
+        return data
+
+
+class TimeSeriesSerializer(DateRangeSerializer):
+    metric = serializers.ChoiceField(choices=list(METRICS))
+    granularity = serializers.ChoiceField(choices=GRANULARITIES, default="day")
+
+    def validate(self, data):
+        data = super().validate(data)
+        start, end = local_range(data["start_date"], data["end_date"])
+        series = buckets(start, end, data["granularity"])
+        if len(list(islice(series, MAX_BUCKETS + 1))) > MAX_BUCKETS:
+            raise serializers.ValidationError(
+                f"The range can not span more than {MAX_BUCKETS} buckets."
+            )
+        return data
@@ -0,0 +1,74 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.campaigns import invalidate_active_campaigns
+from core.intake import invalidate_menu_prices
+from core.leaderboards import rebuild_leaderboards, refresh_leaderboards
+from core.managers import orders_updated
+from core.menu_versions import current_menu_version
+from core.models import Campaign, Menu, Order, Restaurant, Review
+from core.notifier import order_feed
+from core.purchases import record_purchases
+from core.tenants import invalidate_restaurant
+
+
+@receiver(post_save, sender=Order)
+def announce_order_change(sender, instance, using, **kwargs):
+    order_feed.notify([instance.pk], using)
+
+
+@receiver(orders_updated, sender=Order)
+def announce_orders_update(sender, order_ids, using, **kwargs):
+    order_feed.notify(order_ids, using)
+
+
+@receiver(post_save, sender=Order)
+def record_order_purchases(sender, instance, **kwargs):
+    if instance.is_paid and instance.is_served:
+        record_purchases([instance.pk])
+
+
+@receiver(orders_updated, sender=Order)
+def record_orders_purchases(sender, order_ids, changes, **kwargs):
+    if changes.get("is_paid") or changes.get("is_served"):
+        record_purchases(order_ids)
+
+
+@receiver(post_save, sender=Campaign)
+@receiver(post_delete, sender=Campaign)
+def refresh_active_campaigns(sender, instance, using, **kwargs):
+    restaurant = instance.restaurant
+    transaction.on_commit(lambda: invalidate_active_campaigns(restaurant), using)
+
+
+@receiver(post_save, sender=Restaurant)
+@receiver(post_delete, sender=Restaurant)
+def refresh_restaurant(sender, instance, using, **kwargs):
+    transaction.on_commit(lambda: invalidate_restaurant(instance.slug), using)
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+@receiver(post_save, sender=Menu)
+def refresh_menu_leaderboards(sender, instance, using, **kwargs):
+    menu_id = instance.pk if sender is Menu else instance.menu_id
+    transaction.on_commit(lambda: refresh_leaderboards([menu_id]), using)
+
+
+@receiver(post_save, sender=Menu)
+def snapshot_menu(sender, instance, **kwargs):
+    current_menu_version(instance)
+
+
+@receiver(post_save, sender=Menu)
+@receiver(post_delete, sender=Menu)
+def refresh_menu_prices(sender, instance, using, **kwargs):
+    restaurant = instance.restaurant
+    transaction.on_commit(lambda: invalidate_menu_prices(restaurant), using)
+
+
+@receiver(post_delete, sender=Menu)
+def drop_menu_from_leaderboards(sender, instance, using, **kwargs):
+    restaurant_id = instance.restaurant_id
+    transaction.on_commit(lambda: rebuild_leaderboards([restaurant_id]), using)
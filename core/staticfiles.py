@@ -0,0 +1,241 @@
+"""
+Serving of collected static files and uploaded media from the application,
+in the style of WhiteNoise (see core.middleware.FileServingMiddleware).
+
+`collectstatic` with CompressedManifestStaticFilesStorage writes content
+hashed copies of every static file plus gzip (and, when the optional
+`brotli` package is installed, brotli) variants next to them. Responses
+are FileResponses, which WSGI servers such as gunicorn send with
+sendfile(), and support conditional and single range requests.
+"""
+import gzip
+import mimetypes
+import os
+import re
+import stat
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+try:
+    import brotli
+except ImportError:  # optional, only gzip variants are written without it
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = {
+    ".css",
+    ".js",
+    ".map",
+    ".json",
+    ".svg",
+    ".txt",
+    ".html",
+    ".xml",
+    ".ico",
+    ".ttf",
+    ".otf",
+    ".eot",
+}
+# variants in order of preference: (Content-Encoding, file suffix)
+ENCODINGS = [("br", ".br"), ("gzip", ".gz")]
+# appended to the ETag of the variants
+ETAG_SUFFIXES = {"br": "-br", "gzip": "-gz"}
+
+RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def compress(path):
+    """
+    Write gzip and brotli variants of `path` when they are smaller than
+    the file itself.
+    """
+    if os.path.splitext(path)[1].lower() not in COMPRESSIBLE_EXTENSIONS:
+        return
+    with open(path, "rb") as file:
+        content = file.read()
+
+    variants = {".gz": gzip.compress(content, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants[".br"] = brotli.compress(content)
+    for suffix, compressed in variants.items():
+        if len(compressed) < len(content) * 0.95:
+            with open(path + suffix, "wb") as file:
+                file.write(compressed)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    ManifestStaticFilesStorage that also writes precompressed variants of
+    the collected files.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        names = set()
+        for name, hashed_name, processed in super().post_process(
+            paths, dry_run, **options
+        ):
+            if hashed_name and not isinstance(processed, Exception):
+                names.update((name, hashed_name))
+            yield name, hashed_name, processed
+
+        if not dry_run:
+            for name in names:
+                compress(self.path(name))
+
+
+class RangeFile:
+    """
+    Reads `length` bytes of `file` from `start`. Has no `fileno()` on
+    purpose: servers such as gunicorn sendfile() from the start of the
+    file, so ranges are streamed in blocks instead.
+    """
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def accepted_encodings(request):
+    header = request.headers.get("Accept-Encoding", "")
+    accepted = set()
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        if params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def parse_range(header, size):
+    """
+    (start, end) inclusive of a single `bytes=` range, None when the header
+    is ignored (e.g. multiple ranges) and False when it is unsatisfiable.
+    """
+    match = RANGE.match(header.strip())
+    if not match or not any(match.groups()):
+        return None
+    start, end = match.groups()
+    if not start:
+        # the last `end` bytes
+        length = int(end)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or end < start:
+        return False
+    return start, end
+
+
+def serve_file(request, path, cache_control):
+    """
+    Response for the regular file at `path`, or None if there is none.
+    Answers conditional requests with 304, `Range` requests with 206 and
+    prefers the precompressed variants the client accepts.
+    """
+    try:
+        info = os.stat(path)
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    if not stat.S_ISREG(info.st_mode):
+        return None
+
+    variants = [
+        (coding, path + suffix)
+        for coding, suffix in ENCODINGS
+        if os.path.isfile(path + suffix)
+    ]
+    # byte ranges are served from the file itself
+    coding, variant = None, path
+    if "Range" not in request.headers:
+        accepted = accepted_encodings(request)
+        coding, variant = next(
+            ((coding, file) for coding, file in variants if coding in accepted),
+            (None, path),
+        )
+
+    # every encoding is a representation of its own with its own validator,
+    # caches must not answer a gzip request with a 304 for the brotli body
+    suffix = ETAG_SUFFIXES.get(coding, "")
+    etag = f'"{info.st_mtime_ns:x}-{info.st_size:x}{suffix}"'
+    headers = {
+        "ETag": etag,
+        "Last-Modified": http_date(info.st_mtime),
+        "Cache-Control": cache_control,
+        "Accept-Ranges": "bytes",
+    }
+
+    response = get_conditional_response(
+        request, etag=etag, last_modified=int(info.st_mtime)
+    )
+    if response is not None:
+        return with_headers(response, headers, variants)
+
+    content_type, _ = mimetypes.guess_type(path)
+    content_type = content_type or "application/octet-stream"
+    filename = os.path.basename(path)
+
+    byte_range = None
+    if "Range" in request.headers and request.headers.get("If-Range", etag) == etag:
+        byte_range = parse_range(request.headers["Range"], info.st_size)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{info.st_size}"
+        return with_headers(response, headers, variants)
+
+    if byte_range is not None:
+        start, end = byte_range
+        length = end - start + 1
+        response = open_response(
+            request,
+            lambda: RangeFile(open(path, "rb"), start, length),
+            length,
+            content_type,
+            filename,
+            status=206,
+        )
+        response["Content-Range"] = f"bytes {start}-{end}/{info.st_size}"
+        return with_headers(response, headers, variants)
+
+    response = open_response(
+        request,
+        lambda: open(variant, "rb"),
+        os.path.getsize(variant) if coding else info.st_size,
+        content_type,
+        filename,
+    )
+    if coding:
+        response["Content-Encoding"] = coding
+    return with_headers(response, headers, variants)
+
+
+def open_response(request, open_file, length, content_type, filename, status=200):
+    if request.method == "HEAD":
+        response = HttpResponse(content_type=content_type, status=status)
+    else:
+        response = FileResponse(
+            open_file(), content_type=content_type, filename=filename, status=status
+        )
+    response["Content-Length"] = str(length)
+    return response
+
+
+def with_headers(response, headers, variants):
+    for name, value in headers.items():
+        response[name] = value
+    if variants:
+        patch_vary_headers(response, ["Accept-Encoding"])
+    return response
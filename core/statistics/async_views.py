@@ -0,0 +1,75 @@
+from asgiref.sync import sync_to_async
+from django.db.models import Count, Q
+from django.http import JsonResponse
+
+from core.archive import archived_order_counts, as_date, created_between
+from core.async_views import AsyncReadView
+from core.campaigns import active_campaigns
+from core.models import Order, Resarvation, Menu
+from accounts.models import User
+
+
+class AsyncSummaryStatistics(AsyncReadView):
+    throttle_scope = "statistics"
+
+    async def get(self, request):
+        restaurant = request.restaurant
+        users = await User.objects.aaggregate(
+            registered_users=Count("id", filter=Q(is_staff=False)),
+            staffs=Count("id", filter=Q(is_staff=True, restaurant=restaurant)),
+        )
+
+        results = {
+            "pending_orders": await Order.objects.filter(
+                restaurant=restaurant, is_served=False, is_paid=True
+            ).acount(),
+            "registered_users": users["registered_users"],
+            "pending_reservations": await Resarvation.objects.filter(
+                restaurant=restaurant, status="pending"
+            ).acount(),
+            "runnig_campaigns": len(await sync_to_async(active_campaigns)(restaurant)),
+            "menus": await Menu.objects.filter(
+                restaurant=restaurant, is_active=True
+            ).acount(),
+            "staffs": users["staffs"],
+        }
+
+        return JsonResponse({"results": results})
+
+
+class AsyncOrderStatisticsView(AsyncReadView):
+    async def get(self, request):
+        if not request.user.is_authenticated:
+            return JsonResponse(
+                {"detail": "Authentication credentials were not provided."},
+                status=401,
+            )
+        if not request.user.is_staff:
+            return JsonResponse(
+                {"detail": "You do not have permission to perform this action."},
+                status=403,
+            )
+
+        start_date = as_date(request.GET.get("start_date"))
+        end_date = as_date(request.GET.get("end_date"))
+        counts = await Order.objects.filter(
+            restaurant=request.restaurant, **created_between(start_date, end_date)
+        ).aaggregate(
+            unpaid=Count("id", filter=Q(is_paid=False)),
+            not_served=Count("id", filter=Q(is_paid=True, is_served=False)),
+            served=Count("id", filter=Q(is_served=True)),
+        )
+
+        archived = await sync_to_async(archived_order_counts)(
+            request.restaurant, start_date, end_date
+        )
+
+        response = [
+            {"name": "not paid", "value": counts["unpaid"] + archived["unpaid"]},
+            {
+                "name": "not served",
+                "value": counts["not_served"] + archived["not_served"],
+            },
+            {"name": "served", "value": counts["served"] + archived["served"]},
+        ]
+        return JsonResponse({"results": response})
@@ -1,28 +1,39 @@
-from django.db.models.functions import TruncDay
-from django.utils import timezone
-from django.db.models import Count
-from datetime import datetime, timedelta
-from django.db.models import Count
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
 from django.utils import timezone
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAdminUser, AllowAny
 
-from core.models import Order, Resarvation, Campaign, Menu
+from core.archive import archived_order_counts, as_date, created_between
+from core.campaigns import active_campaigns
+from core.models import Order, Resarvation, Menu
+from core.sales import WEEKDAYS, local_range, sales_between
+from core.serializers import DateRangeSerializer, TimeSeriesSerializer
+from core.timeseries import time_series
+from core.throttling import TokenBucketThrottle
 from accounts.models import User
 
 
 class SummaryStatistics(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = "statistics"
 
     def get(self, request, format=None):
-        pending_orders = Order.objects.filter(is_served=False, is_paid=True).count()
+        restaurant = request.restaurant
+        pending_orders = Order.objects.filter(
+            restaurant=restaurant, is_served=False, is_paid=True
+        ).count()
         registered_users = User.objects.filter(is_staff=False).count()
-        staffs = User.objects.filter(is_staff=True).count()
-        pending_reservations = Resarvation.objects.filter(status="pending").count()
-        runnig_campaigns = Campaign.objects.filter(is_active=True).count()
-        menus = Menu.objects.filter(is_active=True).count()
+        staffs = User.objects.filter(is_staff=True, restaurant=restaurant).count()
+        pending_reservations = Resarvation.objects.filter(
+            restaurant=restaurant, status="pending"
+        ).count()
+        runnig_campaigns = len(active_campaigns(restaurant))
+        menus = Menu.objects.filter(restaurant=restaurant, is_active=True).count()
 
         results = {
             "pending_orders": pending_orders,
@@ -40,14 +51,12 @@ class OrderStatisticsView(APIView):
     permission_classes = [IsAdminUser]
 
     def get(self, request):
-        start_date = request.query_params.get("start_date")
-        end_date = request.query_params.get("end_date")
-
-        order_filter = {}
-        if start_date:
-            order_filter["created_at__gte"] = start_date
-        if end_date:
-            order_filter["created_at__lte"] = end_date
+        start_date = as_date(request.query_params.get("start_date"))
+        end_date = as_date(request.query_params.get("end_date"))
+        order_filter = {
+            "restaurant": request.restaurant,
+            **created_between(start_date, end_date),
+        }
 
         unpaid_count = Order.objects.filter(is_paid=False, **order_filter).count()
         not_served_count = Order.objects.filter(
@@ -55,6 +64,11 @@ class OrderStatisticsView(APIView):
         ).count()
         served_count = Order.objects.filter(is_served=True, **order_filter).count()
 
+        archived = archived_order_counts(request.restaurant, start_date, end_date)
+        unpaid_count += archived["unpaid"]
+        not_served_count += archived["not_served"]
+        served_count += archived["served"]
+
         response = [
             {"name": "not paid", "value": unpaid_count},
             {"name": "not served", "value": not_served_count},
@@ -67,44 +81,142 @@ class DailyServedOrderView(APIView):
     permission_classes = [IsAdminUser]
 
     def get(self, request):
-        start_date_str = request.query_params.get("start_date", None)
-        end_date_str = request.query_params.get("end_date", None)
+        serializer = DateRangeSerializer(
+            data=request.query_params, context={"default_days": 7}
+        )
+        serializer.is_valid(raise_exception=True)
+        start_date = serializer.validated_data["start_date"]
+        end_date = serializer.validated_data["end_date"]
+
+        series = time_series(
+            "served_orders",
+            request.restaurant,
+            *local_range(start_date, end_date),
+            "day",
+        )
+        # latest day first; the series includes archived orders
+        response_list = [
+            {"date": day.strftime("%Y-%m-%d"), "value": count}
+            for day, count in reversed(series)
+        ]
+
+        return Response({"results": response_list}, status=status.HTTP_200_OK)
 
-        if start_date_str and end_date_str:
-            start_date = datetime.strptime(start_date_str, "%Y-%m-%d").date()
-            end_date = datetime.strptime(end_date_str, "%Y-%m-%d").date()
 
-            # start_date = start_date.replace(hour=11, minute=59, second=0)
-            # end_date = end_date.replace(hour=11, minute=59, second=0)
+class TimeSeriesView(APIView):
+    """
+    `metric` (orders, served_orders, revenue, reservations or registrations)
+    per local hour, day, week or month (`granularity`) between `start_date`
+    and `end_date`, empty buckets included.
+    """
 
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        serializer = TimeSeriesSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        series = time_series(
+            data["metric"],
+            request.restaurant,
+            *local_range(data["start_date"], data["end_date"]),
+            data["granularity"],
+        )
+        if data["granularity"] == "hour":
+            labels = [timezone.make_aware(bucket).isoformat() for bucket, _ in series]
         else:
-            end_date = timezone.now()
-            start_date = end_date - timedelta(days=6)
+            labels = [bucket.strftime("%Y-%m-%d") for bucket, _ in series]
+
+        results = {
+            "metric": data["metric"],
+            "granularity": data["granularity"],
+            "labels": labels,
+            "values": [round(value, 2) for _, value in series],
+        }
+        return Response({"results": results}, status=status.HTTP_200_OK)
 
-        orders_by_day = (
-            Order.objects.filter(
-                is_served=True,
-                created_at__range=[start_date, end_date],
+
+class SalesAnalyticsView(APIView):
+    """
+    Quantity and revenue (price * quantity of the items of orders that were
+    not cancelled) sold between `start_date` and `end_date`, grouped by
+    `breakdown` and shaped as chart ready arrays. Results are cached per
+    restaurant and range for SALES_CACHE_SECONDS.
+    """
+
+    permission_classes = [IsAdminUser]
+    breakdown = None
+
+    def get(self, request):
+        serializer = DateRangeSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        start_date = serializer.validated_data["start_date"]
+        end_date = serializer.validated_data["end_date"]
+
+        restaurant = request.restaurant
+        key = f"sales:{restaurant.slug}:{self.breakdown}:{start_date}:{end_date}"
+        results = cache.get(key)
+        if results is None:
+            rows = sales_between(
+                restaurant, *local_range(start_date, end_date), self.breakdown
             )
-            .annotate(day=TruncDay("created_at"))
-            .values("day")
-            .annotate(count=Count("id"))
-            .order_by("day")
-        )
+            results = self.format(rows, start_date, end_date)
+            cache.set(key, results, settings.SALES_CACHE_SECONDS)
+
+        return Response({"results": results}, status=status.HTTP_200_OK)
+
+    def format(self, rows, start_date, end_date):
+        rows = sorted(rows, key=lambda row: row["total_revenue"], reverse=True)
+        return {
+            "ids": [row["key"] for row in rows],
+            "labels": [row["label"] for row in rows],
+            "quantity": [row["total_quantity"] for row in rows],
+            "revenue": [round(row["total_revenue"], 2) for row in rows],
+        }
+
+
+class MenuSalesView(SalesAnalyticsView):
+    breakdown = "menu"
+
 
-        date_range = [
-            end_date - timedelta(days=i)
+class CategorySalesView(SalesAnalyticsView):
+    breakdown = "category"
+
+
+class DailySalesView(SalesAnalyticsView):
+    breakdown = "day"
+
+    def format(self, rows, start_date, end_date):
+        days = [
+            start_date + timedelta(days=i)
             for i in range((end_date - start_date).days + 1)
         ]
+        totals = {row["key"]: row for row in rows}
+        empty = {"total_quantity": 0, "total_revenue": 0}
+        return {
+            "labels": [day.strftime("%Y-%m-%d") for day in days],
+            "quantity": [totals.get(day, empty)["total_quantity"] for day in days],
+            "revenue": [
+                round(totals.get(day, empty)["total_revenue"], 2) for day in days
+            ],
+        }
 
-        response = {day.strftime("%Y-%m-%d"): 0 for day in date_range}
-        for order in orders_by_day:
-            day_str = order["day"].strftime("%Y-%m-%d")
-            if day_str in response:
-                response[day_str] = order["count"]
 
-        response_list = [
-            {"date": day, "value": count} for day, count in response.items()
-        ]
+class SalesHeatmapView(SalesAnalyticsView):
+    breakdown = "hour_of_week"
 
-        return Response({"results": response_list}, status=status.HTTP_200_OK)
+    def format(self, rows, start_date, end_date):
+        quantity = [[0] * 24 for _ in WEEKDAYS]
+        revenue = [[0] * 24 for _ in WEEKDAYS]
+        for row in rows:
+            quantity[row["week_day"] - 1][row["hour_of_day"]] = row["total_quantity"]
+            revenue[row["week_day"] - 1][row["hour_of_day"]] = round(
+                row["total_revenue"], 2
+            )
+        return {
+            "weekdays": WEEKDAYS,
+            "hours": list(range(24)),
+            "quantity": quantity,
+            "revenue": revenue,
+        }
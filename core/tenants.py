@@ -0,0 +1,87 @@
+"""
+Restaurants (branches) served by one deployment.
+
+core.middleware.TenantMiddleware resolves the restaurant of every request
+from its `X-Restaurant` header, DEFAULT_RESTAURANT without one, into
+`request.restaurant`. Views filter tenant data by it explicitly and key
+their cache entries with its slug.
+
+Restaurants listed in TENANT_DATABASES keep all of their data in a
+database of their own; `use_restaurant` routes the queries made while it
+is active there (see server.routers.TenantRouter), `restaurant_database`
+only routes them.
+"""
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.models import Restaurant
+from server.routers import tenant_database
+
+RESTAURANT_KEY = "restaurant:%s"
+RESTAURANT_CACHE_SECONDS = 60 * 5
+
+
+def get_restaurant(slug):
+    """
+    The active restaurant `slug`, cached, or None.
+    """
+    key = RESTAURANT_KEY % slug
+    restaurant = cache.get(key)
+    if restaurant is None:
+        restaurant = Restaurant.objects.filter(slug=slug, is_active=True).first()
+        if restaurant is not None:
+            cache.set(key, restaurant, RESTAURANT_CACHE_SECONDS)
+    return restaurant
+
+
+def database_restaurant(database):
+    """
+    The restaurant owning `database`: the one it is listed for in
+    TENANT_DATABASES, DEFAULT_RESTAURANT for the shared database.
+    """
+    slug = next(
+        (
+            slug
+            for slug, alias in settings.TENANT_DATABASES.items()
+            if alias == database
+        ),
+        settings.DEFAULT_RESTAURANT,
+    )
+    return Restaurant.objects.using(database).get(slug=slug)
+
+
+def database_slugs():
+    """
+    One restaurant slug per database, DEFAULT_RESTAURANT for the shared
+    one; batch jobs run once inside `use_restaurant` of each.
+    """
+    return [settings.DEFAULT_RESTAURANT, *settings.TENANT_DATABASES]
+
+
+def invalidate_restaurant(slug):
+    cache.delete(RESTAURANT_KEY % slug)
+
+
+@contextmanager
+def restaurant_database(slug):
+    """
+    Route the queries made inside the block to the database of the
+    restaurant `slug`.
+    """
+    token = tenant_database.set(settings.TENANT_DATABASES.get(slug))
+    try:
+        yield
+    finally:
+        tenant_database.reset(token)
+
+
+@contextmanager
+def use_restaurant(slug):
+    """
+    Route the queries made inside the block to the database of the
+    restaurant `slug` and yield the restaurant, None if there is none.
+    """
+    with restaurant_database(slug):
+        yield get_restaurant(slug)
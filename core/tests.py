@@ -1,3 +1,1336 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import hashlib
+import json
+import time as clock
+from contextlib import nullcontext
+from datetime import time, timedelta
+from io import StringIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import CommandError, call_command
+from django.core.signals import request_started
+from django.db import close_old_connections, connections
+from django.db.models import Max
+from django.http import HttpResponse, JsonResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase, force_authenticate
+
+from accounts.models import User
+from accounts.serializers import restaurant_token
+from core.archive import archive_cutoff, archive_orders
+from core.async_views import AsyncCategoryListView, AsyncMenuListView, AsyncReadView
+from core.campaigns import active_campaigns, seconds_until_midnight
+from core.intake import drain_intake
+from core.leaderboards import bayesian_score, rebuild_leaderboards
+from core.managers import orders_updated
+from core.metrics.registry import MetricsRegistry
+from core.metrics.views import MetricsView
+from core.middleware import PerformanceMiddleware, ReplicaRoutingMiddleware
+from core.models import (
+    ArchivedOrder,
+    ArchivedOrderItem,
+    Campaign,
+    Category,
+    IdempotencyKey,
+    JobCheckpoint,
+    LeaderboardEntry,
+    Menu,
+    MenuVersion,
+    Order,
+    OrderDailyRollup,
+    OrderIntake,
+    OrderItem,
+    Restaurant,
+    Review,
+    UserMenuPurchase,
+)
+from core.notifier import OrderChangeFeed
+from core.recommendations import build_recommendations
+from core.serializers import TimeSeriesSerializer
+from core.staticfiles import compress
+from core.statistics.async_views import AsyncOrderStatisticsView
+from core.tenants import use_restaurant
+from core.throttling import TokenBucketThrottle
+from server.handlers import StreamingASGIHandler
+from server.routers import ReplicaRouter, read_from_replica
+
+
+def create_menu(restaurant, name="Biryani", price=10):
+    category = Category.objects.create(restaurant=restaurant, name=f"{name} dishes")
+    return Menu.objects.create(
+        restaurant=restaurant,
+        category=category,
+        name=name,
+        price=price,
+        offer_price=0,
+        description="d",
+        cook_time=5,
+        image="menus/a.png",
+    )
+
+
+def create_order(restaurant, user, menu, quantity=1, **fields):
+    order = Order.objects.create(
+        restaurant=restaurant, user=user, total_price=menu.price * quantity, tax=0
+    )
+    OrderItem.objects.create(
+        order=order,
+        menu=menu,
+        menu_version=MenuVersion.objects.filter(menu=menu).first(),
+        quantity=quantity,
+    )
+    if fields:
+        Order.objects.filter(pk=order.pk).update(**fields)
+        OrderItem.objects.filter(order=order).update(
+            **{field: value for field, value in fields.items() if field == "created_at"}
+        )
+        order.refresh_from_db()
+    return order
+
+
+def listen(signal, test):
+    """
+    Keyword arguments of every `signal` sent for orders during `test`.
+    """
+    received = []
+
+    def receiver(sender, **kwargs):
+        received.append(kwargs)
+
+    signal.connect(receiver, sender=Order)
+    test.addCleanup(signal.disconnect, receiver, sender=Order)
+    return received
+
+
+class RestaurantTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.restaurant = Restaurant.objects.get(slug=settings.DEFAULT_RESTAURANT)
+        self.admin = User.objects.create_superuser(email="admin@x.com", password="pw")
+        self.customer = User.objects.create_user(email="customer@x.com", password="pw")
+        self.menu = create_menu(self.restaurant)
+        self.client.force_authenticate(self.admin)
+
+
+@override_settings(PERFORMANCE_INSTRUMENTATION=True, SLOW_REQUEST_THRESHOLD_MS=60000)
+class PerformanceMiddlewareTests(RestaurantTestCase):
+    def test_timings_are_sent_in_server_timing_header(self):
+        response = self.client.get("/api/menus")
+
+        metrics = [
+            metric.split(";")[0] for metric in response["Server-Timing"].split(", ")
+        ]
+        self.assertEqual(metrics, ["db", "view", "render", "total"])
+        self.assertRegex(
+            response["Server-Timing"], r'db;dur=[\d.]+;desc="[1-9]\d* queries"'
+        )
+
+    def test_slow_request_is_logged_with_its_queries(self):
+        with override_settings(SLOW_REQUEST_THRESHOLD_MS=0), self.assertLogs(
+            "core.slow_requests", "WARNING"
+        ) as logs:
+            self.client.get("/api/menus?limit=1")
+
+        self.assertIn("Slow request: GET /api/menus?limit=1 -> 200", logs.output[0])
+        self.assertIn("SELECT", logs.output[0])
+
+    def test_fast_request_is_not_logged(self):
+        with self.assertNoLogs("core.slow_requests"):
+            self.client.get("/api/menus")
+
+    def test_times_async_requests(self):
+        async def get_response(request):
+            return HttpResponse()
+
+        middleware = PerformanceMiddleware(get_response)
+        response = async_to_sync(middleware)(RequestFactory().get("/"))
+
+        self.assertIn("total;dur=", response["Server-Timing"])
+
+    @override_settings(PERFORMANCE_INSTRUMENTATION=False)
+    def test_disabled_middleware_leaves_the_chain(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            PerformanceMiddleware(HttpResponse)
+
+        self.assertNotIn("Server-Timing", self.client.get("/api/menus"))
+
+
+class MetricsTests(RestaurantTestCase):
+    def setUp(self):
+        super().setUp()
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        self.registry = MetricsRegistry(self.directory, [0.1, 1], 60)
+
+    def test_requests_are_counted_and_timed(self):
+        self.registry.observe("core:menus", "GET", 200, 0.05)
+        self.registry.observe("core:menus", "GET", 200, 0.5)
+        self.registry.observe("core:menus", "GET", 404, 2)
+
+        lines = self.registry.render().splitlines()
+
+        self.assertIn(
+            'http_requests_total{route="core:menus",method="GET",status="200"} 2', lines
+        )
+        labels = 'route="core:menus",method="GET"'
+        for bound, count in [("0.1", 1), ("1", 2), ("+Inf", 3)]:
+            self.assertIn(
+                f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}',
+                lines,
+            )
+        self.assertIn(f"http_request_duration_seconds_sum{{{labels}}} 2.55", lines)
+        self.assertIn(f"http_request_duration_seconds_count{{{labels}}} 3", lines)
+
+    def test_totals_of_exited_workers_are_kept(self):
+        # no process has a pid this high
+        exited = self.directory / "4999999-1.json"
+        exited.write_text(
+            json.dumps(
+                {
+                    "requests": [["core:menus", "GET", 200, 4]],
+                    "latency": [["core:menus", "GET", [4, 0, 0, 1.0]]],
+                }
+            )
+        )
+        self.registry.observe("core:menus", "GET", 200, 0.05)
+
+        requests, _ = self.registry.collect()
+
+        self.assertEqual(requests[("core:menus", "GET", 200)], 5)
+        self.assertFalse(exited.exists())
+        self.assertTrue((self.directory / "retired.json").exists())
+        self.assertEqual(self.registry.collect()[0][("core:menus", "GET", 200)], 5)
+
+    @override_settings(METRICS_ENABLED=True)
+    def test_middleware_records_the_route(self):
+        with mock.patch("core.metrics.registry.registry", self.registry):
+            self.client.get("/api/menus")
+
+        self.assertEqual(self.registry.requests[("core:menus", "GET", 200)], 1)
+
+    @override_settings(METRICS_ALLOWED_NETWORKS=["10.0.0.0/8"])
+    def test_metrics_are_only_shown_to_allowed_networks_and_staff(self):
+        def scrape(address, user=None):
+            request = APIRequestFactory().get("/metrics", REMOTE_ADDR=address)
+            if user:
+                force_authenticate(request, user)
+            with mock.patch("core.metrics.views.registry", self.registry):
+                return MetricsView.as_view()(request).status_code
+
+        self.assertEqual(scrape("10.1.2.3"), 200)
+        self.assertIn(scrape("192.168.1.1"), [401, 403])
+        self.assertEqual(scrape("192.168.1.1", self.customer), 403)
+        self.assertEqual(scrape("192.168.1.1", self.admin), 200)
+
+
+class AsyncReadViewTests(RestaurantTestCase):
+    def call(self, view, method="get", path="/api/menus", data=None, user=None):
+        headers = {}
+        if user:
+            token = restaurant_token(user, self.restaurant).access_token
+            headers["HTTP_AUTHORIZATION"] = f"Bearer {token}"
+        request = getattr(RequestFactory(), method)(path, data, **headers)
+        request.restaurant = self.restaurant
+        return async_to_sync(view.as_view())(request)
+
+    def test_menu_list_matches_the_sync_view(self):
+        create_menu(self.restaurant, "Kebab", price=4)
+        params = {"ordering": "price", "limit": 1, "offset": 1}
+
+        response = self.call(AsyncMenuListView, data=params)
+
+        self.assertEqual(response.status_code, 200)
+        expected = self.client.get("/api/menus", params).json()
+        self.assertEqual(json.loads(response.content), expected)
+        self.assertEqual(expected["results"][0]["name"], "Biryani")
+
+    def test_writes_are_handed_to_the_drf_view(self):
+        response = self.call(
+            AsyncCategoryListView,
+            "post",
+            "/api/categories",
+            {"name": "Desserts"},
+            user=self.admin,
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Category.objects.filter(name="Desserts").exists())
+
+    def test_invalid_token_is_rejected(self):
+        request = RequestFactory().get("/api/menus", HTTP_AUTHORIZATION="Bearer x")
+        request.restaurant = self.restaurant
+
+        response = async_to_sync(AsyncMenuListView.as_view())(request)
+
+        self.assertEqual(response.status_code, 401)
+
+    def test_throttled_view_answers_429(self):
+        class Limited(AsyncReadView):
+            throttle_scope = "registration"
+
+            async def get(self, request):
+                return JsonResponse({})
+
+        statuses = [self.call(Limited).status_code for _ in range(11)]
+
+        self.assertEqual(statuses, [200] * 10 + [429])
+
+    def test_middleware_runs_in_async_mode(self):
+        response = async_to_sync(self.async_client.get)("/api/menus")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["count"], 1)
+
+
+@override_settings(DATABASE_REPLICAS=["replica_0"])
+class ReplicaRoutingTests(RestaurantTestCase):
+    def setUp(self):
+        super().setUp()
+        self.reads = []
+        self.middleware = ReplicaRoutingMiddleware(self.view)
+
+    def view(self, request):
+        self.middleware.process_view(request, None, (), {})
+        self.reads.append(ReplicaRouter().db_for_read(Menu))
+        return HttpResponse(status=request.status)
+
+    def request(self, method="get", path="/api/menus", client="a", status=200):
+        request = getattr(RequestFactory(), method)(
+            path, HTTP_AUTHORIZATION=f"Bearer {client}"
+        )
+        request.resolver_match = resolve(path)
+        request.status = status
+        self.middleware(request)
+        return self.reads[-1]
+
+    def test_listed_views_read_from_a_replica(self):
+        self.assertEqual(self.request(), "replica_0")
+        self.assertIsNone(self.request(path="/api/contacts"))
+        # reset after the response
+        self.assertFalse(read_from_replica.get())
+
+    def test_successful_write_pins_the_client_to_the_primary(self):
+        self.request("post", client="a", status=400)
+        self.assertEqual(self.request(client="a"), "replica_0")
+
+        self.assertIsNone(self.request("post", client="a", status=201))
+
+        self.assertIsNone(self.request(client="a"))
+        self.assertEqual(self.request(client="b"), "replica_0")
+
+    def test_writes_go_to_the_primary(self):
+        token = read_from_replica.set(True)
+        self.addCleanup(read_from_replica.reset, token)
+
+        self.assertEqual(ReplicaRouter().db_for_write(Menu), "default")
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_middleware_is_not_used_without_replicas(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            ReplicaRoutingMiddleware(self.view)
+
+
+class TokenBucketThrottleTests(TestCase):
+    class View:
+        throttle_scope = "contact"
+
+    def setUp(self):
+        cache.clear()
+        self.now = 1000.0
+
+    def allow(self):
+        throttle = TokenBucketThrottle()
+        throttle.timer = lambda: self.now
+        request = APIRequestFactory().get("/")
+        request.user = AnonymousUser()
+        return throttle.allow_request(Request(request), self.View()), throttle
+
+    def test_burst_then_refill(self):
+        # 5/hour: bursts of 5, one token every 12 minutes
+        self.assertEqual([self.allow()[0] for _ in range(6)], [True] * 5 + [False])
+        self.assertEqual(self.allow()[1].wait(), 720)
+
+        self.now += 720
+        self.assertEqual([self.allow()[0] for _ in range(2)], [True, False])
+
+    def test_idle_bucket_holds_one_burst(self):
+        self.allow()
+        self.now += 60 * 60 * 24
+
+        self.assertEqual([self.allow()[0] for _ in range(6)], [True] * 5 + [False])
+
+    def test_requests_are_throttled_per_client(self):
+        for _ in range(5):
+            self.client.post("/api/contacts", {}, REMOTE_ADDR="10.0.0.1")
+
+        throttled = self.client.post("/api/contacts", {}, REMOTE_ADDR="10.0.0.1")
+        other = self.client.post("/api/contacts", {}, REMOTE_ADDR="10.0.0.2")
+
+        self.assertEqual(throttled.status_code, 429)
+        self.assertEqual(other.status_code, 400)
+
+
+@override_settings(KITCHEN_QUEUE_HEARTBEAT=0.01, KITCHEN_QUEUE_STREAM_SECONDS=5)
+class KitchenQueueStreamTests(RestaurantTestCase):
+    def setUp(self):
+        super().setUp()
+        # the feed thread would poll the test database from another thread
+        patcher = mock.patch.object(OrderChangeFeed, "run")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.feed = OrderChangeFeed()
+        for module in ["core.views", "core.signals"]:
+            patcher = mock.patch(f"{module}.order_feed", self.feed)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.order = create_order(
+            self.restaurant, self.customer, self.menu, is_paid=True
+        )
+
+    def test_orders_are_announced_once_committed(self):
+        self.feed.subscribe(self.restaurant.pk, "default")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.order.save()
+            self.assertTrue(self.feed.changes.empty())
+
+        self.assertEqual(self.feed.changes.get_nowait(), ("default", [self.order.pk]))
+
+    def test_changes_only_reach_displays_of_their_restaurant(self):
+        display = self.feed.subscribe(self.restaurant.pk, "default")
+        other = self.feed.subscribe(self.restaurant.pk + 1, "default")
+
+        self.feed.broadcast("default", [self.order.pk])
+
+        event = display.get_nowait()
+        self.assertIn("event: order\n", event)
+        self.assertTrue(json.loads(event.split("data: ")[1])["in_queue"])
+        self.assertTrue(other.empty())
+
+    @override_settings(KITCHEN_QUEUE_STREAM_SECONDS=0)
+    def test_wsgi_stream_starts_with_a_snapshot(self):
+        response = self.client.get("/api/orders/kitchen-queue")
+
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        events = list(response.streaming_content)
+        self.assertEqual(len(events), 1)
+        self.assertIn(b"event: snapshot\n", events[0])
+        self.assertIn(self.order.order_id.encode(), events[0])
+        self.assertFalse(self.feed.subscribers)
+
+    def test_asgi_stream_runs_on_the_event_loop_until_disconnect(self):
+        token = restaurant_token(self.admin, self.restaurant).access_token
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "path": "/api/orders/kitchen-queue",
+            "query_string": b"",
+            "headers": [
+                (b"host", b"testserver"),
+                (b"authorization", f"Bearer {token}".encode()),
+            ],
+        }
+        bodies = []
+
+        async def communicate():
+            disconnected = asyncio.Event()
+            requests = iter([{"type": "http.request", "body": b""}])
+
+            async def receive():
+                request = next(requests, None)
+                if request is None:
+                    await disconnected.wait()
+                    return {"type": "http.disconnect"}
+                return request
+
+            async def send(message):
+                if message["type"] != "http.response.body":
+                    self.assertEqual(message["status"], 200)
+                    return
+                bodies.append(message["body"])
+                if len(bodies) == 1:
+                    await sync_to_async(self.feed.broadcast)("default", [self.order.pk])
+                elif b"event: order" in message["body"]:
+                    disconnected.set()
+
+            await StreamingASGIHandler()(scope, receive, send)
+
+        # as django.test.AsyncClient does, keep the test transaction open and
+        # the views on this thread
+        request_started.disconnect(close_old_connections)
+        self.addCleanup(request_started.connect, close_old_connections)
+        with mock.patch(
+            "django.core.handlers.asgi.ThreadSensitiveContext", nullcontext
+        ):
+            started = clock.monotonic()
+            async_to_sync(communicate)()
+
+        # the disconnect ends the stream, not its deadline
+        self.assertLess(clock.monotonic() - started, 5)
+
+        self.assertIn(b"event: snapshot\n", bodies[0])
+        self.assertIn(b"event: order\n", bodies[-1])
+        self.assertFalse(self.feed.subscribers)
+
+
+class OrderTransitionTests(RestaurantTestCase):
+    def transition(self, order, state, version):
+        return self.client.post(
+            f"/api/orders/{order.pk}/transition",
+            {"state": state, "version": version},
+            format="json",
+        )
+
+    def test_transition_bumps_version(self):
+        order = create_order(self.restaurant, self.customer, self.menu)
+
+        response = self.transition(order, "paid", 0)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["version"], 1)
+        self.assertTrue(response.data["is_paid"])
+
+    def test_stale_version_conflicts(self):
+        order = create_order(self.restaurant, self.customer, self.menu)
+        self.transition(order, "paid", 0)
+
+        response = self.transition(order, "served", 0)
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data["order"]["version"], 1)
+        self.assertFalse(Order.objects.get(pk=order.pk).is_served)
+
+    def test_invalid_transition_is_rejected(self):
+        order = create_order(self.restaurant, self.customer, self.menu)
+
+        response = self.transition(order, "served", 0)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Order.objects.get(pk=order.pk).version, 0)
+
+    def test_orders_of_other_restaurants_are_not_found(self):
+        other = Restaurant.objects.create(slug="uptown", name="Uptown")
+        order = create_order(other, self.customer, create_menu(other))
+
+        self.assertEqual(self.transition(order, "paid", 0).status_code, 404)
+
+
+class OrderBulkStatusTests(RestaurantTestCase):
+    def test_update_status_skips_orders_in_target_state(self):
+        first = create_order(self.restaurant, self.customer, self.menu)
+        second = create_order(self.restaurant, self.customer, self.menu, is_paid=True)
+        received = listen(orders_updated, self)
+
+        response = self.client.post(
+            "/api/orders/bulk-status",
+            {"ids": [first.pk, second.pk], "is_paid": True},
+            format="json",
+        )
+
+        self.assertEqual(response.data, {"updated": 1})
+        self.assertEqual(Order.objects.get(pk=first.pk).version, 1)
+        self.assertEqual(Order.objects.get(pk=second.pk).version, 0)
+        self.assertEqual(received[0]["order_ids"], [first.pk])
+        self.assertEqual(received[0]["changes"], {"is_paid": True})
+
+    def test_serving_by_filter_records_purchases(self):
+        order = create_order(self.restaurant, self.customer, self.menu, is_paid=True)
+
+        response = self.client.post(
+            "/api/orders/bulk-status",
+            {"filter": {"is_paid": True}, "is_served": True},
+            format="json",
+        )
+
+        self.assertEqual(response.data, {"updated": 1})
+        self.assertTrue(Order.objects.get(pk=order.pk).is_served)
+        self.assertTrue(
+            UserMenuPurchase.objects.filter(user=self.customer, menu=self.menu).exists()
+        )
+
+    def test_selection_is_required(self):
+        response = self.client.post(
+            "/api/orders/bulk-status", {"is_paid": True}, format="json"
+        )
+
+        self.assertEqual(response.status_code, 400)
+
+
+class IdempotencyTests(RestaurantTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.customer)
+        self.body = {
+            "order_items": [{"id": self.menu.pk, "quantity": 2}],
+            "tax": 0,
+            "total_price": 20,
+        }
+
+    def post(self, body, key="retry-1"):
+        return self.client.post(
+            "/api/orders", body, format="json", HTTP_IDEMPOTENCY_KEY=key
+        )
+
+    def hold_key(self, held_for):
+        request_hash = hashlib.sha256(
+            json.dumps(self.body, sort_keys=True, default=str).encode()
+        ).hexdigest()
+        record = IdempotencyKey.objects.create(
+            user=self.customer,
+            path="/api/orders",
+            key="retry-1",
+            request_hash=request_hash,
+            expires_at=timezone.now() + settings.IDEMPOTENCY_KEY_TTL,
+        )
+        IdempotencyKey.objects.filter(pk=record.pk).update(
+            created_at=timezone.now() - held_for
+        )
+
+    def test_retry_replays_the_first_response(self):
+        first = self.post(self.body)
+        retry = self.post(self.body)
+
+        self.assertEqual(retry.status_code, first.status_code)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_key_reused_for_another_request(self):
+        self.post(self.body)
+
+        response = self.post(dict(self.body, tax=1))
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_retry_while_first_request_runs_conflicts(self):
+        self.hold_key(timedelta(seconds=1))
+
+        response = self.post(self.body)
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Order.objects.count(), 0)
+
+    def test_retry_takes_over_key_held_past_lease(self):
+        self.hold_key(settings.IDEMPOTENCY_KEY_LEASE + timedelta(seconds=1))
+
+        response = self.post(self.body)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(IdempotencyKey.objects.get().status_code, 200)
+
+
+class ArchiveTests(RestaurantTestCase):
+    def setUp(self):
+        super().setUp()
+        self.placed_at = timezone.now() - timedelta(days=400)
+        self.day = timezone.localdate(self.placed_at)
+        create_order(
+            self.restaurant,
+            self.customer,
+            self.menu,
+            quantity=2,
+            created_at=self.placed_at,
+            is_paid=True,
+            is_served=True,
+        )
+        create_order(
+            self.restaurant, self.customer, self.menu, created_at=self.placed_at
+        )
+
+    def statistics(self):
+        cache.clear()
+        dates = {"start_date": self.day, "end_date": self.day}
+        return [
+            self.client.get("/api/statistics/orders").data,
+            self.client.get("/api/statistics/sales/daily", dates).data,
+            self.client.get("/api/statistics/sales/menus", dates).data,
+            self.client.get(
+                "/api/statistics/timeseries",
+                dict(dates, metric="revenue", granularity="hour"),
+            ).data,
+        ]
+
+    def test_archived_orders_move_to_cold_tables(self):
+        self.assertEqual(archive_orders(archive_cutoff(365)), 2)
+
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(ArchivedOrder.objects.count(), 2)
+        self.assertEqual(ArchivedOrderItem.objects.get(quantity=2).name, "Biryani")
+
+    def test_rollup_totals(self):
+        archive_orders(archive_cutoff(365))
+
+        rollup = OrderDailyRollup.objects.get(restaurant=self.restaurant)
+        self.assertEqual(rollup.date, self.day)
+        self.assertEqual(
+            (rollup.orders, rollup.unpaid, rollup.served, rollup.revenue),
+            (2, 1, 1, 30),
+        )
+
+    def test_statistics_include_archived_orders(self):
+        before = self.statistics()
+
+        archive_orders(archive_cutoff(365))
+
+        self.assertEqual(self.statistics(), before)
+        self.assertEqual(before[1]["results"]["revenue"], [30])
+
+    def test_order_statistics_count_whole_days(self):
+        archive_orders(archive_cutoff(365))
+        create_order(self.restaurant, self.customer, self.menu)
+        dates = {"start_date": self.day, "end_date": timezone.localdate()}
+        expected = [
+            {"name": "not paid", "value": 2},
+            {"name": "not served", "value": 0},
+            {"name": "served", "value": 1},
+        ]
+
+        response = self.client.get("/api/statistics/orders", dates)
+        self.assertEqual(response.data["results"], expected)
+
+        token = restaurant_token(self.admin, self.restaurant).access_token
+        request = RequestFactory().get(
+            "/api/statistics/orders", dates, HTTP_AUTHORIZATION=f"Bearer {token}"
+        )
+        request.restaurant = self.restaurant
+        response = async_to_sync(AsyncOrderStatisticsView.as_view())(request)
+        self.assertEqual(json.loads(response.content)["results"], expected)
+
+
+class ActiveCampaignTests(RestaurantTestCase):
+    def create_campaign(self, title, start, end, restaurant=None, **fields):
+        today = timezone.localdate()
+        return Campaign.objects.create(
+            restaurant=restaurant or self.restaurant,
+            title=title,
+            description="d",
+            image="campaign/a.png",
+            start_date=today + timedelta(days=start),
+            end_date=today + timedelta(days=end),
+            **fields,
+        )
+
+    def titles(self):
+        return [campaign.title for campaign in active_campaigns(self.restaurant)]
+
+    def test_only_campaigns_running_today_are_active(self):
+        uptown = Restaurant.objects.create(slug="uptown", name="Uptown")
+        self.create_campaign("running", -1, 1)
+        self.create_campaign("last day", -3, 0)
+        self.create_campaign("over", -3, -1)
+        self.create_campaign("upcoming", 1, 3)
+        self.create_campaign("paused", -1, 1, is_active=False)
+        self.create_campaign("elsewhere", -1, 1, restaurant=uptown)
+
+        self.assertEqual(self.titles(), ["last day", "running"])
+
+    def test_active_campaigns_are_cached_until_a_campaign_changes(self):
+        campaign = self.create_campaign("running", -1, 1)
+        self.titles()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.titles(), ["running"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            campaign.end_date = timezone.localdate() - timedelta(days=1)
+            campaign.save()
+        self.assertEqual(self.titles(), [])
+
+    def test_cache_expires_at_midnight(self):
+        seconds = seconds_until_midnight()
+        midnight = timezone.localtime() + timedelta(seconds=seconds + 1)
+
+        self.assertGreater(seconds, 0)
+        self.assertEqual(midnight.date(), timezone.localdate() + timedelta(days=1))
+        self.assertLess(midnight.time(), time(0, 0, 2))
+
+    def test_customers_only_see_active_campaigns(self):
+        self.create_campaign("running", -1, 1)
+        self.create_campaign("upcoming", 1, 3)
+        self.client.force_authenticate(None)
+
+        response = self.client.get("/api/campaigns")
+
+        self.assertEqual([c["title"] for c in response.data["results"]], ["running"])
+        self.client.force_authenticate(self.admin)
+        self.assertEqual(self.client.get("/api/campaigns").data["count"], 2)
+
+
+class RecommendationTests(RestaurantTestCase):
+    def setUp(self):
+        super().setUp()
+        self.kebab = create_menu(self.restaurant, "Kebab")
+        self.lassi = create_menu(self.restaurant, "Lassi")
+        self.next_id = (Order.objects.aggregate(last=Max("id"))["last"] or 0) + 1
+
+    def order(self, *menus, skip=0):
+        self.next_id += skip
+        order = Order.objects.create(
+            id=self.next_id,
+            restaurant=self.restaurant,
+            user=self.customer,
+            total_price=0,
+            tax=0,
+        )
+        self.next_id += 1
+        for menu in menus:
+            OrderItem.objects.create(
+                order=order,
+                menu=menu,
+                menu_version=MenuVersion.objects.filter(menu=menu).first(),
+                quantity=1,
+            )
+        return order
+
+    def recommended(self, menu):
+        response = self.client.get(f"/api/menus/{menu.pk}/recommended")
+        return [menu["name"] for menu in response.data]
+
+    def test_menus_are_ranked_by_orders_together(self):
+        self.order(self.menu, self.lassi)
+        self.order(self.menu, self.kebab)
+        self.order(self.menu, self.kebab)
+        self.order(self.kebab)
+
+        self.assertEqual(build_recommendations(), 4)
+
+        self.assertEqual(self.recommended(self.menu), ["Kebab", "Lassi"])
+        self.assertEqual(self.recommended(self.lassi), ["Biryani"])
+
+    def test_later_runs_only_count_new_orders(self):
+        self.order(self.menu, self.kebab)
+        build_recommendations()
+        self.order(self.menu, self.lassi)
+        self.order(self.menu, self.lassi)
+
+        self.assertEqual(build_recommendations(), 2)
+        self.assertEqual(build_recommendations(), 0)
+
+        self.assertEqual(self.recommended(self.menu), ["Lassi", "Kebab"])
+
+    def test_order_committed_after_a_later_one_is_counted(self):
+        late_id = self.next_id
+        self.order(self.menu, self.kebab, skip=1)
+        build_recommendations()
+        self.assertIn(str(late_id), JobCheckpoint.objects.get().skipped)
+
+        self.next_id = late_id
+        self.order(self.menu, self.lassi)
+
+        self.assertEqual(build_recommendations(), 1)
+        self.assertEqual(self.recommended(self.menu), ["Kebab", "Lassi"])
+        self.assertEqual(JobCheckpoint.objects.get().skipped, {})
+
+
+class LeaderboardTests(RestaurantTestCase):
+    def setUp(self):
+        super().setUp()
+        self.reviewers = 0
+
+    def review(self, menu, *ratings):
+        with self.captureOnCommitCallbacks(execute=True):
+            for rating in ratings:
+                self.reviewers += 1
+                user = User.objects.create(email=f"reviewer{self.reviewers}@x.com")
+                Review.objects.create(menu=menu, user=user, rating=rating, comment="c")
+
+    def board(self, category=None):
+        return list(
+            LeaderboardEntry.objects.filter(
+                restaurant=self.restaurant, category=category
+            ).values_list("menu_id", "rank")
+        )
+
+    def test_many_good_reviews_outrank_a_single_perfect_one(self):
+        self.assertLess(bayesian_score(5, 1, 4, 10), bayesian_score(480, 100, 4, 10))
+
+    def test_review_only_updates_the_boards_of_its_menu(self):
+        kebab = create_menu(self.restaurant, "Kebab")
+        self.review(kebab, 4)
+        entries = set(
+            LeaderboardEntry.objects.filter(category=kebab.category).values_list("pk")
+        )
+
+        self.review(self.menu, 5, 5)
+
+        self.assertEqual(self.board(), [(self.menu.pk, 1), (kebab.pk, 2)])
+        self.assertEqual(self.board(self.menu.category), [(self.menu.pk, 1)])
+        self.assertEqual(
+            set(
+                LeaderboardEntry.objects.filter(category=kebab.category).values_list(
+                    "pk"
+                )
+            ),
+            entries,
+        )
+
+    def test_menu_falling_off_a_full_board_is_replaced(self):
+        menus = [create_menu(self.restaurant, f"Menu {i}") for i in range(7)]
+        for menu, ratings in zip(
+            menus, [(5, 5), (5, 4), (4, 4), (4, 3), (3, 3), (3, 2), (2, 2)]
+        ):
+            self.review(menu, *ratings)
+        self.assertNotIn(menus[6].pk, dict(self.board()))
+
+        self.review(menus[0], 0, 0, 0)
+
+        board = self.board()
+        self.assertIn(menus[6].pk, dict(board))
+        self.assertNotIn(menus[0].pk, dict(board))
+        rebuild_leaderboards()
+        self.assertEqual(self.board(), board)
+
+
+class TimeSeriesSerializerTests(TestCase):
+    def validate(self, start_date, end_date, granularity="hour"):
+        serializer = TimeSeriesSerializer(
+            data={
+                "metric": "orders",
+                "granularity": granularity,
+                "start_date": start_date,
+                "end_date": end_date,
+            }
+        )
+        return serializer.is_valid()
+
+    def test_range_of_at_most_max_buckets_is_valid(self):
+        # 41 days of 24 hours
+        self.assertTrue(self.validate("2024-01-01", "2024-02-10"))
+        self.assertTrue(self.validate("1950-01-01", "2024-12-31", "month"))
+
+    def test_range_of_more_buckets_is_rejected(self):
+        self.assertFalse(self.validate("2024-01-01", "2024-02-11"))
+        self.assertFalse(self.validate("2000-01-01", "2099-12-31"))
+
+
+class SeedDataTests(RestaurantTestCase):
+    def seed(self, **options):
+        counts = dict(users=3, categories=2, menus=4, orders=20, reviews=5)
+        counts.update(options)
+        call_command("seed_data", reservations=3, seed=1, stdout=StringIO(), **counts)
+
+    def test_seeds_the_restaurant(self):
+        self.seed()
+
+        self.assertEqual(Order.objects.filter(restaurant=self.restaurant).count(), 20)
+        self.assertEqual(Review.objects.filter(comment="Seeded review.").count(), 5)
+        self.assertTrue(LeaderboardEntry.objects.exists())
+
+    def test_rejects_empty_pools(self):
+        for option in ["users", "categories", "menus"]:
+            with self.subTest(option), self.assertRaises(CommandError):
+                self.seed(**{option: 0})
+        self.assertFalse(Review.objects.exists())
+
+
+class SchemaTests(TestCase):
+    def setUp(self):
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        overridden = override_settings(OPENAPI_SCHEMA_DIR=self.directory)
+        overridden.enable()
+        self.addCleanup(overridden.disable)
+        # every test loads the schema and pages afresh
+        for name, value in [("_schema", None), ("_pages", {})]:
+            patcher = mock.patch(f"server.schema.{name}", value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_generated_schema_is_served_with_its_etag(self):
+        call_command("generate_schema", stdout=StringIO())
+
+        response = self.client.get("/openapi.json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.content, (self.directory / "openapi.json").read_bytes()
+        )
+        self.assertIn("/menus", response.json()["paths"])
+        self.assertIn("max-age=86400", response["Cache-Control"])
+
+        response = self.client.get("/openapi.json", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+    def test_schema_is_generated_without_files(self):
+        with self.assertLogs("server.schema", "WARNING"):
+            response = self.client.get("/openapi.yaml")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content.startswith(b"swagger:"))
+        self.assertFalse(list(self.directory.iterdir()))
+
+    def test_unknown_format_is_not_found(self):
+        self.assertEqual(self.client.get("/openapi.xml").status_code, 404)
+
+    # the manifest is only written by collectstatic
+    @override_settings(
+        STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage"
+    )
+    def test_ui_pages_are_cached_by_etag(self):
+        for path in ["/", "/redoc/"]:
+            with self.subTest(path):
+                response = self.client.get(path)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn(b"<html", response.content)
+
+                response = self.client.get(path, HTTP_IF_NONE_MATCH=response["ETag"])
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(self.client.post(path).status_code, 405)
+
+
+class HistoryTests(RestaurantTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.customer)
+
+    def ids(self, response):
+        return [row["id"] for row in response.data["results"]]
+
+    def test_orders_are_the_users_own_newest_first_by_cursor(self):
+        orders = [
+            create_order(self.restaurant, self.customer, self.menu) for _ in range(3)
+        ]
+        create_order(self.restaurant, self.admin, self.menu)
+        uptown = Restaurant.objects.create(slug="uptown", name="Uptown")
+        create_order(uptown, self.customer, self.menu)
+
+        response = self.client.get("/api/me/orders", {"limit": 2})
+
+        self.assertEqual(self.ids(response), [orders[2].pk, orders[1].pk])
+        self.assertIn("cursor=", response.data["next"])
+        response = self.client.get(response.data["next"])
+        self.assertEqual(self.ids(response), [orders[0].pk])
+        self.assertIsNone(response.data["next"])
+
+    def test_reviews_take_the_same_queries_for_any_page_size(self):
+        def page_queries(limit):
+            with CaptureQueriesContext(connections["default"]) as queries:
+                response = self.client.get("/api/me/reviews", {"limit": limit})
+            self.assertEqual(len(response.data["results"]), limit)
+            return len(queries)
+
+        for i in range(4):
+            menu = create_menu(self.restaurant, f"Menu {i}")
+            Review.objects.create(menu=menu, user=self.customer, rating=4, comment="c")
+        Review.objects.create(menu=self.menu, user=self.admin, rating=1, comment="c")
+        # caches the restaurant
+        self.client.get("/api/me/reviews")
+
+        self.assertEqual(page_queries(1), page_queries(4))
+
+    def test_history_needs_a_user(self):
+        self.client.force_authenticate(None)
+
+        for path in ["/api/me/orders", "/api/me/resarvations", "/api/me/reviews"]:
+            with self.subTest(path):
+                self.assertEqual(self.client.get(path).status_code, 401)
+
+
+class FileServingTests(TestCase):
+    def setUp(self):
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        root = Path(directory.name)
+        self.content = b"body { color: red; }\n" * 200
+        path = root / "app.css"
+        path.write_bytes(self.content)
+        compress(str(path))
+        # brotli is optional, any bytes do for the variant
+        (root / "app.css.br").write_bytes(b"brotli")
+        (root / "tiny.css").write_bytes(b"a{}")
+        compress(str(root / "tiny.css"))
+
+        overridden = override_settings(SERVE_FILES=True, STATIC_ROOT=str(root))
+        overridden.enable()
+        self.addCleanup(overridden.disable)
+
+    def get(self, path="/static/app.css", method="get", **headers):
+        return getattr(self.client, method)(path, **headers)
+
+    def body(self, response):
+        return b"".join(response.streaming_content)
+
+    def test_preferred_accepted_variant_is_served(self):
+        plain = self.get()
+        gzipped = self.get(HTTP_ACCEPT_ENCODING="gzip, deflate")
+        brotli = self.get(HTTP_ACCEPT_ENCODING="gzip, br")
+        no_brotli = self.get(HTTP_ACCEPT_ENCODING="gzip, br;q=0")
+
+        self.assertNotIn("Content-Encoding", plain)
+        self.assertEqual(self.body(plain), self.content)
+        self.assertEqual(gzipped["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(self.body(gzipped)), self.content)
+        self.assertEqual(brotli["Content-Encoding"], "br")
+        self.assertEqual(no_brotli["Content-Encoding"], "gzip")
+        self.assertEqual(gzipped["Vary"], "Accept-Encoding")
+        self.assertEqual(gzipped["Content-Type"], "text/css")
+
+    def test_every_variant_has_its_own_etag(self):
+        plain = self.get()["ETag"]
+        gzipped = self.get(HTTP_ACCEPT_ENCODING="gzip")["ETag"]
+
+        self.assertEqual(gzipped, plain[:-1] + '-gz"')
+        response = self.get(HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=gzipped)
+        self.assertEqual(response.status_code, 304)
+        response = self.get(HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=plain)
+        self.assertEqual(response.status_code, 200)
+
+    def test_small_gain_is_not_compressed(self):
+        response = self.get("/static/tiny.css", HTTP_ACCEPT_ENCODING="gzip")
+
+        self.assertNotIn("Content-Encoding", response)
+        self.assertFalse(response.has_header("Vary"))
+
+    def test_byte_ranges_are_served_from_the_file(self):
+        response = self.get(HTTP_RANGE="bytes=5-9", HTTP_ACCEPT_ENCODING="gzip")
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(self.body(response), self.content[5:10])
+        self.assertEqual(response["Content-Range"], f"bytes 5-9/{len(self.content)}")
+        self.assertNotIn("Content-Encoding", response)
+
+        response = self.get(HTTP_RANGE="bytes=-4")
+        self.assertEqual(self.body(response), self.content[-4:])
+
+    def test_unsatisfiable_and_stale_ranges(self):
+        response = self.get(HTTP_RANGE=f"bytes={len(self.content)}-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], f"bytes */{len(self.content)}")
+
+        response = self.get(HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body(response), self.content)
+
+    def test_head_sends_headers_only(self):
+        response = self.get(method="head")
+
+        self.assertEqual(response["Content-Length"], str(len(self.content)))
+        self.assertEqual(response.content, b"")
+
+    def test_files_outside_the_root_are_not_served(self):
+        self.assertEqual(self.get("/static/../settings.py").status_code, 404)
+        self.assertEqual(self.get("/static/missing.css").status_code, 404)
+
+
+class TenantIsolationTests(RestaurantTestCase):
+    def setUp(self):
+        super().setUp()
+        self.uptown = Restaurant.objects.create(slug="uptown", name="Uptown")
+        self.uptown_menu = create_menu(self.uptown, name="Ramen")
+        create_order(self.restaurant, self.customer, self.menu)
+        create_order(self.uptown, self.customer, self.uptown_menu)
+
+    def test_menus_are_scoped_by_header(self):
+        main = self.client.get("/api/menus")
+        uptown = self.client.get("/api/menus", HTTP_X_RESTAURANT="uptown")
+
+        self.assertEqual([menu["name"] for menu in main.data["results"]], ["Biryani"])
+        self.assertEqual([menu["name"] for menu in uptown.data["results"]], ["Ramen"])
+
+    def test_orders_are_scoped_by_header(self):
+        response = self.client.get("/api/orders")
+
+        self.assertEqual(response.data["count"], 1)
+        self.assertEqual(response.data["results"][0]["restaurant"], self.restaurant.pk)
+
+    def test_statistics_are_scoped_by_header(self):
+        response = self.client.get("/api/statistics/orders")
+
+        self.assertEqual(sum(row["value"] for row in response.data["results"]), 1)
+
+    def test_unknown_restaurant(self):
+        response = self.client.get("/api/menus", HTTP_X_RESTAURANT="nope")
+
+        self.assertEqual(response.status_code, 404)
+
+
+# batch jobs that run once per restaurant database
+COMMANDS = [
+    "archive_orders",
+    "build_recommendations",
+    "rebuild_leaderboards",
+    "rollup_sales",
+    "purge_idempotency_keys",
+]
+
+
+@skipUnless(settings.TENANT_DATABASES, "needs a restaurant with its own database")
+class TenantDatabaseTests(RestaurantTestCase):
+    databases = {"default", *settings.TENANT_DATABASES.values()}
+
+    def setUp(self):
+        super().setUp()
+        self.slug, self.database = next(iter(settings.TENANT_DATABASES.items()))
+        with use_restaurant(self.slug) as restaurant:
+            self.tenant = restaurant
+            self.tenant_customer = User.objects.create_user(email="t@x.com")
+            self.tenant_menu = create_menu(restaurant, name="Ramen")
+
+    def test_writes_are_atomic_on_the_tenant_database(self):
+        with use_restaurant(self.slug):
+            order = create_order(self.tenant, self.tenant_customer, self.tenant_menu)
+        # the test case runs in a transaction, the update needs a block of its
+        # own on the tenant connection
+        savepoints = len(connections[self.database].savepoint_ids)
+        atomic = []
+        orders_updated.connect(
+            lambda using, **kwargs: atomic.append(
+                len(connections[using].savepoint_ids) > savepoints
+            ),
+            sender=Order,
+            weak=False,
+            dispatch_uid="test-atomic",
+        )
+        self.addCleanup(orders_updated.disconnect, dispatch_uid="test-atomic")
+
+        response = self.client.post(
+            "/api/orders/bulk-status",
+            {"ids": [order.pk], "is_paid": True},
+            format="json",
+            HTTP_X_RESTAURANT=self.slug,
+        )
+
+        self.assertEqual(response.data, {"updated": 1})
+        self.assertEqual(atomic, [True])
+        self.assertFalse(Order.objects.filter(pk=order.pk, is_paid=True).exists())
+
+    def test_commit_callbacks_wait_for_the_tenant_transaction(self):
+        with use_restaurant(self.slug):
+            with self.captureOnCommitCallbacks(using=self.database) as callbacks:
+                self.tenant_menu.name = "Shoyu Ramen"
+                self.tenant_menu.save()
+
+        self.assertTrue(callbacks)
+
+    def test_batch_commands_cover_tenant_databases(self):
+        with use_restaurant(self.slug):
+            create_order(
+                self.tenant,
+                self.tenant_customer,
+                self.tenant_menu,
+                created_at=timezone.now() - timedelta(days=400),
+            )
+            IdempotencyKey.objects.create(
+                user=self.tenant_customer,
+                path="/api/orders",
+                key="expired",
+                request_hash="",
+                expires_at=timezone.now(),
+            )
+
+        for command in COMMANDS:
+            call_command(command, stdout=StringIO())
+
+        with use_restaurant(self.slug):
+            self.assertEqual(ArchivedOrder.objects.count(), 1)
+            self.assertFalse(IdempotencyKey.objects.exists())
+            self.assertEqual(
+                set(JobCheckpoint.objects.values_list("name", flat=True)),
+                {"recommendations", "sales_rollup"},
+            )
+
+
+class OrderIntakeTests(RestaurantTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.customer)
+        self.body = {
+            "order_items": [
+                {"id": self.menu.pk, "price": 10, "offer_price": 0, "quantity": 2}
+            ],
+            "tax": 1,
+            "total_price": 21,
+        }
+
+    @override_settings(ORDER_INTAKE_ASYNC=True)
+    def test_intake_is_drained_into_orders(self):
+        response = self.client.post("/api/orders", self.body, format="json")
+        self.assertEqual(response.status_code, 202)
+        placed_at = OrderIntake.objects.get().created_at
+        received = listen(orders_updated, self)
+
+        self.assertEqual(drain_intake(10), 1)
+
+        order = Order.objects.get(order_id=response.data["order_id"])
+        self.assertEqual(order.created_at, placed_at)
+        self.assertEqual(order.order_items.get().created_at, placed_at)
+        self.assertEqual(order.order_items.get().quantity, 2)
+        self.assertFalse(OrderIntake.objects.exists())
+        self.assertEqual(received[0]["order_ids"], [order.pk])
+
+        status = self.client.get(response["Location"])
+        self.assertEqual(status.data["status"], "created")
+
+    @override_settings(ORDER_INTAKE_ASYNC=True)
+    def test_stale_price_is_rejected(self):
+        body = dict(self.body, order_items=[{"id": self.menu.pk, "price": 9}])
+
+        response = self.client.post("/api/orders", body, format="json")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(OrderIntake.objects.exists())
+
+    def test_failed_intake_is_kept(self):
+        Order.objects.create(
+            restaurant=self.restaurant,
+            user=self.customer,
+            order_id="DUP",
+            total_price=1,
+            tax=0,
+        )
+        OrderIntake.objects.create(
+            restaurant=self.restaurant,
+            user=self.customer,
+            order_id="DUP",
+            total_price=1,
+            tax=0,
+            items=[],
+        )
+
+        drain_intake(10)
+
+        self.assertEqual(OrderIntake.objects.get().status, OrderIntake.FAILED)
+
+
+class MenuSnapshotTests(RestaurantTestCase):
+    def test_order_items_keep_the_ordered_snapshot(self):
+        self.client.force_authenticate(self.customer)
+        order = self.client.post(
+            "/api/orders",
+            {
+                "order_items": [{"id": self.menu.pk, "quantity": 1}],
+                "tax": 0,
+                "total_price": 10,
+            },
+            format="json",
+        ).data
+
+        self.menu.name, self.menu.offer_price = "Kacchi", 8
+        self.menu.save()
+
+        item = self.client.get(f"/api/orders/{order['id']}").data["order_items"][0]
+        self.assertEqual((item["name"], item["price"]), ("Biryani", 10))
+        self.assertEqual(MenuVersion.objects.filter(menu=self.menu).count(), 2)
+
+    def test_unchanged_menu_keeps_its_snapshot(self):
+        self.menu.description = "other"
+        self.menu.save()
+
+        self.assertEqual(MenuVersion.objects.filter(menu=self.menu).count(), 1)
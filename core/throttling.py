@@ -0,0 +1,73 @@
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    Token bucket throttle keyed by user, or by IP address for anonymous
+    requests. The bucket of each client lives in the shared cache so the
+    limit holds across workers, which needs a CACHE_URL all workers share;
+    the local memory default gives every process a bucket of its own.
+
+    The rate is looked up in DEFAULT_THROTTLE_RATES by the view's
+    `throttle_scope`. A rate of "10/min" allows bursts of 10 requests and
+    refills one token every 6 seconds.
+
+    The bucket is kept as the time, in milliseconds, at which it is full
+    again and only changed with the cache's atomic incr/decr, so concurrent
+    requests cannot spend the same token.
+    """
+
+    cache_format = "throttle_bucket_%(scope)s_%(ident)s"
+
+    def __init__(self):
+        # the rate depends on the view, see allow_request
+        pass
+
+    def allow_request(self, request, view):
+        self.scope = getattr(view, "throttle_scope", None)
+        if not self.scope:
+            return True
+
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        self.key = self.get_cache_key(request, view)
+
+        interval = self.duration * 1000 // self.num_requests
+        now = int(self.timer() * 1000)
+        full_at = self.take_token(now, interval)
+
+        if full_at < now + interval and self.cache.add(
+            f"{self.key}_refill", True, max(1, interval // 1000)
+        ):
+            # the bucket was full, tokens beyond the burst are not kept
+            full_at = self.cache.incr(self.key, now + interval - full_at)
+
+        if full_at - now > self.num_requests * interval:
+            self.cache.decr(self.key, interval)
+            self.wait_time = (full_at - now - self.num_requests * interval) / 1000
+            return self.throttle_failure()
+
+        self.cache.touch(self.key, self.duration)
+        return True
+
+    def take_token(self, now, interval):
+        """
+        Add `interval` to the bucket and return the new full time.
+        """
+        while True:
+            try:
+                return self.cache.incr(self.key, interval)
+            except ValueError:
+                # no bucket yet, or it expired after a full refill
+                self.cache.add(self.key, now, self.duration)
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = f"user-{request.user.pk}"
+        else:
+            ident = f"ip-{self.get_ident(request)}"
+
+        return self.cache_format % {"scope": self.scope, "ident": ident}
+
+    def wait(self):
+        return self.wait_time
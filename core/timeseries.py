@@ -0,0 +1,151 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db import connections
+from django.db.models import Count
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+from accounts.models import User
+from core.models import ArchivedOrder, ArchivedOrderItem, Order, Resarvation
+from core.sales import item_revenue, restaurant_sold_items
+
+GRANULARITIES = ["hour", "day", "week", "month"]
+MAX_BUCKETS = 1000
+
+# querysets, each with its timestamp field and aggregate, of every metric of
+# a restaurant; archived orders count as well, their items are read through
+# the indexed (and on PostgreSQL partitioned) creation time of their order.
+# Users are shared by the restaurants of a database, so registrations are not
+METRICS = {
+    "orders": lambda restaurant: [
+        (model.objects.filter(restaurant=restaurant), "created_at", Count("id"))
+        for model in (Order, ArchivedOrder)
+    ],
+    "served_orders": lambda restaurant: [
+        (
+            model.objects.filter(restaurant=restaurant, is_served=True),
+            "created_at",
+            Count("id"),
+        )
+        for model in (Order, ArchivedOrder)
+    ],
+    "revenue": lambda restaurant: [
+        (restaurant_sold_items(restaurant), "created_at", item_revenue()),
+        (
+            restaurant_sold_items(restaurant, ArchivedOrderItem),
+            "order__created_at",
+            item_revenue(ArchivedOrderItem),
+        ),
+    ],
+    "reservations": lambda restaurant: [
+        (
+            Resarvation.objects.filter(restaurant=restaurant),
+            "created_at",
+            Count("id"),
+        )
+    ],
+    "registrations": lambda restaurant: [
+        (User.objects.filter(is_staff=False), "date_joined", Count("id"))
+    ],
+}
+
+POSTGRES_STEPS = {
+    "hour": "1 hour",
+    "day": "1 day",
+    "week": "1 week",
+    "month": "1 month",
+}
+
+
+def truncate(value, granularity):
+    """
+    Start of the local bucket containing the naive local datetime `value`.
+    """
+    if granularity == "hour":
+        return value.replace(minute=0, second=0, microsecond=0)
+    value = datetime.combine(value.date(), time.min)
+    if granularity == "week":
+        return value - timedelta(days=value.weekday())
+    if granularity == "month":
+        return value.replace(day=1)
+    return value
+
+
+def step(value, granularity):
+    if granularity == "hour":
+        return value + timedelta(hours=1)
+    if granularity == "day":
+        return value + timedelta(days=1)
+    if granularity == "week":
+        return value + timedelta(weeks=1)
+    return (value + timedelta(days=32)).replace(day=1)
+
+
+def buckets(start, end, granularity):
+    """
+    Naive local starts of the buckets overlapping [start, end).
+    """
+    bucket = truncate(timezone.localtime(start).replace(tzinfo=None), granularity)
+    end = timezone.localtime(end).replace(tzinfo=None)
+    while bucket < end:
+        yield bucket
+        bucket = step(bucket, granularity)
+
+
+def time_series(metric, restaurant, start, end, granularity):
+    """
+    Value of `metric` of `restaurant` per local hour, day, week or month
+    between the aware datetimes `start` (inclusive) and `end` (exclusive),
+    as a list of (naive local bucket start, value) including empty buckets.
+
+    The range is applied to the raw timestamp columns so their indexes are
+    used. On PostgreSQL the querysets of the metric are summed and the empty
+    buckets filled in one query with generate_series, elsewhere in Python.
+    """
+    groups = [
+        queryset.filter(**{f"{field}__gte": start, f"{field}__lt": end})
+        .annotate(
+            bucket=Trunc(field, granularity, tzinfo=timezone.get_current_timezone())
+        )
+        .values("bucket")
+        .annotate(value=aggregate)
+        .order_by()
+        for queryset, field, aggregate in METRICS[metric](restaurant)
+    ]
+
+    connection = connections[groups[0].db]
+    if connection.vendor == "postgresql":
+        return fill_in_database(groups, connection, start, end, granularity)
+
+    values = defaultdict(int)
+    for grouped in groups:
+        for row in grouped:
+            bucket = timezone.localtime(row["bucket"]).replace(tzinfo=None)
+            values[bucket] += row["value"] or 0
+    return [(bucket, values[bucket]) for bucket in buckets(start, end, granularity)]
+
+
+def fill_in_database(groups, connection, start, end, granularity):
+    series = list(buckets(start, end, granularity))
+    if not series:
+        return []
+
+    sql, params = [], []
+    for grouped in groups:
+        group_sql, group_params = grouped.query.get_compiler(grouped.db).as_sql()
+        sql.append(f"({group_sql})")
+        params += group_params
+    with connection.cursor() as cursor:
+        # Trunc with a time zone yields local timestamps without time zone,
+        # the series is generated in the same local time
+        cursor.execute(
+            "SELECT series.bucket, COALESCE(SUM(grouped.value), 0) "
+            "FROM generate_series(%s::timestamp, %s::timestamp, %s::interval) "
+            "AS series (bucket) "
+            f"LEFT JOIN ({' UNION ALL '.join(sql)}) AS grouped "
+            "ON grouped.bucket = series.bucket "
+            "GROUP BY series.bucket ORDER BY series.bucket",
+            [series[0], series[-1], POSTGRES_STEPS[granularity], *params],
+        )
+        return cursor.fetchall()
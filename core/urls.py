@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path
 
 from core.views import (
@@ -6,8 +7,14 @@ from core.views import (
     MenuListCreateView,
     MenuDetailView,
     TopRatedMenus,
+    RecommendedMenus,
     OrderListCreateView,
     OrderDetailView,
+    OrderIntakeStatusView,
+    OrderTransitionView,
+    OrderBulkStatusView,
+    ArchivedOrderListView,
+    KitchenQueueStreamView,
     CampaignListCreateView,
     CampaignDetailView,
     ContactListCreateView,
@@ -16,6 +23,9 @@ from core.views import (
     ResarvationDetailView,
     ReviewListCreateView,
     ReviewDetailView,
+    MyOrderListView,
+    MyResarvationListView,
+    MyReviewListView,
     ChefListCreateView,
     ChefDetailView,
     SubscribtionListCreateView,
@@ -26,6 +36,11 @@ from core.statistics.views import (
     SummaryStatistics,
     OrderStatisticsView,
     DailyServedOrderView,
+    TimeSeriesView,
+    MenuSalesView,
+    CategorySalesView,
+    DailySalesView,
+    SalesHeatmapView,
 )
 
 app_name = "core"
@@ -37,16 +52,49 @@ urlpatterns = [
     path(
         "statistics/orders/served", DailyServedOrderView.as_view(), name="order-served"
     ),
+    path(
+        "statistics/timeseries", TimeSeriesView.as_view(), name="statistics-timeseries"
+    ),
+    path("statistics/sales/menus", MenuSalesView.as_view(), name="sales-menus"),
+    path(
+        "statistics/sales/categories",
+        CategorySalesView.as_view(),
+        name="sales-categories",
+    ),
+    path("statistics/sales/daily", DailySalesView.as_view(), name="sales-daily"),
+    path("statistics/sales/heatmap", SalesHeatmapView.as_view(), name="sales-heatmap"),
     # categories
     path("categories", CategoryListCreateView.as_view(), name="categories"),
     path("categories/<pk>", CategoryDetailView.as_view(), name="category-details"),
     # menus
-    path("menus", MenuListCreateView.as_view(), name="categories"),
+    path("menus", MenuListCreateView.as_view(), name="menus"),
     path("menus/top-rated", TopRatedMenus.as_view(), name="menu-top-rated"),
     path("menus/<pk>", MenuDetailView.as_view(), name="menu-details"),
+    path(
+        "menus/<int:pk>/recommended",
+        RecommendedMenus.as_view(),
+        name="menu-recommended",
+    ),
     # orders
     path("orders", OrderListCreateView.as_view(), name="orders"),
+    path("orders/archived", ArchivedOrderListView.as_view(), name="orders-archived"),
+    path("orders/bulk-status", OrderBulkStatusView.as_view(), name="order-bulk-status"),
+    path(
+        "orders/kitchen-queue",
+        KitchenQueueStreamView.as_view(),
+        name="order-kitchen-queue",
+    ),
+    path(
+        "orders/intake/<str:order_id>",
+        OrderIntakeStatusView.as_view(),
+        name="order-intake",
+    ),
     path("orders/<pk>", OrderDetailView.as_view(), name="order-details"),
+    path(
+        "orders/<int:pk>/transition",
+        OrderTransitionView.as_view(),
+        name="order-transition",
+    ),
     # campaigns
     path("campaigns", CampaignListCreateView.as_view(), name="campaigns"),
     path("campaigns/<pk>", CampaignDetailView.as_view(), name="campaign-details"),
@@ -61,6 +109,10 @@ urlpatterns = [
     # reviews
     path("reviews", ReviewListCreateView.as_view(), name="reviews"),
     path("reviews/<pk>", ReviewDetailView.as_view(), name="review-details"),
+    # history of the requesting user
+    path("me/orders", MyOrderListView.as_view(), name="my-orders"),
+    path("me/resarvations", MyResarvationListView.as_view(), name="my-resarvations"),
+    path("me/reviews", MyReviewListView.as_view(), name="my-reviews"),
     # chefs
     path("chefs", ChefListCreateView.as_view(), name="chefs"),
     path("chefs/<pk>", ChefDetailView.as_view(), name="chefs-details"),
@@ -70,3 +122,35 @@ urlpatterns = [
         "subscribers/<pk>", SubscribtionDetailView.as_view(), name="subscribe-details"
     ),
 ]
+
+if settings.ASYNC_READ_VIEWS:
+    from core.async_views import (
+        AsyncCategoryListView,
+        AsyncMenuListView,
+        AsyncTopRatedMenus,
+        AsyncCampaignListView,
+        AsyncChefListView,
+    )
+    from core.statistics.async_views import (
+        AsyncSummaryStatistics,
+        AsyncOrderStatisticsView,
+    )
+
+    # async reads shadow the routes above, writes are passed through to them
+    urlpatterns = [
+        path(
+            "statistics/summary",
+            AsyncSummaryStatistics.as_view(),
+            name="statistics-summary",
+        ),
+        path(
+            "statistics/orders",
+            AsyncOrderStatisticsView.as_view(),
+            name="order-statistics",
+        ),
+        path("categories", AsyncCategoryListView.as_view(), name="categories"),
+        path("menus", AsyncMenuListView.as_view(), name="menus"),
+        path("menus/top-rated", AsyncTopRatedMenus.as_view(), name="menu-top-rated"),
+        path("campaigns", AsyncCampaignListView.as_view(), name="campaigns"),
+        path("chefs", AsyncChefListView.as_view(), name="chefs"),
+    ] + urlpatterns
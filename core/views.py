@@ -1,6 +1,17 @@
-from decimal import Decimal
-from django.db.models import Case, When, F, FloatField, Avg
+import asyncio
+import queue
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, router, transaction
+from django.db.models import Q
+from django.db.models.functions import Coalesce
+from django.http import StreamingHttpResponse
+from django.urls import reverse
+from django.db.models import Case, When, F, FloatField, Avg, Count, Prefetch
 from rest_framework import status
+from rest_framework.exceptions import ValidationError
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.filters import OrderingFilter, SearchFilter
@@ -12,7 +23,25 @@ from rest_framework.generics import (
     RetrieveUpdateDestroyAPIView,
 )
 
+from core.campaigns import active_campaigns
+from core.filters import (
+    ArchivedOrderFilter,
+    OrderFilter,
+    ResarvationFilter,
+    ReviewFilter,
+)
+from core.idempotency import IdempotentCreateMixin
+from core.menu_versions import current_menu_version
+from core.pagination import HistoryPagination
+from core.notifier import (
+    LoopQueue,
+    format_event,
+    kitchen_queryset,
+    order_feed,
+    serialize_kitchen_order,
+)
 from core.permissions import IsOwner, IsStaffOrOwnerAuthenticated
+from core.throttling import TokenBucketThrottle
 from core.serializers import (
     CampaignSerializer,
     ContactSerializer,
@@ -20,7 +49,12 @@ from core.serializers import (
     CategoryCreateSerializer,
     OrderDetailSerializer,
     OrderCreateSerializer,
+    OrderIntakeSerializer,
     OrderSerializer,
+    OrderBulkStatusSerializer,
+    OrderStateSerializer,
+    OrderTransitionSerializer,
+    ArchivedOrderSerializer,
     MenuSerializer,
     MenuCreateSerializer,
     ResarvationCreateSerializer,
@@ -35,21 +69,54 @@ from core.models import (
     Menu,
     Campaign,
     Order,
+    OrderIntake,
     OrderItem,
+    ArchivedOrder,
     Contact,
     Resarvation,
     Review,
     Chef,
     EmailSubscription,
 )
+from server.handlers import AsyncStreamingHttpResponse, streams_async
+
 
+class RestaurantUniqueMixin:
+    """
+    Creates objects in the request's restaurant. Names and slugs are only
+    unique per restaurant, enforced by the database, so a clash is
+    reported the way the unique field validators used to.
+    """
 
-class CategoryListCreateView(ListCreateAPIView):
+    def perform_create(self, serializer):
+        self.save_unique(serializer, restaurant=self.request.restaurant)
+
+    def perform_update(self, serializer):
+        self.save_unique(serializer)
+
+    def save_unique(self, serializer, **kwargs):
+        model = serializer.Meta.model
+        try:
+            with transaction.atomic(using=router.db_for_write(model)):
+                serializer.save(**kwargs)
+        except IntegrityError:
+            name = model._meta.verbose_name
+            raise ValidationError(
+                {
+                    "non_field_errors": [
+                        f"A {name} with this name or slug already exists."
+                    ]
+                }
+            )
+
+
+class CategoryListCreateView(RestaurantUniqueMixin, ListCreateAPIView):
     def get_queryset(self):
+        queryset = Category.objects.filter(restaurant=self.request.restaurant)
         if self.request.user.is_staff:
-            return Category.objects.all()
+            return queryset
         else:
-            return Category.objects.filter(is_active=True)
+            return queryset.filter(is_active=True)
 
     def get_serializer_class(self):
         if self.request.method == "POST":
@@ -66,34 +133,78 @@ class CategoryListCreateView(ListCreateAPIView):
         return super(CategoryListCreateView, self).get_permissions()
 
 
-class CategoryDetailView(RetrieveUpdateDestroyAPIView):
+class CategoryDetailView(RestaurantUniqueMixin, RetrieveUpdateDestroyAPIView):
     serializer_class = CategorySerializer
-    queryset = Category.objects.all()
     permission_classes = [IsAdminUser]
 
+    def get_queryset(self):
+        return Category.objects.filter(restaurant=self.request.restaurant)
+
 
 class TopRatedMenus(ListAPIView):
+    """
+    Reads the precomputed leaderboard (see core.leaderboards), overall or of
+    the `category` given in the query string.
+    """
+
+    serializer_class = MenuSerializer
+
+    def get_queryset(self):
+        queryset = Menu.objects.select_related("category").annotate(
+            review_count=F("rating_stats__review_count"),
+            avg_rating=F("rating_stats__avg_rating"),
+        )
+
+        category = self.request.query_params.get("category")
+        if category:
+            if not category.isdigit():
+                raise ValidationError({"category": ["Select a valid choice."]})
+            entries = {"leaderboard_entries__category_id": category}
+        else:
+            entries = {"leaderboard_entries__category__isnull": True}
+        queryset = queryset.filter(
+            leaderboard_entries__restaurant=self.request.restaurant, **entries
+        )
+
+        return queryset.order_by("leaderboard_entries__rank")
+
+
+class RecommendedMenus(ListAPIView):
+    """
+    Menus most often ordered together with the given menu, precomputed by
+    the `build_recommendations` command.
+    """
+
     serializer_class = MenuSerializer
+    permission_classes = [AllowAny]
+    pagination_class = None
 
     def get_queryset(self):
         return (
-            Menu.objects.filter(is_active=True)
-            .distinct()
-            .annotate(avg_rating=Avg("review__rating"))
-            .order_by("-avg_rating")[0:6]
+            Menu.objects.filter(
+                restaurant=self.request.restaurant,
+                recommended_for__menu_id=self.kwargs.get("pk"),
+                is_active=True,
+            )
+            .select_related("category")
+            .annotate(
+                review_count=Coalesce(F("rating_stats__review_count"), 0),
+                avg_rating=F("rating_stats__avg_rating"),
+            )
+            .order_by("recommended_for__rank")
         )
 
 
-class MenuListCreateView(ListCreateAPIView):
+class MenuListCreateView(RestaurantUniqueMixin, ListCreateAPIView):
     filter_backends = [DjangoFilterBackend, OrderingFilter]
     filterset_fields = ["category"]
     ordering_fields = ["cook_time"]
 
     def get_queryset(self):
-        queryset = Menu.objects.filter(is_active=True)
+        queryset = Menu.objects.filter(restaurant=self.request.restaurant)
 
-        if self.request.user.is_staff:
-            queryset = Menu.objects.all()
+        if not self.request.user.is_staff:
+            queryset = queryset.filter(is_active=True)
 
         # order_by price/offer_price and avarage rating
         ordering = self.request.query_params.get("ordering", "-avg_rating")
@@ -148,14 +259,15 @@ class MenuListCreateView(ListCreateAPIView):
         return super(MenuListCreateView, self).get_permissions()
 
 
-class MenuDetailView(RetrieveUpdateDestroyAPIView):
+class MenuDetailView(RestaurantUniqueMixin, RetrieveUpdateDestroyAPIView):
     serializer_class = MenuSerializer
 
     def get_queryset(self):
+        queryset = Menu.objects.filter(restaurant=self.request.restaurant)
         if self.request.user.is_staff:
-            return Menu.objects.all()
+            return queryset
         else:
-            return Menu.objects.filter(is_active=True)
+            return queryset.filter(is_active=True)
 
     def get_serializer_class(self):
         if self.request.method == "PUT" or self.request.method == "PATCH":
@@ -172,16 +284,17 @@ class MenuDetailView(RetrieveUpdateDestroyAPIView):
         return super(MenuDetailView, self).get_permissions()
 
 
-class OrderListCreateView(ListCreateAPIView):
+class OrderListCreateView(IdempotentCreateMixin, ListCreateAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = OrderSerializer
-    filterset_fields = ["is_active", "is_paid", "is_served", "user__email"]
+    filterset_class = OrderFilter
 
     def get_queryset(self):
+        queryset = Order.objects.filter(restaurant=self.request.restaurant)
         if self.request.user.is_staff:
-            return Order.objects.all()
+            return queryset
         else:
-            return Order.objects.filter(user=self.request.user)
+            return queryset.filter(user=self.request.user)
 
     def get_permissions(self):
         if self.request.method == "GET":
@@ -191,7 +304,10 @@ class OrderListCreateView(ListCreateAPIView):
 
         return super(OrderListCreateView, self).get_permissions()
 
-    def post(self, request, *args, **kwargs):
+    def create(self, request, *args, **kwargs):
+        if settings.ORDER_INTAKE_ASYNC:
+            return self.enqueue(request)
+
         user = request.user
         data = request.data
         order_items = data.get("order_items")
@@ -209,46 +325,265 @@ class OrderListCreateView(ListCreateAPIView):
                 }
             )
             order_serializer.is_valid(raise_exception=True)
-            order = order_serializer.save()
-
-            # create order items and add to order
-            for i in order_items:
-                price = 0
-                if i["offer_price"]:
-                    price = i["offer_price"]
-                else:
-                    price = i["price"]
-                menu = Menu.objects.get(id=i["id"])
-                item = OrderItem(
-                    menu=menu,
-                    order=order,
-                    name=menu.name,
-                    quantity=int(i["quantity"]),
-                    price=Decimal(price),
-                    image=menu.image,
-                )
-                item.save()
 
-                menu.save()
+            # an order is never visible without its items, readers that
+            # take orders by id rely on it (see core.recommendations)
+            with transaction.atomic(using=router.db_for_write(Order)):
+                order = order_serializer.save(restaurant=request.restaurant)
+
+                # create order items and add to order
+                for i in order_items:
+                    menu = Menu.objects.get(restaurant=request.restaurant, id=i["id"])
+                    item = OrderItem(
+                        menu=menu,
+                        menu_version=current_menu_version(menu),
+                        order=order,
+                        quantity=int(i["quantity"]),
+                    )
+                    item.save()
 
             serializer = OrderDetailSerializer(order, many=False)
             return Response(serializer.data)
 
+    def enqueue(self, request):
+        """
+        Queue the order for the `drain_order_intake` worker (see
+        core.intake) and answer before it is written.
+        """
+        serializer = OrderIntakeSerializer(
+            data=request.data, context={"request": request}
+        )
+        serializer.is_valid(raise_exception=True)
+        intake = serializer.save(user=request.user, restaurant=request.restaurant)
+
+        status_url = request.build_absolute_uri(
+            reverse("core:order-intake", args=[intake.order_id])
+        )
+        return Response(
+            {"order_id": intake.order_id, "status": intake.status, "url": status_url},
+            status=status.HTTP_202_ACCEPTED,
+            headers={"Location": status_url, "Retry-After": "1"},
+        )
+
+
+class OrderIntakeStatusView(APIView):
+    """
+    State of an order placed in the asynchronous intake mode: `pending`
+    while queued, `failed` with the error, or `created` with the order.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, order_id):
+        lookup = {"restaurant": request.restaurant, "order_id": order_id}
+        if not request.user.is_staff:
+            lookup["user"] = request.user
+
+        intake = OrderIntake.objects.filter(**lookup).first()
+        if intake is not None:
+            pending = intake.status == OrderIntake.PENDING
+            return Response(
+                {
+                    "order_id": order_id,
+                    "status": intake.status,
+                    "error": intake.error or None,
+                },
+                headers={"Retry-After": "1"} if pending else None,
+            )
+
+        order = Order.objects.filter(**lookup).first()
+        if order is None:
+            return Response({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(
+            {
+                "order_id": order_id,
+                "status": "created",
+                "order": OrderDetailSerializer(order).data,
+            }
+        )
+
 
 class OrderDetailView(RetrieveUpdateDestroyAPIView):
     permission_classes = [IsStaffOrOwnerAuthenticated]
     serializer_class = OrderDetailSerializer
-    queryset = Order.objects.all()
+
+    def get_queryset(self):
+        return Order.objects.filter(restaurant=self.request.restaurant)
+
+    def perform_update(self, serializer):
+        # full updates also invalidate versions held by transition clients
+        serializer.save(version=serializer.instance.version + 1)
+
+
+class ArchivedOrderListView(ListAPIView):
+    permission_classes = [IsAdminUser]
+    serializer_class = ArchivedOrderSerializer
+    filterset_class = ArchivedOrderFilter
+
+    def get_queryset(self):
+        return (
+            ArchivedOrder.objects.filter(restaurant=self.request.restaurant)
+            .select_related("user")
+            .prefetch_related("order_items")
+        )
+
+
+class OrderTransitionView(APIView):
+    """
+    Moves an order to `paid`, `served` or `cancelled` with a single
+    conditional UPDATE guarded by the order's version.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def post(self, request, pk):
+        serializer = OrderTransitionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        state = serializer.validated_data["state"]
+        version = serializer.validated_data["version"]
+        required, changes = Order.TRANSITIONS[state]
+        orders = Order.objects.filter(restaurant=request.restaurant, pk=pk)
+
+        updated = orders.filter(version=version, **required).update_status(**changes)
+        order = orders.only(*OrderStateSerializer.Meta.fields).first()
+
+        if order is None:
+            return Response({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
+        if not updated:
+            if order.version != version:
+                return Response(
+                    {
+                        "detail": "Order was modified by someone else.",
+                        "order": OrderStateSerializer(order).data,
+                    },
+                    status=status.HTTP_409_CONFLICT,
+                )
+            return Response(
+                {"detail": f"Order can not be marked as {state}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        return Response(OrderStateSerializer(order).data)
+
+
+class OrderBulkStatusView(APIView):
+    """
+    Sets is_active, is_paid and/or is_served on the orders selected by `ids`
+    or by `filter` with a single UPDATE.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def post(self, request):
+        serializer = OrderBulkStatusSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        changes = {field: data[field] for field in Order.STATUS_FIELDS if field in data}
+
+        queryset = Order.objects.filter(restaurant=request.restaurant)
+        if "ids" in data:
+            queryset = queryset.filter(pk__in=data["ids"])
+        else:
+            queryset = queryset.filter(**data["filter"])
+
+        with transaction.atomic(using=router.db_for_write(Order)):
+            # orders already in the target state keep their version
+            updated = (
+                queryset.select_for_update()
+                .filter(~Q(**changes))
+                .update_status(**changes)
+            )
+
+        return Response({"updated": updated})
+
+
+class KitchenQueueStreamView(APIView):
+    """
+    Server-Sent Events stream of the kitchen queue. Starts with a `snapshot`
+    of the paid, unserved orders followed by an `order` event whenever an
+    order changes.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        # the stream outlives the request's database routing, fix it now
+        database = router.db_for_read(Order)
+        feed_database = router.db_for_write(Order)
+        if streams_async():
+            # served on the event loop, a display holds no thread
+            response = AsyncStreamingHttpResponse(
+                self.astream(request.restaurant, database, feed_database),
+                content_type="text/event-stream",
+            )
+        else:
+            response = StreamingHttpResponse(
+                self.stream(request.restaurant, database, feed_database),
+                content_type="text/event-stream",
+            )
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+    def stream(self, restaurant, database, feed_database):
+        subscriber = order_feed.subscribe(restaurant.pk, feed_database)
+        try:
+            yield self.snapshot(restaurant, database)
+
+            # the display reconnects and resyncs from a new snapshot
+            deadline = time.monotonic() + settings.KITCHEN_QUEUE_STREAM_SECONDS
+            while time.monotonic() < deadline:
+                try:
+                    yield subscriber.get(timeout=settings.KITCHEN_QUEUE_HEARTBEAT)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+        finally:
+            order_feed.unsubscribe(subscriber)
+
+    async def astream(self, restaurant, database, feed_database):
+        subscriber = order_feed.subscribe(
+            restaurant.pk, feed_database, LoopQueue(settings.KITCHEN_QUEUE_BACKLOG)
+        )
+        try:
+            yield await sync_to_async(self.snapshot)(restaurant, database)
+
+            deadline = time.monotonic() + settings.KITCHEN_QUEUE_STREAM_SECONDS
+            while time.monotonic() < deadline:
+                try:
+                    yield await subscriber.get(timeout=settings.KITCHEN_QUEUE_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+        finally:
+            order_feed.unsubscribe(subscriber)
+
+    @staticmethod
+    def snapshot(restaurant, database):
+        orders = (
+            kitchen_queryset()
+            .using(database)
+            .filter(
+                restaurant=restaurant,
+                is_active=True,
+                is_paid=True,
+                is_served=False,
+            )
+        )
+        return format_event(
+            "snapshot", [serialize_kitchen_order(order) for order in orders]
+        )
 
 
 class CampaignListCreateView(ListCreateAPIView):
     serializer_class = CampaignSerializer
 
+    def perform_create(self, serializer):
+        serializer.save(restaurant=self.request.restaurant)
+
     def get_queryset(self):
         if self.request.user.is_staff:
-            return Campaign.objects.all()
+            return Campaign.objects.filter(restaurant=self.request.restaurant)
         else:
-            return Campaign.objects.filter(is_active=True)
+            return active_campaigns(self.request.restaurant)
 
     def get_permissions(self):
         if self.request.method == "GET":
@@ -261,13 +596,16 @@ class CampaignListCreateView(ListCreateAPIView):
 
 class CampaignDetailView(RetrieveUpdateDestroyAPIView):
     serializer_class = CampaignSerializer
-    queryset = Campaign.objects.all()
     permission_classes = [IsAdminUser]
 
+    def get_queryset(self):
+        return Campaign.objects.filter(restaurant=self.request.restaurant)
+
 
 class ContactListCreateView(ListCreateAPIView):
     serializer_class = ContactSerializer
     queryset = Contact.objects.all()
+    throttle_scope = "contact"
 
     def get_permissions(self):
         if self.request.method == "POST":
@@ -277,6 +615,14 @@ class ContactListCreateView(ListCreateAPIView):
 
         return super(ContactListCreateView, self).get_permissions()
 
+    def get_throttles(self):
+        if self.request.method == "POST":
+            self.throttle_classes = [TokenBucketThrottle]
+        else:
+            self.throttle_classes = []
+
+        return super(ContactListCreateView, self).get_throttles()
+
 
 class ContactDetailView(RetrieveUpdateDestroyAPIView):
     serializer_class = ContactSerializer
@@ -284,12 +630,14 @@ class ContactDetailView(RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAdminUser]
 
 
-class ResarvationListCreateView(ListCreateAPIView):
-    queryset = Resarvation.objects.all()
-    filterset_fields = ["is_active", "user__email"]
+class ResarvationListCreateView(IdempotentCreateMixin, ListCreateAPIView):
+    filterset_class = ResarvationFilter
+
+    def get_queryset(self):
+        return Resarvation.objects.filter(restaurant=self.request.restaurant)
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        serializer.save(user=self.request.user, restaurant=self.request.restaurant)
 
     def get_serializer_class(self):
         if self.request.method == "POST":
@@ -308,18 +656,28 @@ class ResarvationListCreateView(ListCreateAPIView):
 
 class ResarvationDetailView(RetrieveUpdateDestroyAPIView):
     serializer_class = ResarvationSerializer
-    queryset = Resarvation.objects.all()
     permission_classes = [IsAdminUser]
 
+    def get_queryset(self):
+        return Resarvation.objects.filter(restaurant=self.request.restaurant)
+
 
-class ReviewListCreateView(ListCreateAPIView):
-    queryset = Review.objects.all()
+class ReviewListCreateView(IdempotentCreateMixin, ListCreateAPIView):
     filter_backends = [DjangoFilterBackend, OrderingFilter]
-    filterset_fields = ["user__email", "menu"]
+    filterset_class = ReviewFilter
     ordering_fields = ["rating", "created_at"]
 
+    def get_queryset(self):
+        return Review.objects.filter(menu__restaurant=self.request.restaurant)
+
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        try:
+            with transaction.atomic(using=router.db_for_write(Review)):
+                serializer.save(user=self.request.user)
+        except IntegrityError:
+            raise ValidationError(
+                {"non_field_errors": ["You can review one item only once."]}
+            )
 
     def get_serializer_class(self):
         if self.request.method == "POST":
@@ -338,18 +696,73 @@ class ReviewListCreateView(ListCreateAPIView):
 
 class ReviewDetailView(RetrieveUpdateDestroyAPIView):
     serializer_class = ReviewSerializer
-    queryset = Review.objects.all()
     permission_classes = [IsOwner]
 
+    def get_queryset(self):
+        return Review.objects.filter(menu__restaurant=self.request.restaurant)
+
+
+class MyOrderListView(ListAPIView):
+    """
+    The requesting user's orders, newest first.
+    """
+
+    permission_classes = [IsAuthenticated]
+    serializer_class = OrderSerializer
+    pagination_class = HistoryPagination
+
+    def get_queryset(self):
+        return Order.objects.filter(
+            restaurant=self.request.restaurant, user=self.request.user
+        ).select_related("user")
+
+
+class MyResarvationListView(ListAPIView):
+    """
+    The requesting user's reservations, newest first.
+    """
+
+    permission_classes = [IsAuthenticated]
+    serializer_class = ResarvationSerializer
+    pagination_class = HistoryPagination
+
+    def get_queryset(self):
+        return Resarvation.objects.filter(
+            restaurant=self.request.restaurant, user=self.request.user
+        ).select_related("user")
+
+
+class MyReviewListView(ListAPIView):
+    """
+    The requesting user's reviews, newest first.
+    """
+
+    permission_classes = [IsAuthenticated]
+    serializer_class = ReviewSerializer
+    pagination_class = HistoryPagination
+
+    def get_queryset(self):
+        menus = Menu.objects.select_related("category").annotate(
+            review_count=Count("review", distinct=True),
+            avg_rating=Avg("review__rating"),
+        )
+        return (
+            Review.objects.filter(
+                menu__restaurant=self.request.restaurant, user=self.request.user
+            )
+            .select_related("user")
+            .prefetch_related(Prefetch("menu", queryset=menus))
+        )
+
 
 class ChefListCreateView(ListCreateAPIView):
     serializer_class = ChefSerializer
 
     def perform_create(self, serializer):
-        serializer.save(is_active=True)
+        serializer.save(is_active=True, restaurant=self.request.restaurant)
 
     def get_queryset(self):
-        queryset = Chef.objects.all()
+        queryset = Chef.objects.filter(restaurant=self.request.restaurant)
 
         if not self.request.user.is_staff:
             return queryset.filter(is_active=True)
@@ -367,15 +780,18 @@ class ChefListCreateView(ListCreateAPIView):
 
 class ChefDetailView(RetrieveUpdateDestroyAPIView):
     serializer_class = ChefSerializer
-    queryset = Chef.objects.all()
     permission_classes = [IsAdminUser]
 
+    def get_queryset(self):
+        return Chef.objects.filter(restaurant=self.request.restaurant)
+
 
 class SubscribtionListCreateView(ListCreateAPIView):
     serializer_class = EmailSubscriptionSerializer
     queryset = EmailSubscription.objects.all()
     filter_backends = [DjangoFilterBackend, SearchFilter]
     search_fields = ["=email"]
+    throttle_scope = "subscription"
 
     def get_permissions(self):
         if self.request.method == "POST":
@@ -385,6 +801,14 @@ class SubscribtionListCreateView(ListCreateAPIView):
 
         return super(SubscribtionListCreateView, self).get_permissions()
 
+    def get_throttles(self):
+        if self.request.method == "POST":
+            self.throttle_classes = [TokenBucketThrottle]
+        else:
+            self.throttle_classes = []
+
+        return super(SubscribtionListCreateView, self).get_throttles()
+
 
 class SubscribtionDetailView(RetrieveUpdateDestroyAPIView):
     serializer_class = EmailSubscriptionSerializer
@@ -0,0 +1,127 @@
+"""
+Compare throughput and latency of the WSGI and ASGI deployments.
+
+Start both servers on the same machine with the same number of workers,
+for example:
+
+    gunicorn server.wsgi -w 2 -b 127.0.0.1:8001
+    ASYNC_READ_VIEWS=True gunicorn server.asgi:application -w 2 \\
+        -k uvicorn.workers.UvicornWorker -b 127.0.0.1:8002
+
+then run:
+
+    python loadtest/compare_servers.py http://127.0.0.1:8001 http://127.0.0.1:8002
+
+Each target is driven by the same number of concurrent clients requesting
+the storefront read endpoints in turn; the results are printed as JSON.
+Only successful responses count towards throughput and latency, so keep
+throttled endpoints out of the paths: their quick 429s would flatter both.
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+from http.client import HTTPConnection
+from urllib.parse import urlsplit
+
+DEFAULT_PATHS = [
+    "/api/menus",
+    "/api/categories",
+    "/api/menus/top-rated",
+    "/api/chefs",
+    "/api/campaigns",
+]
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(fraction * (len(values) - 1))))
+    return values[index]
+
+
+def client(base_url, paths, deadline, latencies, errors, lock):
+    url = urlsplit(base_url)
+    connection = HTTPConnection(url.hostname, url.port or 80, timeout=30)
+    local_latencies = []
+    local_errors = 0
+    i = 0
+
+    while time.monotonic() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            connection.request("GET", path)
+            response = connection.getresponse()
+            response.read()
+        except OSError:
+            local_errors += 1
+            connection.close()
+            connection = HTTPConnection(url.hostname, url.port or 80, timeout=30)
+            continue
+        if response.status >= 400:
+            local_errors += 1
+            continue
+        local_latencies.append(time.perf_counter() - start)
+
+    connection.close()
+    with lock:
+        latencies.extend(local_latencies)
+        errors.append(local_errors)
+
+
+def run(base_url, paths, concurrency, duration):
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    threads = [
+        threading.Thread(
+            target=client, args=(base_url, paths, deadline, latencies, errors, lock)
+        )
+        for _ in range(concurrency)
+    ]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    return {
+        "target": base_url,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": sum(errors),
+        "throughput": round(len(latencies) / elapsed, 2),
+        "latency_ms": {
+            "mean": round(statistics.mean(latencies) * 1000, 2) if latencies else None,
+            "p50": round(percentile(latencies, 0.50) * 1000, 2) if latencies else None,
+            "p95": round(percentile(latencies, 0.95) * 1000, 2) if latencies else None,
+            "p99": round(percentile(latencies, 0.99) * 1000, 2) if latencies else None,
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("targets", nargs="+", help="base URLs of the servers")
+    parser.add_argument("-c", "--concurrency", type=int, nargs="+", default=[10, 50])
+    parser.add_argument("-d", "--duration", type=float, default=20)
+    parser.add_argument("-p", "--path", action="append", dest="paths")
+    args = parser.parse_args()
+
+    results = [
+        run(target, args.paths or DEFAULT_PATHS, concurrency, args.duration)
+        for concurrency in args.concurrency
+        for target in args.targets
+    ]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,413 @@
+"""
+Drive a running server with weighted customer scenarios and report
+throughput, error rate and latency percentiles per endpoint as JSON.
+
+Works against any server listening on HTTP, for example:
+
+    python manage.py runserver 127.0.0.1:8000
+    gunicorn server.wsgi -w 4 -b 127.0.0.1:8000
+    gunicorn server.asgi:application -w 4 -k uvicorn.workers.UvicornWorker \\
+        -b 127.0.0.1:8000
+
+Create the accounts the scenarios log in with once, against the same
+database as the server:
+
+    SECRET_KEY=... python loadtest/harness.py setup --customers 50
+
+then run, e.g. with 40 virtual users for 60 seconds:
+
+    python loadtest/harness.py run http://127.0.0.1:8000 -u 40 -d 60 \\
+        -o results/$(git rev-parse --short HEAD).json
+
+Every virtual user repeatedly picks a scenario by weight (see SCENARIOS,
+overridable with --weight browse=6 --weight order=3 ...) and runs it to
+the end. Requests are grouped per method and URL pattern in the report.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from http.client import HTTPConnection
+from pathlib import Path
+from urllib.parse import urlencode, urlsplit
+
+from compare_servers import percentile
+
+CUSTOMER_EMAIL = "loadtest-{}@example.com"
+ADMIN_EMAIL = "loadtest-admin@example.com"
+PASSWORD = "loadtest-password"
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.errors = Counter()
+
+    def record(self, endpoint, status, latency, error):
+        with self.lock:
+            self.latencies[endpoint].append(latency)
+            self.statuses[endpoint][status] += 1
+            if error:
+                self.errors[endpoint] += 1
+
+    def report(self, elapsed):
+        endpoints = {}
+        for endpoint in sorted(self.latencies):
+            latencies = self.latencies[endpoint]
+            endpoints[endpoint] = summarize(
+                latencies, self.errors[endpoint], elapsed
+            ) | {"statuses": dict(sorted(self.statuses[endpoint].items()))}
+
+        every = [latency for values in self.latencies.values() for latency in values]
+        return {
+            "total": summarize(every, sum(self.errors.values()), elapsed),
+            "endpoints": endpoints,
+        }
+
+
+def summarize(latencies, errors, elapsed):
+    def ms(fraction):
+        value = percentile(latencies, fraction)
+        return round(value * 1000, 2) if value is not None else None
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "error_rate": round(errors / len(latencies), 4) if latencies else None,
+        "throughput": round(len(latencies) / elapsed, 2),
+        "latency_ms": {"p50": ms(0.50), "p95": ms(0.95), "p99": ms(0.99)},
+    }
+
+
+class Session:
+    """
+    One virtual user: a keep-alive connection and, once logged in, a JWT.
+    """
+
+    def __init__(self, base_url, recorder, catalog):
+        self.url = urlsplit(base_url)
+        self.recorder = recorder
+        self.catalog = catalog
+        self.token = None
+        self.email = None
+        self.ordered_menus = set()
+        self.connection = self.connect()
+
+    def connect(self):
+        return HTTPConnection(self.url.hostname, self.url.port or 80, timeout=30)
+
+    def request(
+        self,
+        method,
+        path,
+        endpoint=None,
+        body=None,
+        query=None,
+        headers=None,
+        expect=(200,),
+    ):
+        """
+        Send a request and record it under `endpoint` (the URL pattern, e.g.
+        "/api/menus/{id}"). Statuses outside `expect` count as errors.
+        Returns (status, parsed JSON body or None).
+        """
+        headers = {"Accept": "application/json", **(headers or {})}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        payload = None
+        if body is not None:
+            payload = json.dumps(body)
+            headers["Content-Type"] = "application/json"
+        target = f"{self.url.path.rstrip('/')}{path}"
+        if query:
+            target += "?" + urlencode(query)
+
+        start = time.perf_counter()
+        try:
+            self.connection.request(method, target, payload, headers)
+            response = self.connection.getresponse()
+            content = response.read()
+            status = response.status
+        except OSError:
+            self.connection.close()
+            self.connection = self.connect()
+            status, content = 0, b""
+        latency = time.perf_counter() - start
+
+        self.recorder.record(
+            f"{method} {endpoint or path}", status, latency, status not in expect
+        )
+        try:
+            return status, json.loads(content) if content else None
+        except ValueError:
+            return status, None
+
+    def get(self, path, endpoint=None, **kwargs):
+        return self.request("GET", path, endpoint, **kwargs)
+
+    def post(self, path, body, endpoint=None, **kwargs):
+        return self.request("POST", path, endpoint, body=body, **kwargs)
+
+    def login(self, email):
+        self.token = None
+        status, data = self.post(
+            "/api/accounts/login", {"email": email, "password": PASSWORD}
+        )
+        if status == 200:
+            self.token = data["access"]
+            self.email = email
+
+    def menu(self):
+        return random.choice(self.catalog["menus"])
+
+
+def browse(session):
+    """
+    Anonymous storefront visit.
+    """
+    token, session.token = session.token, None
+    try:
+        storefront(session)
+    finally:
+        session.token = token
+
+
+def storefront(session):
+    session.get("/api/categories")
+    session.get("/api/campaigns")
+    session.get("/api/menus", query={"limit": 20})
+    if session.catalog["categories"]:
+        category = random.choice(session.catalog["categories"])
+        session.get("/api/menus", query={"category": category})
+        session.get("/api/menus/top-rated", query={"category": category})
+    session.get("/api/menus/top-rated")
+    menu = session.menu()
+    session.get(f"/api/menus/{menu['id']}", "/api/menus/{id}")
+    session.get(f"/api/menus/{menu['id']}/recommended", "/api/menus/{id}/recommended")
+
+
+def order(session):
+    """
+    A customer logs in, looks at a few menus, orders and reviews.
+    """
+    if not session.token or session.email == ADMIN_EMAIL:
+        customer = random.randrange(session.catalog["customers"])
+        session.login(CUSTOMER_EMAIL.format(customer))
+        if not session.token:
+            return
+
+    session.get("/api/menus", query={"limit": 20})
+    items = random.sample(
+        session.catalog["menus"], k=min(len(session.catalog["menus"]), 3)
+    )[: random.randint(1, 3)]
+    for menu in items:
+        session.get(f"/api/menus/{menu['id']}", "/api/menus/{id}")
+
+    order_items = [
+        {
+            "id": menu["id"],
+            "price": menu["price"],
+            "offer_price": menu["offer_price"],
+            "quantity": random.randint(1, 3),
+        }
+        for menu in items
+    ]
+    total = sum(
+        (item["offer_price"] or item["price"]) * item["quantity"]
+        for item in order_items
+    )
+    status, _ = session.post(
+        "/api/orders",
+        {"order_items": order_items, "tax": 0, "total_price": total},
+        headers={"Idempotency-Key": uuid.uuid4().hex},
+        expect=(200, 201, 202),
+    )
+    if status == 401:
+        session.token = None
+        return
+    session.ordered_menus.update(menu["id"] for menu in items)
+    session.get("/api/orders", query={"user__email": session.email})
+
+    # accepted once an admin served the order, rejected if already reviewed
+    if session.ordered_menus and random.random() < 0.3:
+        session.post(
+            "/api/reviews",
+            {
+                "menu": random.choice(list(session.ordered_menus)),
+                "rating": random.randint(1, 5),
+                "comment": "load test",
+            },
+            expect=(201, 400),
+        )
+
+
+def dashboard(session):
+    """
+    An admin dashboard polling the statistics and serving orders.
+    """
+    if session.email != ADMIN_EMAIL or not session.token:
+        session.login(ADMIN_EMAIL)
+        if not session.token:
+            return
+
+    session.get("/api/statistics/summary", expect=(200, 429))
+    session.get("/api/statistics/orders")
+    session.get("/api/statistics/orders/served")
+    session.get("/api/statistics/timeseries", query={"metric": "orders"})
+    session.get("/api/statistics/sales/daily")
+    session.get("/api/statistics/sales/heatmap")
+    session.get("/api/orders", query={"is_served": False, "limit": 20})
+    session.post(
+        "/api/orders/bulk-status",
+        {"filter": {"is_served": False}, "is_paid": True, "is_served": True},
+    )
+
+
+SCENARIOS = {"browse": (browse, 6), "order": (order, 3), "dashboard": (dashboard, 1)}
+
+
+def virtual_user(base_url, recorder, catalog, weights, deadline, think):
+    session = Session(base_url, recorder, catalog)
+    scenarios = list(weights)
+    while time.monotonic() < deadline:
+        scenario = random.choices(scenarios, [weights[name] for name in scenarios])
+        SCENARIOS[scenario[0]][0](session)
+        if think:
+            time.sleep(random.uniform(0, think))
+    session.connection.close()
+
+
+def load_catalog(base_url, customers):
+    session = Session(base_url, Recorder(), None)
+    _, menus = session.get("/api/menus", query={"limit": 100})
+    _, categories = session.get("/api/categories", query={"limit": 100})
+    if not menus or not menus["results"]:
+        sys.exit("No menus found, seed the database first.")
+    return {
+        "menus": [
+            {key: menu[key] for key in ("id", "price", "offer_price")}
+            for menu in menus["results"]
+        ],
+        "categories": [category["id"] for category in categories["results"]],
+        "customers": customers,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    weights = {name: weight for name, (_, weight) in SCENARIOS.items()}
+    for value in args.weight or []:
+        name, _, weight = value.partition("=")
+        if name not in SCENARIOS:
+            sys.exit(f"Unknown scenario {name!r}, choose from {', '.join(SCENARIOS)}.")
+        weights[name] = float(weight)
+
+    catalog = load_catalog(args.target, args.customers)
+    recorder = Recorder()
+    deadline = time.monotonic() + args.duration
+    threads = [
+        threading.Thread(
+            target=virtual_user,
+            args=(args.target, recorder, catalog, weights, deadline, args.think),
+        )
+        for _ in range(args.users)
+    ]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    result = {
+        "target": args.target,
+        "commit": git_commit(),
+        "users": args.users,
+        "duration": round(elapsed, 2),
+        "weights": weights,
+        **recorder.report(elapsed),
+    }
+    output = json.dumps(result, indent=2)
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(output)
+    print(output)
+
+
+def setup(args):
+    """
+    Create the admin and customer accounts used by the scenarios.
+    """
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "server.settings")
+    import django
+
+    django.setup()
+    from django.contrib.auth.hashers import make_password
+
+    from accounts.models import User
+
+    password = make_password(PASSWORD)
+    User.objects.update_or_create(
+        email=ADMIN_EMAIL,
+        defaults={"password": password, "is_staff": True, "is_superuser": True},
+    )
+    for customer in range(args.customers):
+        User.objects.update_or_create(
+            email=CUSTOMER_EMAIL.format(customer), defaults={"password": password}
+        )
+    print(f"Created {args.customers} customers and {ADMIN_EMAIL}.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    setup_parser = commands.add_parser("setup", help="create the test accounts")
+    setup_parser.add_argument("--customers", type=int, default=50)
+    setup_parser.set_defaults(handler=setup)
+
+    run_parser = commands.add_parser("run", help="run the scenarios")
+    run_parser.add_argument("target", help="base URL of the server")
+    run_parser.add_argument("-u", "--users", type=int, default=20)
+    run_parser.add_argument("-d", "--duration", type=float, default=60)
+    run_parser.add_argument(
+        "--customers",
+        type=int,
+        default=50,
+        help="number of accounts created by `setup`",
+    )
+    run_parser.add_argument(
+        "--think", type=float, default=0, help="max pause between scenarios (s)"
+    )
+    run_parser.add_argument(
+        "-w", "--weight", action="append", help="scenario weight, e.g. browse=6"
+    )
+    run_parser.add_argument("-o", "--output", help="also write the JSON here")
+    run_parser.set_defaults(handler=run)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
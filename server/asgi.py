@@ -9,8 +9,13 @@ https://docs.djangoproject.com/en/4.1/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
+
+from server.handlers import StreamingASGIHandler
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "server.settings")
 
-application = get_asgi_application()
+# get_asgi_application() with a handler that streams the kitchen queue
+# without blocking the event loop, see server.handlers
+django.setup(set_prefix=False)
+application = StreamingASGIHandler()
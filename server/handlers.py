@@ -0,0 +1,98 @@
+import asyncio
+from contextlib import aclosing
+from contextvars import ContextVar
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIHandler
+from django.http import StreamingHttpResponse
+
+# the `receive` callable of the ASGI request being served
+asgi_receive = ContextVar("asgi_receive")
+
+
+def streams_async():
+    """
+    Whether the current request is served by StreamingASGIHandler, which
+    can stream AsyncStreamingHttpResponse.
+    """
+    return asgi_receive.get(None) is not None
+
+
+class AsyncStreamingHttpResponse(StreamingHttpResponse):
+    """
+    Streaming response whose content is an async iterator, streamed by
+    StreamingASGIHandler without blocking the event loop. Django 4.1 itself
+    iterates streaming responses synchronously on the loop.
+    """
+
+    is_async = True
+
+    def _set_streaming_content(self, value):
+        self._iterator = aiter(value)
+
+    async def __aiter__(self):
+        async with aclosing(self._iterator) as parts:
+            async for part in parts:
+                yield self.make_bytes(part)
+
+    def __iter__(self):
+        raise TypeError("AsyncStreamingHttpResponse can only be served over ASGI.")
+
+
+class StreamingASGIHandler(ASGIHandler):
+    """
+    ASGIHandler that streams AsyncStreamingHttpResponse content on the
+    event loop and stops as soon as the client disconnects.
+    """
+
+    async def __call__(self, scope, receive, send):
+        token = asgi_receive.set(receive)
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            asgi_receive.reset(token)
+
+    async def send_response(self, response, send):
+        if not getattr(response, "is_async", False):
+            return await super().send_response(response, send)
+
+        headers = [
+            (header.encode("ascii"), value.encode("latin1"))
+            for header, value in response.items()
+        ]
+        headers += [
+            (b"Set-Cookie", cookie.output(header="").encode("ascii").strip())
+            for cookie in response.cookies.values()
+        ]
+        await send(
+            {
+                "type": "http.response.start",
+                "status": response.status_code,
+                "headers": headers,
+            }
+        )
+
+        # the body was read before the view ran, the next message can only
+        # be the disconnect
+        streaming = asyncio.ensure_future(self.send_parts(response, send))
+        disconnect = asyncio.ensure_future(asgi_receive.get()())
+        try:
+            await asyncio.wait(
+                [streaming, disconnect], return_when=asyncio.FIRST_COMPLETED
+            )
+        finally:
+            for task in (streaming, disconnect):
+                task.cancel()
+            await asyncio.gather(streaming, disconnect, return_exceptions=True)
+        if not streaming.cancelled() and streaming.exception() is not None:
+            raise streaming.exception()
+
+        await sync_to_async(response.close, thread_sensitive=True)()
+
+    async def send_parts(self, response, send):
+        async for part in response:
+            for chunk, _ in self.chunk_bytes(part):
+                await send(
+                    {"type": "http.response.body", "body": chunk, "more_body": True}
+                )
+        await send({"type": "http.response.body"})
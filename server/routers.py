@@ -0,0 +1,54 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+
+# set by core.middleware.ReplicaRoutingMiddleware for reads that may be
+# served by a replica
+read_from_replica = ContextVar("read_from_replica", default=False)
+
+# set by core.tenants.restaurant_database to the database of a restaurant listed
+# in ``TENANT_DATABASES``
+tenant_database = ContextVar("tenant_database", default=None)
+
+
+class TenantRouter:
+    """
+    Sends every query made for a restaurant with a database of its own to
+    that database. Other restaurants are left to the next router.
+    """
+
+    def db_for_read(self, model, **hints):
+        return tenant_database.get()
+
+    def db_for_write(self, model, **hints):
+        return tenant_database.get()
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # every tenant database holds the full schema
+        return None
+
+
+class ReplicaRouter:
+    """
+    Sends reads to one of ``DATABASE_REPLICAS`` while ``read_from_replica``
+    is set and every write to the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        if read_from_replica.get() and settings.DATABASE_REPLICAS:
+            return random.choice(settings.DATABASE_REPLICAS)
+        return None
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None
@@ -0,0 +1,162 @@
+"""
+The OpenAPI schema of the API, generated once and served from memory.
+
+`python manage.py generate_schema` writes it to OPENAPI_SCHEMA_DIR (run on
+deploy, see the Procfile). A process that finds no generated files builds
+the schema itself on the first request. The Swagger UI and ReDoc pages
+hold no schema: they are rendered once per process from the drf-yasg
+templates and the browser loads the schema from `schema_file`.
+"""
+import hashlib
+import logging
+import threading
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.template.loader import render_to_string
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition, require_safe
+from drf_yasg import openapi
+from drf_yasg.codecs import OpenAPICodecJson, OpenAPICodecYaml
+from drf_yasg.generators import OpenAPISchemaGenerator
+from drf_yasg.renderers import ReDocRenderer, SwaggerUIRenderer
+from rest_framework.test import APIRequestFactory
+from rest_framework.views import APIView
+
+from core.middleware import TenantMiddleware
+
+logger = logging.getLogger(__name__)
+
+API_INFO = openapi.Info(
+    title="Restaurant Order Management API",
+    default_version="v1",
+    description="Test description",
+    terms_of_service="https://www.google.com/policies/terms/",
+    contact=openapi.Contact(email="rakibulidlam.raaju@gmail.com"),
+    license=openapi.License(name="BSD License"),
+)
+
+CODECS = {
+    "json": lambda: OpenAPICodecJson(validators=[]),
+    "yaml": lambda: OpenAPICodecYaml(validators=[]),
+}
+
+CONTENT_TYPES = {
+    "json": "application/json",
+    "yaml": "application/yaml; charset=utf-8",
+}
+
+UI_RENDERERS = {
+    "swagger": SwaggerUIRenderer,
+    "redoc": ReDocRenderer,
+}
+
+
+def generate_schema():
+    """
+    Encoded schema per format, with every endpoint as seen by an anonymous
+    user and without host, so clients resolve it against the URL they
+    loaded it from.
+    """
+    # views read `self.request` and its restaurant while being introspected,
+    # give them an anonymous GET resolved like any other request; an empty
+    # url keeps its host out of the schema
+    tenant = TenantMiddleware(APIView().initialize_request)
+    request = tenant(APIRequestFactory().get("/"))
+    generator = OpenAPISchemaGenerator(API_INFO, url="")
+    schema = generator.get_schema(request=request, public=True)
+    return {format: codec().encode(schema) for format, codec in CODECS.items()}
+
+
+def write_schema(directory=None):
+    directory = directory or settings.OPENAPI_SCHEMA_DIR
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for format, content in generate_schema().items():
+        path = directory / f"openapi.{format}"
+        path.write_bytes(content)
+        paths.append(path)
+    return paths
+
+
+_schema = None
+_pages = {}
+_lock = threading.Lock()
+
+
+def content_etag(content):
+    return f'"{hashlib.sha256(content).hexdigest()[:32]}"'
+
+
+def load_schema():
+    """
+    Content and ETag per format, read from OPENAPI_SCHEMA_DIR or generated
+    when missing, once per process.
+    """
+    global _schema
+    with _lock:
+        if _schema is None:
+            try:
+                content = {
+                    format: (
+                        settings.OPENAPI_SCHEMA_DIR / f"openapi.{format}"
+                    ).read_bytes()
+                    for format in CODECS
+                }
+            except FileNotFoundError:
+                logger.warning(
+                    "No schema in %s, run `manage.py generate_schema` on deploy",
+                    settings.OPENAPI_SCHEMA_DIR,
+                )
+                content = generate_schema()
+            _schema = {
+                format: (data, content_etag(data)) for format, data in content.items()
+            }
+        return _schema
+
+
+def schema_etag(request, format):
+    if format not in CODECS:
+        raise Http404
+    return load_schema()[format][1]
+
+
+@require_safe
+@condition(etag_func=schema_etag)
+def schema_file(request, format):
+    content, etag = load_schema()[format]
+    response = HttpResponse(content, content_type=CONTENT_TYPES[format])
+    patch_cache_control(response, public=True, max_age=settings.OPENAPI_SCHEMA_MAX_AGE)
+    return response
+
+
+def load_page(ui):
+    """
+    Content and ETag of the `ui` page, rendered once per process with the
+    SWAGGER_SETTINGS or REDOC_SETTINGS of drf-yasg.
+    """
+    with _lock:
+        if ui not in _pages:
+            renderer = UI_RENDERERS[ui]()
+            context = {}
+            renderer.set_context(context)
+            context["title"] = API_INFO.title
+            # the API authenticates with bearer tokens, the page is the same
+            # for every visitor
+            context["USE_SESSION_AUTH"] = False
+            content = render_to_string(renderer.template, context).encode()
+            _pages[ui] = (content, content_etag(content))
+        return _pages[ui]
+
+
+def page_etag(request, ui):
+    return load_page(ui)[1]
+
+
+@require_safe
+@condition(etag_func=page_etag)
+def schema_page(request, ui):
+    content, etag = load_page(ui)
+    response = HttpResponse(content, content_type="text/html; charset=utf-8")
+    patch_cache_control(response, public=True, max_age=settings.OPENAPI_SCHEMA_MAX_AGE)
+    return response
@@ -1,11 +1,21 @@
 import os
 import environ
+from corsheaders.defaults import default_headers
 from datetime import timedelta
 from pathlib import Path
 
 env = environ.Env(
     PROD=(bool, False),
     DEBUG=(bool, False),
+    PERFORMANCE_INSTRUMENTATION=(bool, False),
+    SLOW_REQUEST_THRESHOLD_MS=(int, 500),
+    METRICS_ENABLED=(bool, False),
+    ASYNC_READ_VIEWS=(bool, False),
+    SQLITE_REPLICA=(bool, False),
+    ORDER_ARCHIVE_PARTITIONING=(bool, False),
+    SERVE_FILES=(bool, True),
+    DEFAULT_RESTAURANT=(str, "main"),
+    ORDER_INTAKE_ASYNC=(bool, False),
 )
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -58,9 +68,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.middleware.MetricsMiddleware",
+    "core.middleware.PerformanceMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    "core.middleware.FileServingMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",  # cors middleware
+    "core.middleware.TenantMiddleware",
+    "core.middleware.ReplicaRoutingMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
@@ -87,6 +102,13 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "server.wsgi.application"
+ASGI_APPLICATION = "server.asgi.application"
+
+# Serve the read-heavy storefront and statistics endpoints from async views
+# (core.async_views). Only worth enabling when running under ASGI, as the
+# Procfile does with `gunicorn server.asgi:application -k
+# uvicorn.workers.UvicornWorker`.
+ASYNC_READ_VIEWS = env("ASYNC_READ_VIEWS")
 
 
 # Database
@@ -111,6 +133,82 @@ else:
         }
     }
 
+# Read replicas. Every database other than `default` is a replica of it and
+# may serve safe requests to the views in REPLICA_READ_VIEWS. Locally,
+# SQLITE_REPLICA adds a second SQLite file (`migrate --database replica_0`
+# creates its tables) to exercise the routing.
+if env("PROD"):
+    for i, host in enumerate(env.list("DB_REPLICA_HOSTS", default=[])):
+        DATABASES[f"replica_{i}"] = {
+            **DATABASES["default"],
+            "HOST": host,
+            "TEST": {"MIRROR": "default"},
+        }
+elif env("SQLITE_REPLICA"):
+    DATABASES["replica_0"] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / "db.replica.sqlite3",
+        "TEST": {"MIRROR": "default"},
+    }
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias.startswith("replica_")]
+
+# Restaurants (branches) served by this deployment, see core.tenants. A
+# request picks one with the X-Restaurant header (its slug), the default one
+# without it.
+DEFAULT_RESTAURANT = env("DEFAULT_RESTAURANT")
+
+# Large restaurants can get a database of their own, which then holds all
+# of their data including the accounts of their customers. In production
+# TENANT_DB_HOSTS=downtown=10.0.0.5,airport=10.0.0.6 puts `downtown` and
+# `airport` on those hosts; locally SQLITE_TENANTS=downtown uses a SQLite
+# file. `migrate --database tenant_<slug>` creates its tables and the
+# restaurant; `add_restaurant <slug> <name>` adds one to the shared database.
+if env("PROD"):
+    tenant_hosts = env.dict("TENANT_DB_HOSTS", default={})
+    for slug, host in tenant_hosts.items():
+        DATABASES[f"tenant_{slug}"] = {**DATABASES["default"], "HOST": host}
+else:
+    tenant_hosts = dict.fromkeys(env.list("SQLITE_TENANTS", default=[]))
+    for slug in tenant_hosts:
+        DATABASES[f"tenant_{slug}"] = {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": BASE_DIR / f"db.tenant_{slug}.sqlite3",
+        }
+TENANT_DATABASES = {slug: f"tenant_{slug}" for slug in tenant_hosts}
+
+# the tenant router decides first, restaurants without a database of their
+# own share `default` and its replicas
+DATABASE_ROUTERS = ["server.routers.TenantRouter", "server.routers.ReplicaRouter"]
+REPLICA_PIN_SECONDS = 5
+REPLICA_READ_VIEWS = [
+    "core:statistics-summary",
+    "core:order-statistics",
+    "core:order-served",
+    "core:statistics-timeseries",
+    "core:sales-menus",
+    "core:sales-categories",
+    "core:sales-daily",
+    "core:sales-heatmap",
+    "core:categories",
+    "core:menus",
+    "core:menu-top-rated",
+    "core:menu-details",
+    "core:menu-recommended",
+    "core:orders",
+    "core:campaigns",
+    "core:resarvations",
+    "core:reviews",
+    "core:chefs",
+    "accounts:user-list",
+]
+
+# Shared cache, e.g. CACHE_URL=rediscache://127.0.0.1:6379/1 (needs
+# django-redis). The local memory default is per process: fine for a single
+# worker, but with several each one throttles on its own buckets (see
+# core.throttling and `check --deploy`).
+CACHES = {"default": env.cache("CACHE_URL", default="locmemcache://")}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
@@ -154,6 +252,17 @@ STATICFILES_DIRS = [
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "server/media"
 
+# `collectstatic` writes content hashed names and gzip variants (brotli too
+# when the `brotli` package is installed), see core.staticfiles
+STATICFILES_STORAGE = "core.staticfiles.CompressedManifestStaticFilesStorage"
+
+# STATIC_ROOT and MEDIA_ROOT are served by core.middleware.FileServingMiddleware.
+# Hashed static files are cached for a year, other files for these many
+# seconds before they are revalidated.
+SERVE_FILES = env("SERVE_FILES")
+STATIC_MAX_AGE = 60
+MEDIA_MAX_AGE = 60 * 60 * 24
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.1/ref/settings/#default-auto-field
 
@@ -167,11 +276,18 @@ REST_FRAMEWORK = {
         "rest_framework.permissions.DjangoModelPermissionsOrAnonReadOnly"
     ],
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "accounts.authentication.RestaurantJWTAuthentication",
     ),
     "DEFAULT_FILTER_BACKENDS": ["django_filters.rest_framework.DjangoFilterBackend"],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.LimitOffsetPagination",
     "PAGE_SIZE": 20,
+    # token bucket sizes per `throttle_scope`, see core.throttling
+    "DEFAULT_THROTTLE_RATES": {
+        "contact": "5/hour",
+        "subscription": "5/hour",
+        "registration": "10/hour",
+        "statistics": "60/min",
+    },
 }
 
 SIMPLE_JWT = {
@@ -194,6 +310,112 @@ CORS_ALLOWED_ORIGINS = [
     "https://admin-restaurant-management.vercel.app",
 ]
 
+CORS_ALLOW_HEADERS = [*default_headers, "x-restaurant"]
+
 CSRF_TRUSTED_ORIGINS = [
     "https://restaurant-management-api-production.up.railway.app",
 ]
+
+# Per-request performance instrumentation: Server-Timing header and slow
+# request log (see core.middleware.PerformanceMiddleware)
+PERFORMANCE_INSTRUMENTATION = env("PERFORMANCE_INSTRUMENTATION")
+SLOW_REQUEST_THRESHOLD_MS = env("SLOW_REQUEST_THRESHOLD_MS")
+SLOW_REQUEST_LOG_QUERIES = 5
+
+# In-process request metrics exposed at /metrics in the Prometheus text
+# format. Every worker flushes its totals to METRICS_DIR. Only staff and
+# scrapers connecting from METRICS_ALLOWED_NETWORKS may read them; behind a
+# proxy every client connects from the proxy, so keep it to loopback there.
+METRICS_ENABLED = env("METRICS_ENABLED")
+METRICS_DIR = env("METRICS_DIR", default="/tmp/restaurant-metrics")
+METRICS_ALLOWED_NETWORKS = env.list(
+    "METRICS_ALLOWED_NETWORKS", default=["127.0.0.0/8", "::1/128"]
+)
+METRICS_FLUSH_INTERVAL = 5
+METRICS_LATENCY_BUCKETS = [
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+]
+
+# Kitchen display Server-Sent Events stream (see core.notifier). Under ASGI
+# (server.handlers) a display holds no thread; under WSGI it holds one for
+# as long as it is connected, run e.g. `gunicorn server.wsgi
+# --worker-class gthread --threads 32` there. Streams end after
+# KITCHEN_QUEUE_STREAM_SECONDS and the display reconnects.
+KITCHEN_QUEUE_HEARTBEAT = 15
+KITCHEN_QUEUE_STREAM_SECONDS = 60 * 10
+KITCHEN_QUEUE_POLL_INTERVAL = 2
+KITCHEN_QUEUE_BACKLOG = 100
+
+# How long responses of POSTs sent with an Idempotency-Key are replayed, and
+# how long a key stays claimed by a request that never finished (a few times
+# gunicorn's 30s worker timeout) before a retry may take it over
+IDEMPOTENCY_KEY_TTL = timedelta(hours=24)
+IDEMPOTENCY_KEY_LEASE = timedelta(minutes=2)
+
+# Orders older than ORDER_ARCHIVE_AFTER_DAYS are moved to the archive tables
+# by the `archive_orders` command. ORDER_ARCHIVE_PARTITIONING makes the
+# archive a monthly range partitioned table on PostgreSQL; it only takes
+# effect when migration core.0016 is applied.
+ORDER_ARCHIVE_AFTER_DAYS = 365
+ORDER_ARCHIVE_PARTITIONING = env("ORDER_ARCHIVE_PARTITIONING")
+
+# With ORDER_INTAKE_ASYNC `POST /api/orders` only checks and queues orders
+# and answers 202; the `drain_order_intake` worker creates them in batches
+# of ORDER_INTAKE_BATCH_SIZE (see core.intake).
+ORDER_INTAKE_ASYNC = env("ORDER_INTAKE_ASYNC")
+ORDER_INTAKE_BATCH_SIZE = 200
+ORDER_INTAKE_POLL_INTERVAL = 0.5
+MENU_PRICES_CACHE_SECONDS = 60 * 60
+
+# Number of menus kept per menu by `build_recommendations`. Order ids are
+# not handed out in commit order: missing ids among the last
+# RECOMMENDATIONS_RECHECK_IDS below the checkpoint are looked for again by
+# the following runs, for up to RECOMMENDATIONS_RECHECK_TTL.
+RECOMMENDATIONS_TOP_K = 10
+RECOMMENDATIONS_RECHECK_IDS = 1000
+RECOMMENDATIONS_RECHECK_TTL = timedelta(hours=1)
+
+# Top rated menus kept per leaderboard, and the number of virtual average
+# reviews added to every menu's rating (see core.leaderboards)
+LEADERBOARD_SIZE = 6
+LEADERBOARD_PRIOR_WEIGHT = 10
+
+# Sales analytics (see core.sales): ranges longer than SALES_ROLLUP_MIN_DAYS
+# read the hourly rollups, which `rollup_sales` writes once an hour is older
+# than SALES_ROLLUP_DELAY and its orders are unlikely to change.
+SALES_ROLLUP_MIN_DAYS = 31
+SALES_ROLLUP_DELAY = timedelta(days=1)
+SALES_CACHE_SECONDS = 300
+
+# OpenAPI schema written by `generate_schema` and served by server.schema
+OPENAPI_SCHEMA_DIR = BASE_DIR / "server/schema"
+OPENAPI_SCHEMA_MAX_AGE = 60 * 60 * 24
+
+SWAGGER_SETTINGS = {
+    "SPEC_URL": ("openapi-schema", {"format": "json"}),
+}
+
+REDOC_SETTINGS = {
+    "SPEC_URL": ("openapi-schema", {"format": "json"}),
+}
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "core.slow_requests": {"handlers": ["console"], "level": "WARNING"},
+    },
+}
@@ -3,32 +3,14 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include, re_path
 
-from rest_framework import permissions
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
-
-
-schema_view = get_schema_view(
-    openapi.Info(
-        title="Restaurant Order Management API",
-        default_version="v1",
-        description="Test description",
-        terms_of_service="https://www.google.com/policies/terms/",
-        contact=openapi.Contact(email="rakibulidlam.raaju@gmail.com"),
-        license=openapi.License(name="BSD License"),
-    ),
-    public=True,
-    permission_classes=[permissions.AllowAny],
-)
+from server.schema import schema_file, schema_page
 
 
 urlpatterns = [
-    path(
-        "",
-        schema_view.with_ui("swagger", cache_timeout=0),
-        name="schema-swagger-ui",
-    ),
-    path("redoc/", schema_view.with_ui("redoc", cache_timeout=0), name="schema-redoc"),
+    # the UI pages load the prebuilt schema from `openapi-schema`
+    path("", schema_page, {"ui": "swagger"}, name="schema-swagger-ui"),
+    path("redoc/", schema_page, {"ui": "redoc"}, name="schema-redoc"),
+    path("openapi.<str:format>", schema_file, name="openapi-schema"),
     path("admin/", admin.site.urls),
     path("api-auth/", include("rest_framework.urls")),
     #
@@ -36,6 +18,11 @@ urlpatterns = [
     path("api/accounts/", include("accounts.urls", namespace="accounts")),
 ]
 
+if settings.METRICS_ENABLED:
+    from core.metrics.views import MetricsView
+
+    urlpatterns += [path("metrics", MetricsView.as_view(), name="metrics")]
+
 if settings.DEBUG:
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)